@@ -0,0 +1,338 @@
+"""
+Resilient Gemini Calls for AI Chatbot Hub
+
+Retries transient API failures (429 rate limits, 5xx overloads, dropped
+connections) with jittered exponential backoff, honouring the server's
+retry delay hint, and puts a circuit breaker in front of the API so requests
+fail fast during an outage instead of each waiting through its own retries.
+Streams that break after text was shown are resumed by asking the model to
+continue its partial answer; any overlap with the text already shown is
+trimmed so nothing is duplicated.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import re
+import math
+import time
+import random
+import threading
+from typing import Callable, Iterator, NamedTuple, Optional
+
+import httpx
+from google.genai import errors
+
+from env_config import get_env_int
+
+
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 20.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+# Longest overlap searched for when a resumed stream repeats the end of the partial answer
+MAX_RESUME_OVERLAP = 500
+# Shorter matches (a newline, a digit) are as likely to be new text as a repeat
+MIN_RESUME_OVERLAP = 8
+
+RESUME_PROMPT = ("Your previous answer was cut off. Continue exactly where it stopped, "
+                 "without repeating any of it and without any preamble.")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the API while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Gemini API temporarily unavailable after repeated failures; "
+                         f"retrying in {self.retry_after}s")
+
+
+class RetryPolicy(NamedTuple):
+    """How often and how long to retry a failed call"""
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+
+
+def get_retry_policy() -> RetryPolicy:
+    """
+    Get the retry policy for API calls
+
+    Returns:
+        RetryPolicy with max_attempts from API_MAX_ATTEMPTS (default DEFAULT_MAX_ATTEMPTS)
+    """
+    return RetryPolicy(max_attempts=get_env_int("API_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether an error is transient (rate limit, overload or network failure)"""
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def server_retry_delay(error: BaseException) -> Optional[float]:
+    """Retry delay requested by the server (google.rpc.RetryInfo or Retry-After), if any"""
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in (details.get("error") or {}).get("details") or []:
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            match = re.fullmatch(r"(\d+(?:\.\d+)?)s", delay or "")
+            if match:
+                return float(match.group(1))
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    retry_after = headers.get("retry-after") if headers is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return None
+
+
+def backoff_delay(attempt: int, policy: RetryPolicy, error: Optional[BaseException] = None) -> float:
+    """
+    Delay before retry number attempt (1-based)
+
+    Uses full jitter - a random delay up to the exponential bound - so clients
+    that failed together don't retry together. A server hint is used as a floor.
+
+    Args:
+        attempt: Number of the retry about to be made
+        policy: Retry policy
+        error: The error that caused the retry
+
+    Returns:
+        Seconds to wait
+    """
+    delay = random.uniform(0, min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1)))
+    hint = server_retry_delay(error) if error is not None else None
+    if hint is not None:
+        delay = max(delay, min(hint, policy.max_delay))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast after repeated transient failures
+
+    After failure_threshold consecutive failed calls the circuit opens and calls
+    raise CircuitOpenError for reset_timeout seconds; then one trial call is let
+    through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError if calls should not be attempted right now
+
+        Returns:
+            True if this call is the half-open trial (release() it if it ends without an outcome)
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(remaining)
+            if self._trial_running:
+                raise CircuitOpenError(1.0)
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self) -> None:
+        """End a trial call that says nothing about an outage (a bad request, a rate limit, or one abandoned by the caller)"""
+        with self._lock:
+            self._trial_running = False
+
+
+def _record_error(breaker: CircuitBreaker, error: BaseException) -> None:
+    # Only outages count toward opening the circuit; rate limits are handled by backing off
+    if is_retryable(error) and getattr(error, "code", None) != 429:
+        breaker.record_failure()
+    else:
+        breaker.release()
+
+
+# One breaker per server process - an outage affects every session alike
+api_breaker = CircuitBreaker()
+
+
+def call_with_retry(call: Callable[[], object], policy: Optional[RetryPolicy] = None,
+                    breaker: Optional[CircuitBreaker] = api_breaker,
+                    on_retry: Optional[Callable[[int, float, BaseException], None]] = None,
+                    sleep: Callable[[float], None] = time.sleep):
+    """
+    Run a call, retrying transient failures with backoff
+
+    Args:
+        call: Function making one API request
+        policy: Retry policy (defaults to get_retry_policy())
+        breaker: Circuit breaker guarding the API (None to disable)
+        on_retry: Called with (attempt, delay, error) before each retry
+        sleep: Wait function (replaceable for callers that wait differently)
+
+    Returns:
+        The call's result
+
+    Raises:
+        CircuitOpenError: If the circuit is open
+        Exception: The last error once retries are exhausted, or any non-transient error
+    """
+    policy = policy or get_retry_policy()
+    attempt = 1
+    while True:
+        trial = breaker is not None and breaker.before_call()
+        try:
+            result = call()
+        except Exception as e:
+            if breaker is not None:
+                _record_error(breaker, e)
+            if not is_retryable(e):
+                raise
+            if attempt >= policy.max_attempts:
+                raise
+            delay = backoff_delay(attempt, policy, e)
+            if on_retry is not None:
+                on_retry(attempt, delay, e)
+            sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Interrupted (e.g. Streamlit stopped the script): no verdict on the API
+            if trial:
+                breaker.release()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+class StreamChunk(NamedTuple):
+    """Text and usage of one streamed response chunk"""
+    text: str
+    usage_metadata: object = None
+
+
+def trim_overlap(previous: str, continuation: str, max_overlap: int = MAX_RESUME_OVERLAP) -> str:
+    """
+    Drop the start of a continuation that repeats the end of the previous text
+
+    Args:
+        previous: Text already shown
+        continuation: Start of the resumed stream
+
+    Returns:
+        The continuation without the repeated part (overlaps shorter than
+        MIN_RESUME_OVERLAP are kept, since they are usually new text)
+    """
+    tail = previous[-max_overlap:]
+    for size in range(min(len(tail), len(continuation)), MIN_RESUME_OVERLAP - 1, -1):
+        if tail.endswith(continuation[:size]):
+            return continuation[size:]
+    return continuation
+
+
+def resilient_stream(start: Callable[[str], Iterator], policy: Optional[RetryPolicy] = None,
+                     breaker: Optional[CircuitBreaker] = api_breaker,
+                     on_retry: Optional[Callable[[int, float, BaseException], None]] = None,
+                     sleep: Callable[[float], None] = time.sleep) -> Iterator[StreamChunk]:
+    """
+    Stream a response, retrying transient failures and resuming broken streams
+
+    Args:
+        start: Opens a stream; called with the text received so far ("" for a
+            fresh request) so it can ask the model to continue from there
+        policy: Retry policy (defaults to get_retry_policy())
+        breaker: Circuit breaker guarding the API (None to disable)
+        on_retry: Called with (attempt, delay, error) before each retry
+        sleep: Wait function
+
+    Yields:
+        StreamChunk objects; text across chunks is never repeated
+    """
+    policy = policy or get_retry_policy()
+    received = []
+    attempt = 1
+    while True:
+        trial = breaker is not None and breaker.before_call()
+        partial = "".join(received)
+        resuming = bool(partial)
+        pending = ""
+        pending_usage = None
+        try:
+            for chunk in start(partial):
+                text = chunk.text or ""
+                usage = getattr(chunk, "usage_metadata", None)
+                if resuming:
+                    # Hold back the start of a resumed stream until the overlap can be judged
+                    pending += text
+                    if usage is not None:
+                        pending_usage = usage
+                    if len(pending) < MAX_RESUME_OVERLAP:
+                        continue
+                    text = trim_overlap(partial, pending)
+                    usage = pending_usage
+                    resuming = False
+                if text:
+                    received.append(text)
+                if text or usage is not None:
+                    yield StreamChunk(text, usage)
+            if resuming:
+                text = trim_overlap(partial, pending)
+                if text:
+                    received.append(text)
+                if text or pending_usage is not None:
+                    yield StreamChunk(text, pending_usage)
+        except Exception as e:
+            if breaker is not None:
+                _record_error(breaker, e)
+            if not is_retryable(e):
+                raise
+            if attempt >= policy.max_attempts:
+                raise
+            delay = backoff_delay(attempt, policy, e)
+            if on_retry is not None:
+                on_retry(attempt, delay, e)
+            sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Closed by the consumer (GeneratorExit) or interrupted: no verdict on the API
+            if trial:
+                breaker.release()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return
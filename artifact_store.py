@@ -0,0 +1,214 @@
+"""
+Persistent Artifact Store for AI Chatbot Hub
+
+Content-addressed on-disk store for file processing outputs (extracted text,
+table summaries, image thumbnails). Entries are keyed by the SHA-256 of the
+uploaded file, so a file parsed by one Streamlit worker can be served by every
+other worker on the same machine or shared volume.
+
+Writes are atomic (temp file + rename) and eviction is serialized with a lock
+file, so several processes can use the same directory at once.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+from typing import Any, Optional
+
+from env_config import get_env_int
+
+try:
+    import fcntl
+except ImportError:  # Windows - eviction runs without a cross-process lock
+    fcntl = None
+
+
+DEFAULT_STORE_DIR = os.path.join(tempfile.gettempdir(), "ai_chatbot_artifacts")
+DEFAULT_MAX_MB = 1024
+DEFAULT_MAX_BYTES = DEFAULT_MAX_MB * 1024 * 1024
+META_FILENAME = "meta.json"
+
+
+class ArtifactStore:
+    """Content-addressed on-disk store with size-based LRU eviction"""
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 namespace: str = "default", eviction_interval: float = 30.0):
+        self.root = os.path.join(root, namespace)
+        self.max_bytes = max_bytes
+        self.eviction_interval = eviction_interval
+        self._last_eviction = 0.0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _artifact_path(self, key: str, name: str) -> str:
+        return os.path.join(self._entry_dir(key), name)
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _touch(self, key: str) -> None:
+        # Entry access time is tracked on the metadata file for LRU eviction
+        try:
+            os.utime(self._artifact_path(key, META_FILENAME))
+        except OSError:
+            pass
+
+    def put_bytes(self, key: str, name: str, data: bytes) -> None:
+        """Store a binary artifact for a content key"""
+        self._write_atomic(self._artifact_path(key, name), data)
+        self._maybe_evict()
+
+    def get_bytes(self, key: str, name: str) -> Optional[bytes]:
+        """Load a binary artifact, or None if it is not stored"""
+        try:
+            with open(self._artifact_path(key, name), "rb") as artifact_file:
+                data = artifact_file.read()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        self._touch(key)
+        return data
+
+    def put_text(self, key: str, name: str, text: str) -> None:
+        """Store a text artifact for a content key"""
+        self.put_bytes(key, name, text.encode("utf-8"))
+
+    def get_text(self, key: str, name: str) -> Optional[str]:
+        """Load a text artifact, or None if it is not stored"""
+        data = self.get_bytes(key, name)
+        return data.decode("utf-8") if data is not None else None
+
+    def put_json(self, key: str, name: str, value: Any) -> None:
+        """Store a JSON-serializable artifact for a content key"""
+        self.put_bytes(key, name, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def get_json(self, key: str, name: str) -> Optional[Any]:
+        """Load a JSON artifact, or None if it is missing or unreadable"""
+        data = self.get_bytes(key, name)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def put_meta(self, key: str, meta: dict) -> None:
+        """Store entry metadata; written last so readers only see complete entries"""
+        self.put_json(key, META_FILENAME, meta)
+
+    def get_meta(self, key: str) -> Optional[dict]:
+        """Load entry metadata, or None if the entry is missing or incomplete"""
+        return self.get_json(key, META_FILENAME)
+
+    def delete(self, key: str) -> None:
+        """Remove an entry and all its artifacts"""
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _scan_entries(self) -> list:
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.is_dir():
+                    continue
+                size = 0
+                last_access = 0.0
+                try:
+                    for artifact in os.scandir(entry.path):
+                        stat = artifact.stat()
+                        size += stat.st_size
+                        if artifact.name == META_FILENAME:
+                            last_access = stat.st_mtime
+                except FileNotFoundError:
+                    continue
+                entries.append((last_access, size, entry.path))
+        return entries
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """
+        Evict least recently used entries until the store is under its size limit
+
+        Args:
+            target_ratio: Fraction of max_bytes to shrink to once eviction starts
+
+        Returns:
+            Number of bytes freed
+        """
+        lock_file = open(os.path.join(self.root, ".lock"), "a")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Another process is already evicting
+                    return 0
+
+            entries = self._scan_entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return 0
+
+            freed = 0
+            target = self.max_bytes * target_ratio
+            for _, size, path in sorted(entries):
+                if total - freed <= target:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                freed += size
+            return freed
+        finally:
+            lock_file.close()
+
+    def _maybe_evict(self) -> None:
+        now = time.monotonic()
+        if now - self._last_eviction < self.eviction_interval:
+            return
+        self._last_eviction = now
+        try:
+            self.evict()
+        except OSError:
+            pass
+
+
+def create_artifact_store_from_env(namespace: str = "default") -> Optional[ArtifactStore]:
+    """
+    Create an ArtifactStore configured from environment variables
+
+    ARTIFACT_STORE_DIR sets the directory (shared by all workers), ARTIFACT_STORE_MAX_MB
+    the size limit, and ARTIFACT_STORE_DISABLED=1 turns persistence off.
+
+    Args:
+        namespace: Subdirectory separating incompatible artifact versions
+
+    Returns:
+        ArtifactStore instance, or None if disabled or the directory is unusable
+    """
+    if os.getenv("ARTIFACT_STORE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+
+    root = os.getenv("ARTIFACT_STORE_DIR", DEFAULT_STORE_DIR)
+    max_bytes = get_env_int("ARTIFACT_STORE_MAX_MB", DEFAULT_MAX_MB) * 1024 * 1024
+    try:
+        return ArtifactStore(root=root, max_bytes=max_bytes, namespace=namespace)
+    except OSError:
+        return None
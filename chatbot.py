@@ -1,10 +1,76 @@
 import streamlit as st
 import os
-import random
 import time
 from google import genai
-from google.genai import types
-from utils import process_uploaded_file
+from gemini_client import ChatSession
+from streaming import StreamRenderer, format_stream_stats
+from utils import (ProcessedFileCache, process_uploaded_files, preview_uploaded_file, compute_file_hash,
+                   format_file_size, get_upload_source, is_error_content, open_upload, is_pil_image, PROCESSOR_VERSION, TABLE_FILE_TYPES)
+from artifact_store import create_artifact_store_from_env
+from retrieval import BM25Index, chunk_file_content
+from history import FileContextStore, build_user_turn, build_model_turn
+from context_packer import pack_context, describe_packing, get_prompt_token_budget
+from memory_budget import memory_accountant, get_session_memory_limit, get_process_memory_limit
+from api_resilience import CircuitOpenError, is_retryable
+from request_scheduler import BULK, QueueTimeoutError
+from startup_timing import timed_import
+
+
+@st.cache_resource
+def get_artifact_store():
+    """Shared on-disk artifact store, created once per server process"""
+    return create_artifact_store_from_env(namespace=f"v{PROCESSOR_VERSION}")
+
+
+@st.cache_resource
+def get_genai_client(api_key):
+    """Gemini client shared by every session using the same API key"""
+    return genai.Client(api_key=api_key)
+
+
+def render_chatbot_sidebar():
+    """Render the Chatbot page's sidebar controls, stats and memory usage"""
+    st.markdown("### 🔧 Chat Controls")
+    if st.button("🗑️ Clear Chat History", use_container_width=True):
+        st.session_state.history = []
+        st.session_state.pop("file_context_store", None)
+        st.rerun()
+    
+    st.markdown("### 📁 File Support")
+    st.markdown("""
+    **Supported formats:**
+    - 📄 Text (.txt)
+    - 📄 PDF (.pdf)
+    - 📄 Word (.docx)
+    - 📊 Excel (.xlsx, .xls)
+    - 📊 CSV (.csv)
+    - 🔧 JSON (.json, .ndjson, .jsonl)
+    - 🖼️ Images (.jpg, .png, .gif)
+    """)
+    
+    # Chat statistics
+    if st.session_state.history:
+        st.markdown("### 📊 Chat Stats")
+        st.info(f"Messages: {len(st.session_state.history)}")
+        chat_session = st.session_state.get("chat_session")
+        if chat_session is not None and chat_session.history is st.session_state.history:
+            history_manager = chat_session.history_manager
+            st.caption(f"History sent per request: ~{history_manager.request_tokens():,} tokens"
+                       + (" (older turns summarized)" if history_manager.summary else ""))
+    
+    # Approximate memory held by this session and by all sessions in this server process
+    usage = memory_accountant.update(st.session_state.session_id, st.session_state)
+    if sum(usage.values()):
+        st.markdown("### 🧠 Memory")
+        st.caption(f"This session: ~{format_file_size(sum(usage.values()))} of "
+                   f"{format_file_size(get_session_memory_limit())} "
+                   f"(files {format_file_size(usage['files'])}, history {format_file_size(usage['history'])}, "
+                   f"context {format_file_size(usage['file_context'])}, "
+                   f"index {format_file_size(usage['retrieval_index'])})")
+        st.caption(f"All sessions: ~{format_file_size(memory_accountant.total_bytes())} of "
+                   f"{format_file_size(get_process_memory_limit())} "
+                   f"({memory_accountant.session_count()} active)")
+
 
 # Function to render Chatbot page
 def render_chatbot_page():
@@ -39,7 +105,7 @@ def render_chatbot_page():
             st.info("Get your API key from: https://aistudio.google.com/app/apikey")
             st.stop()
             
-        client = genai.Client(api_key=api_key)
+        client = get_genai_client(api_key)
         st.session_state.app_key = True
     except Exception as e:
         st.error(f"❌ Error configuring API: {str(e)}")
@@ -49,11 +115,18 @@ def render_chatbot_page():
     chat = None
     try:
         # Initialize chat with history
-        # Note: We use gemini-2.0-flash as the model
         if "history" not in st.session_state:
             st.session_state.history = []
-            
-        chat = client.chats.create(model="gemini-3-flash-preview", history=st.session_state.history)
+        if "file_context_store" not in st.session_state:
+            st.session_state.file_context_store = FileContextStore()
+        
+        # The chat session is kept across reruns; it is only rebuilt when the API key
+        # changes or the history is cleared
+        chat = st.session_state.get("chat_session")
+        if chat is None or not chat.is_bound_to(client, st.session_state.history):
+            chat = ChatSession(client, st.session_state.history,
+                               session_id=st.session_state.get("session_id", "default"))
+            st.session_state.chat_session = chat
     except Exception as e:
         st.error(f"❌ Error initializing model: {str(e)}")
         if "API_KEY" in str(e) or "authentication" in str(e).lower():
@@ -114,9 +187,9 @@ def render_chatbot_page():
         st.markdown("### 📁 File Upload")
         uploaded_files = st.file_uploader(
             "Upload files to analyze with AI",
-            type=['txt', 'pdf', 'docx', 'xlsx', 'xls', 'csv', 'json', 'jpg', 'jpeg', 'png', 'gif', 'bmp'],
+            type=['txt', 'pdf', 'docx', 'xlsx', 'xls', 'csv', 'json', 'ndjson', 'jsonl', 'jpg', 'jpeg', 'png', 'gif', 'bmp'],
             accept_multiple_files=True,
-            help="Supported formats: Text, PDF, Word, Excel, CSV, JSON, and Images"
+            help="Supported formats: Text, PDF, Word, Excel, CSV, JSON, NDJSON, and Images"
         )
         
         if uploaded_files:
@@ -139,38 +212,93 @@ def render_chatbot_page():
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        for i, uploaded_file in enumerate(uploaded_files):
-            status_text.text(f'Processing {uploaded_file.name}...')
-            progress_bar.progress((i + 1) / len(uploaded_files))
-            
+        # Parsed files are cached by content hash so reruns don't re-parse them
+        if "file_cache" not in st.session_state:
+            st.session_state.file_cache = ProcessedFileCache()
+        
+        # Previews only parse the start of each file, so they appear before full processing finishes
+        for uploaded_file in uploaded_files:
+            try:
+                file_hash = compute_file_hash(uploaded_file)
+                if not uploaded_file.type.startswith('image/'):
+                    preview_key = ProcessedFileCache.make_key(file_hash, f"preview:{uploaded_file.type}")
+                    preview = st.session_state.file_cache.get(preview_key)
+                    if preview is None:
+                        preview = preview_uploaded_file(uploaded_file, max_chars=500)
+                        st.session_state.file_cache.put(preview_key, preview)
+                    preview_text, truncated = preview
+                    with st.expander(f"📖 Preview: {uploaded_file.name}"):
+                        if truncated:
+                            st.text_area("Content (first 500 characters):", preview_text + "...", height=100)
+                        else:
+                            st.text_area("Content:", preview_text, height=100)
+                else:
+                    # Only a small cached thumbnail goes to the browser; the full image stays on the server
+                    with st.expander(f"🖼️ Image Preview: {uploaded_file.name}"):
+                        image_pipeline = timed_import("image_pipeline")
+                        thumbnail = image_pipeline.get_upload_thumbnail(uploaded_file, file_hash, get_artifact_store())
+                        st.image(thumbnail, caption=uploaded_file.name)
+            except Exception as e:
+                st.error(f"Error previewing {uploaded_file.name}: {str(e)}")
+        
+        def report_progress(completed, total, uploaded_file):
+            status_text.text(f'Processed {uploaded_file.name} ({completed}/{total})')
+            progress_bar.progress(completed / total)
+        
+        # Files are parsed concurrently; results come back in upload order
+        try:
+            processed_files = process_uploaded_files(
+                uploaded_files,
+                cache=st.session_state.file_cache,
+                store=get_artifact_store(),
+                progress_callback=report_progress
+            )
+        except Exception as e:
+            st.error(f"Error processing files: {str(e)}")
+            processed_files = []
+        
+        for uploaded_file, (content, file_details) in zip(uploaded_files, processed_files):
             try:
-                content, file_details = process_uploaded_file(uploaded_file)
                 file_contents.append({
                     'name': file_details['filename'],
                     'content': content,
                     'type': file_details['filetype'],
-                    'is_image': file_details['filetype'].startswith('image/')
+                    'hash': file_details['filehash'],
+                    'size': file_details['filesize'],
+                    'is_image': file_details['filetype'].startswith('image/'),
+                    'upload': uploaded_file
                 })
-                
-                # Display preview for text-based files
-                if not file_details['filetype'].startswith('image/'):
-                    with st.expander(f"📖 Preview: {uploaded_file.name}"):
-                        if len(str(content)) > 500:
-                            st.text_area("Content (first 500 characters):", str(content)[:500] + "...", height=100)
-                        else:
-                            st.text_area("Content:", str(content), height=100)
-                else:
-                    # Display image preview
-                    with st.expander(f"🖼️ Image Preview: {uploaded_file.name}"):
-                        st.image(content, caption=uploaded_file.name, use_column_width=True)
-                        
             except Exception as e:
                 st.error(f"Error processing {uploaded_file.name}: {str(e)}")
         
+        # Keep the retrieval index in sync with the files currently uploaded
+        if "retrieval_index" not in st.session_state:
+            st.session_state.retrieval_index = BM25Index()
+        retrieval_index = st.session_state.retrieval_index
+        for file_info in file_contents:
+            if not file_info['is_image']:
+                file_key = f"{file_info['hash']}:{file_info['name']}"
+                file_info['index_key'] = file_key
+                if not retrieval_index.has_file(file_key):
+                    retrieval_index.add_file(file_key, chunk_file_content(
+                        file_info['name'], file_info['type'], str(file_info['content'])
+                    ))
+        current_keys = {file_info.get('index_key') for file_info in file_contents}
+        for file_key in retrieval_index.file_keys():
+            if file_key not in current_keys:
+                retrieval_index.remove_file(file_key)
+        
+        # Keep this session (and the process) within its memory caps; current uploads stay cached
+        st.session_state.active_file_hashes = [file_info['hash'] for file_info in file_contents]
+        if "session_id" in st.session_state:
+            memory_accountant.update(st.session_state.session_id, st.session_state)
+        
         status_text.text('✅ All files processed!')
         time.sleep(0.5)
         status_text.empty()
         progress_bar.empty()
+    else:
+        st.session_state.active_file_hashes = []
 
     st.markdown("---")
 
@@ -186,39 +314,117 @@ def render_chatbot_page():
             
             # Prepare the complete message with file context
             complete_message = prompt
+            packed_context = None
+            query_result = None
+            referenced_files = []
+            context_store = st.session_state.file_context_store
             if file_contents:
                 # Add file context to the prompt
                 file_context = "\n\n📁 **Uploaded Files Context:**\n"
+                
+                # The prompt budget is split across history and files by relevance and size
+                text_keys = [file_info['index_key'] for file_info in file_contents if not file_info['is_image']]
+                packed_context = pack_context(
+                    st.session_state.retrieval_index, prompt, text_keys,
+                    token_budget=get_prompt_token_budget(),
+                    history_tokens=chat.history_manager.request_tokens()
+                )
+                selected_chunks = packed_context['chunks']
+                
                 for file_info in file_contents:
                     if not file_info['is_image']:
                         file_context += f"\n**File: {file_info['name']}**\n"
-                        # Limit file content to avoid token limits
-                        content_preview = str(file_info['content'])[:2000] + ("..." if len(str(file_info['content'])) > 2000 else "")
-                        file_context += f"Content: {content_preview}\n"
-                    else:
+                        excerpts = [chunk for chunk in selected_chunks if chunk['file_key'] == file_info['index_key']]
+                        if excerpts:
+                            for chunk in excerpts:
+                                file_context += f"[{chunk['label']}]\n{chunk['text']}\n"
+                        else:
+                            file_context += "(No excerpts relevant to this question)\n"
+                    elif is_pil_image(file_info['content']):
                         file_context += f"\n**Image File: {file_info['name']}** (Image analysis available)\n"
+                    else:
+                        # The image could not be decoded; tell the model instead of failing the request
+                        file_context += f"\n**Image File: {file_info['name']}**\n{file_info['content']}\n"
                 
+                # Aggregate questions about tables are answered by a local query over all rows;
+                # the model only plans the query and sees its result
+                table_files = [file_info for file_info in file_contents
+                               if file_info['type'] in TABLE_FILE_TYPES and not is_error_content(file_info['content'])]
+                table_query = timed_import("table_query") if table_files else None
+                if table_files and table_query.needs_table_query(prompt):
+                    try:
+                        tables = {}
+                        skipped = []
+                        for file_info in table_files:
+                            try:
+                                # Oversized files are skipped on their recorded size, before any bytes are read
+                                if not table_query.table_cache.can_load(file_info['hash'], file_info['name'], file_info['size']):
+                                    raise table_query.TableTooLargeError(f"{file_info['name']} is too large to query locally")
+                                # Large uploads are read through their spool file rather than copied
+                                source = get_upload_source(open_upload(file_info['upload'], file_info['hash']))
+                                tables.update(table_query.table_cache.get_tables(
+                                    file_info['hash'], source, file_info['name'], file_info['type']))
+                            except table_query.TableTooLargeError as e:
+                                skipped.append(f"({e}; use its summary above)\n")
+                        query_result = table_query.query_tables(prompt, tables, chat.generate_json)
+                        if skipped:
+                            query_result = (query_result or "") + "".join(skipped)
+                    except Exception as e:
+                        query_result = f"(Local table query failed: {e})\n"
+                    if query_result:
+                        file_context += f"\n**Local query result:**\n{query_result}"
+                
+                # Only sent with this request (and kept for one follow-up); history keeps the file names
+                context_store.add(file_context)
+                referenced_files = [file_info['name'] for file_info in file_contents]
                 complete_message = f"User question: {prompt}\n{file_context}\n\nPlease analyze the uploaded files in the context of the user's question."
+            elif st.session_state.history and context_store.last_context_id:
+                # Files were removed - the next question still gets the last context, once
+                file_context = context_store.take_last()
+                complete_message = f"User question: {prompt}\n{file_context}\n\nThese files were attached earlier in the conversation; use them if the question refers to them."
             
             with st.chat_message("user"):
                 st.markdown(prompt)
                 if file_contents:
                     st.caption(f"📎 Context from {len(file_contents)} uploaded file(s)")
+                    if packed_context:
+                        st.caption(f"🧮 {describe_packing(packed_context)}")
+                    if query_result:
+                        st.caption(f"🔢 {query_result.splitlines()[0].rstrip(':')}")
             
             with st.chat_message("assistant"):
                 message_placeholder = st.empty()
                 message_placeholder.markdown("🤔 Thinking...")
                 try:
-                    full_response = ""
+                    renderer = StreamRenderer(message_placeholder)
                     
-                    # Handle images separately with Gemini Vision
-                    # In the new SDK, we can just pass images in the contents list
+                    # Rate limits and overloads are retried with backoff; the wait is shown in place
+                    retries = []
+                    def report_retry(attempt, delay, error):
+                        retries.append(error)
+                        reason = "rate limited" if getattr(error, 'code', None) == 429 else "temporarily unavailable"
+                        renderer.show_status(f"⏳ Gemini is {reason}, retrying in {delay:.0f}s (retry {attempt})...")
+                    
+                    # Requests from all sessions share the API quota; show where this one stands
+                    def report_queue(ahead, wait):
+                        if ahead:
+                            renderer.show_status(f"🕒 Queued behind {ahead} request(s) from other chats...")
+                        else:
+                            renderer.show_status(f"🕒 Waiting for API quota, about {max(1, round(wait))}s...")
+                    
+                    # Analysis across several files yields to short interactive prompts
+                    priority = BULK if sum(1 for file_info in file_contents if not file_info['is_image']) > 1 else None
                     
+                    # Handle images separately with Gemini Vision
+                    # Images are downscaled, re-encoded and deduplicated before upload
                     image_parts = []
-                    for file_info in file_contents:
-                        if file_info['is_image']:
-                            # Assuming content is PIL Image or bytes
-                            image_parts.append(file_info['content'])
+                    image_stats = None
+                    images = [(file_info['content'], file_info['hash'], file_info['size'])
+                              for file_info in file_contents
+                              if file_info['is_image'] and is_pil_image(file_info['content'])]
+                    if images:
+                        image_pipeline = timed_import("image_pipeline")
+                        image_parts, image_stats = image_pipeline.prepare_images_for_model(images)
                     
                     response_stream = None
                     
@@ -227,66 +433,53 @@ def render_chatbot_page():
                         # We need to construct the contents list correctly
                         # contents = [text, image1, image2, ...]
                         contents = [complete_message] + image_parts
-                        response_stream = client.models.generate_content_stream(
-                            model="gemini-3-flash-preview",
-                            contents=contents
-                        )
+                        response_stream = chat.generate_content_stream(contents, on_retry=report_retry,
+                                                                       on_wait=report_queue, priority=priority)
                     else:
                         # Regular text-based processing using the chat session
-                        response_stream = chat.send_message_stream(complete_message)
+                        response_stream = chat.send_message_stream(complete_message, on_retry=report_retry,
+                                                                   on_wait=report_queue, priority=priority)
                     
-                    # Stream the response
+                    # Stream the response; tokens are shown as they arrive and
+                    # redraws are coalesced to one per frame
                     for chunk in response_stream:
-                        word_count = 0
-                        random_int = random.randint(5, 10)
-                        
-                        # In new SDK, chunk.text gives the text part
-                        if chunk.text:
-                            for word in chunk.text:
-                                full_response += word
-                                word_count += 1
-                                if word_count == random_int:
-                                    time.sleep(0.05)
-                                    message_placeholder.markdown(full_response + "▋")
-                                    word_count = 0
-                                    random_int = random.randint(5, 10)
+                        renderer.feed(chunk.text, getattr(chunk, 'usage_metadata', None))
                     
-                    message_placeholder.markdown(full_response)
+                    full_response = renderer.finish()
                     
                     # Update session state history
-                    # In the new SDK, chat object might not expose history directly as a property in the same way
-                    # or it might be named differently.
-                    # However, we can manually append the interaction to our session state history.
-                    
-                    # Append user message
-                    user_message_content = types.Content(
-                        role="user",
-                        parts=[types.Part(text=complete_message)]
-                    )
-                    # If we had images, we should add them to the user message parts
-                    if image_parts:
-                         # This is a simplification. Reconstructing the exact Content object with images 
-                         # for history storage might require more detailed handling of image data types.
-                         pass
-
-                    # Append model response
-                    model_message_content = types.Content(
-                        role="model",
-                        parts=[types.Part(text=full_response)]
-                    )
-                    
-                    st.session_state.history.append(user_message_content)
-                    st.session_state.history.append(model_message_content)
+                    # File context is not stored in the turn itself, only the files it referenced,
+                    # so replayed history grows with the conversation rather than turns x files
+                    chat.record_turn(build_user_turn(prompt, referenced_files), build_model_turn(full_response))
                     
                     # Add file processing summary if files were used
                     if file_contents:
                         st.caption(f"✅ Response generated using context from {len(file_contents)} file(s)")
+                    if image_stats:
+                        image_caption = (f"🖼️ {image_stats['images']} image(s) sent as {image_stats['frames']} frame(s), "
+                                         f"{format_file_size(image_stats['sent_bytes'])} "
+                                         f"(from {format_file_size(image_stats['original_bytes'])})")
+                        if image_stats['duplicates']:
+                            image_caption += f"; {image_stats['duplicates']} duplicate(s) skipped"
+                        st.caption(image_caption)
+                    stream_caption = f"⚡ {format_stream_stats(renderer.stats())}"
+                    if retries:
+                        stream_caption += f" · recovered after {len(retries)} retr{'y' if len(retries) == 1 else 'ies'}"
+                    st.caption(stream_caption)
                         
                 except Exception as e:
                     message_placeholder.markdown("❌ **Error**: Failed to get response")
                     error_msg = str(e)
-                    if "quota" in error_msg.lower() or "limit" in error_msg.lower():
-                        st.error("Rate limit or quota exceeded. Please wait a moment and try again.")
+                    if isinstance(e, QueueTimeoutError):
+                        st.error("The assistant is very busy right now and your request timed out in the queue. "
+                                 "Please try again in a minute.")
+                    elif isinstance(e, CircuitOpenError):
+                        st.error(f"Gemini is unavailable after repeated failures; requests are paused. "
+                                 f"Please try again in {e.retry_after} seconds.")
+                    elif getattr(e, 'code', None) == 429 or "quota" in error_msg.lower():
+                        st.error("Rate limit or quota exceeded, even after retrying. Please wait a moment and try again.")
+                    elif is_retryable(e):
+                        st.error("Gemini is overloaded or unreachable, even after retrying. Please try again shortly.")
                     elif "key" in error_msg.lower():
                         st.error("API key issue. Please check your configuration.")
                     else:
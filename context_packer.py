@@ -0,0 +1,164 @@
+"""
+Context Packing for AI Chatbot Hub
+
+Splits a fixed prompt token budget between conversation history and the uploaded
+files. Each file gets a share of the budget based on how relevant it is to the
+question and how large it is, so request sizes stay predictable whether one
+file or thirty are attached.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+from typing import List
+
+from retrieval import BM25Index, chunk_tokens, estimate_tokens
+from env_config import get_env_int
+
+
+DEFAULT_PROMPT_BUDGET = 8000
+DEFAULT_HISTORY_SHARE = 0.5
+MAX_CANDIDATES = 64
+# Share of the top relevance score given to every file, so unmatched files still get a little room
+RELEVANCE_FLOOR = 0.1
+
+
+def get_prompt_token_budget() -> int:
+    """
+    Get the configured prompt token budget
+
+    Returns:
+        Value of PROMPT_TOKEN_BUDGET, or DEFAULT_PROMPT_BUDGET
+    """
+    return get_env_int("PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_BUDGET)
+
+
+def _allocate(weights: dict, sizes: dict, budget: int) -> dict:
+    """Split a budget proportionally to weights, never giving a file more than its size"""
+    allocation = {}
+    active = {key for key in weights if sizes[key] > 0}
+    remaining = budget
+    while active:
+        total_weight = sum(weights[key] for key in active)
+        if total_weight <= 0:
+            break
+        saturated = {key for key in active
+                     if sizes[key] <= remaining * weights[key] / total_weight}
+        if not saturated:
+            for key in active:
+                allocation[key] = int(remaining * weights[key] / total_weight)
+            return allocation
+        # Files that fit entirely take their size; the rest is shared again
+        for key in saturated:
+            allocation[key] = sizes[key]
+            remaining -= sizes[key]
+        active -= saturated
+    return allocation
+
+
+def pack_context(index: BM25Index, query: str, file_keys: List[str],
+                 token_budget: int = DEFAULT_PROMPT_BUDGET, history_tokens: int = 0,
+                 history_share: float = DEFAULT_HISTORY_SHARE) -> dict:
+    """
+    Choose which file chunks go into a prompt
+
+    Args:
+        index: BM25Index holding the files
+        query: User question
+        file_keys: Index keys of the files attached to the conversation
+        token_budget: Total prompt budget in estimated tokens
+        history_tokens: Estimated tokens of conversation history sent with the prompt
+        history_share: Maximum fraction of the budget reserved for history
+
+    Returns:
+        Dictionary with "chunks" (selected chunks grouped by file, in document order),
+        "files" (per-file report of included/dropped chunks and tokens),
+        "tokens_used" and "file_budget"
+    """
+    reserved_history = min(history_tokens, int(token_budget * history_share))
+    file_budget = max(0, token_budget - estimate_tokens(query) - reserved_history)
+
+    relevance = {key: 0.0 for key in file_keys}
+    ranked_chunks = {key: [] for key in file_keys}
+    for score, chunk in index.search(query, MAX_CANDIDATES, file_keys):
+        relevance[chunk["file_key"]] += score
+        ranked_chunks[chunk["file_key"]].append(chunk)
+
+    all_chunks = {key: index.file_chunks(key) for key in file_keys}
+    sizes = {key: sum(chunk_tokens(chunk) for chunk in chunks) for key, chunks in all_chunks.items()}
+    floor = max(max(relevance.values(), default=0.0) * RELEVANCE_FLOOR, 1e-9)
+    weights = {key: relevance[key] + floor for key in file_keys}
+    allocation = _allocate(weights, sizes, file_budget)
+
+    ordered = {}
+    included = {}
+    included_ids = set()
+    used = {}
+    for key in file_keys:
+        # Best matches first, then the rest of the file in document order
+        ranked_ids = {id(chunk) for chunk in ranked_chunks[key]}
+        ordered[key] = ranked_chunks[key] + [chunk for chunk in all_chunks[key] if id(chunk) not in ranked_ids]
+        included[key] = []
+        used[key] = 0
+
+    def fill(key, budget):
+        for chunk in ordered[key]:
+            tokens = chunk_tokens(chunk)
+            if used[key] + tokens <= budget and id(chunk) not in included_ids:
+                included[key].append(chunk)
+                included_ids.add(id(chunk))
+                used[key] += tokens
+
+    for key in file_keys:
+        fill(key, allocation.get(key, 0))
+
+    # Shares too small for a whole chunk are handed to the most relevant files
+    leftover = file_budget - sum(used.values())
+    for key in sorted(file_keys, key=lambda key: weights[key], reverse=True):
+        before = used[key]
+        fill(key, before + leftover)
+        leftover -= used[key] - before
+
+    selected = []
+    files = []
+    for key in file_keys:
+        chunks = sorted(included[key], key=lambda chunk: chunk["position"])
+        selected.extend(chunks)
+        files.append({
+            "file_key": key,
+            "file": all_chunks[key][0]["file"] if all_chunks[key] else key,
+            "included_chunks": len(chunks),
+            "dropped_chunks": len(all_chunks[key]) - len(chunks),
+            "tokens": used[key],
+            "relevance": relevance[key],
+        })
+    tokens_used = sum(used.values())
+
+    return {
+        "chunks": selected,
+        "files": files,
+        "tokens_used": tokens_used,
+        "file_budget": file_budget,
+    }
+
+
+def describe_packing(packed: dict) -> str:
+    """
+    Summarize a pack_context result for display
+
+    Args:
+        packed: Result of pack_context
+
+    Returns:
+        One-line description of what was included and dropped
+    """
+    included = [f for f in packed["files"] if f["included_chunks"]]
+    dropped = [f["file"] for f in packed["files"] if not f["included_chunks"]]
+    description = (f"{len(packed['chunks'])} excerpt(s) from {len(included)} file(s), "
+                   f"~{packed['tokens_used']:,}/{packed['file_budget']:,} tokens")
+    partial = sum(1 for f in included if f["dropped_chunks"])
+    if partial:
+        description += f"; {partial} file(s) trimmed"
+    if dropped:
+        description += f"; not included: {', '.join(dropped)}"
+    return description
@@ -0,0 +1,149 @@
+"""
+Streaming Word Document Extraction for AI Chatbot Hub
+
+Reads word/document.xml straight out of the .docx zip with an incremental XML
+parser and yields body paragraphs and table rows one at a time, instead of
+building python-docx's full object model. Text follows python-docx's rules
+(runs and hyperlinks only, tabs/breaks translated, merged cells repeated), so
+the output matches the python-docx path, which is kept as the fallback.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Optional, Tuple
+
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DOCUMENT_PART = "word/document.xml"
+
+BODY = W_NS + "body"
+PARAGRAPH = W_NS + "p"
+TABLE = W_NS + "tbl"
+ROW = W_NS + "tr"
+CELL = W_NS + "tc"
+RUN = W_NS + "r"
+HYPERLINK = W_NS + "hyperlink"
+VAL = W_NS + "val"
+
+# Text equivalents of run content elements (w:br depends on its type)
+RUN_CONTENT_TEXT = {
+    W_NS + "tab": "\t",
+    W_NS + "ptab": "\t",
+    W_NS + "cr": "\n",
+    W_NS + "noBreakHyphen": "-",
+}
+
+
+def _run_text(run: ET.Element) -> str:
+    parts = []
+    for child in run:
+        if child.tag == W_NS + "t":
+            parts.append(child.text or "")
+        elif child.tag == W_NS + "br":
+            # Page and column breaks have no text equivalent
+            if child.get(W_NS + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif child.tag in RUN_CONTENT_TEXT:
+            parts.append(RUN_CONTENT_TEXT[child.tag])
+    return "".join(parts)
+
+
+def paragraph_text(paragraph: ET.Element) -> str:
+    """Text of a w:p element: its direct runs and hyperlink runs"""
+    parts = []
+    for child in paragraph:
+        if child.tag == RUN:
+            parts.append(_run_text(child))
+        elif child.tag == HYPERLINK:
+            parts.extend(_run_text(run) for run in child if run.tag == RUN)
+    return "".join(parts)
+
+
+def _property(element: ET.Element, container: str, name: str) -> Optional[ET.Element]:
+    properties = element.find(W_NS + container)
+    return properties.find(W_NS + name) if properties is not None else None
+
+
+def _int_property(element: ET.Element, container: str, name: str, default: int) -> int:
+    found = _property(element, container, name)
+    if found is None:
+        return default
+    try:
+        return int(found.get(VAL, default))
+    except ValueError:
+        return default
+
+
+def iter_table_rows(table: ET.Element) -> Iterator[List[str]]:
+    """
+    Yield the cell texts of each row of a w:tbl element
+
+    Cells spanning several grid columns are repeated once per column, and
+    vertically merged cells repeat the text of the cell above, like python-docx's
+    row.cells.
+
+    Args:
+        table: w:tbl element
+
+    Yields:
+        List of cell texts per row
+    """
+    above = {}
+    for row in table.iterfind(ROW):
+        offset = _int_property(row, "trPr", "gridBefore", 0)
+        current = {}
+        cells = []
+        for cell in row.iterfind(CELL):
+            span = _int_property(cell, "tcPr", "gridSpan", 1)
+            merge = _property(cell, "tcPr", "vMerge")
+            if merge is not None and merge.get(VAL, "continue") == "continue":
+                text = above.get(offset, "")
+            else:
+                text = "\n".join(paragraph_text(p) for p in cell.iterfind(PARAGRAPH))
+            current[offset] = text
+            cells.extend([text] * span)
+            offset += span
+        above = current
+        yield cells
+
+
+def iter_docx_blocks(source) -> Iterator[Tuple]:
+    """
+    Stream the body of a .docx file in document order
+
+    Only top-level paragraphs and tables are reported (text inside content
+    controls, text boxes and nested tables is skipped, as in python-docx).
+    Each block is discarded once yielded, so memory use is bounded by the
+    largest single paragraph or table.
+
+    Args:
+        source: Path or binary file-like object of the .docx file
+
+    Yields:
+        ("paragraph", text) and ("table_row", table_number, cell_texts) tuples
+    """
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(DOCUMENT_PART) as document:
+            body = None
+            depth = 0
+            table_number = 0
+            for event, element in ET.iterparse(document, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and element.tag == BODY:
+                        body = element
+                    continue
+
+                depth -= 1
+                if body is None or depth != 2:
+                    continue
+                if element.tag == PARAGRAPH:
+                    yield "paragraph", paragraph_text(element)
+                elif element.tag == TABLE:
+                    table_number += 1
+                    for cells in iter_table_rows(element):
+                        yield "table_row", table_number, cells
+                body.remove(element)
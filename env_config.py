@@ -0,0 +1,30 @@
+"""
+Environment Settings for AI Chatbot Hub
+
+Numeric settings (size limits, worker counts, rate limits, chunk sizes) are
+read from environment variables by every module the same way: a positive
+whole number overrides the default, anything else is ignored so a typo in a
+deployment falls back to a working value instead of failing at startup.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import os
+
+
+def get_env_int(name: str, default: int) -> int:
+    """
+    Read a positive integer setting from the environment
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset, not a number or not positive
+
+    Returns:
+        The configured value, or default
+    """
+    configured = os.getenv(name, "").strip()
+    if configured.isdigit() and int(configured) > 0:
+        return int(configured)
+    return default
@@ -0,0 +1,147 @@
+"""
+Gemini Client Helpers for AI Chatbot Hub
+
+A per-session chat object that is kept across Streamlit reruns. Turns are
+appended to it as the conversation goes on instead of rebuilding a chat (and
+converting the whole history) on every rerun. The underlying genai.Client is
+shared per API key so its HTTP connection pool is reused. Every request goes
+through api_resilience, so transient failures are retried and broken streams
+resumed, and is admitted by the request scheduler shared by all sessions on
+the same API key.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+from typing import Callable, Iterator, List, Optional
+
+from google import genai
+from google.genai import types
+
+from history import HistoryManager
+from retrieval import estimate_tokens
+from api_resilience import StreamChunk, RESUME_PROMPT, call_with_retry, resilient_stream
+from request_scheduler import BULK, INTERACTIVE, get_scheduler, metered
+
+
+MODEL_NAME = "gemini-3-flash-preview"
+# Approximate prompt tokens per image part
+IMAGE_PART_TOKENS = 258
+
+
+def to_content(message) -> types.Content:
+    """Convert a history message (Content object or dict) to a Content object"""
+    if isinstance(message, types.Content):
+        return message
+    return types.Content.model_validate(message)
+
+
+def estimate_contents_tokens(contents: List[types.Content]) -> int:
+    """Estimate the prompt tokens of a request (text parts by length, other parts as images)"""
+    tokens = 0
+    for content in contents:
+        for part in content.parts or []:
+            tokens += estimate_tokens(part.text) if part.text else IMAGE_PART_TOKENS
+    return tokens
+
+
+class ChatSession:
+    """Chat state for one browser session, updated incrementally turn by turn"""
+
+    def __init__(self, client: genai.Client, history: List, model: str = MODEL_NAME,
+                 session_id: str = "default"):
+        self.client = client
+        self.model = model
+        self.session_id = session_id
+        # Convert once, in place, so the list stays shared with st.session_state.history
+        for i, message in enumerate(history):
+            if not isinstance(message, types.Content):
+                history[i] = to_content(message)
+        self.history = history
+        self.history_manager = HistoryManager(history, self._summarize)
+
+    def _generate(self, prompt: str, priority: int, config: Optional[types.GenerateContentConfig] = None) -> str:
+        scheduler = get_scheduler(self.client)
+
+        def call():
+            ticket = scheduler.acquire(self.session_id, estimate_tokens(prompt), priority)
+            try:
+                response = self.client.models.generate_content(model=self.model, contents=prompt, config=config)
+            except Exception as e:
+                ticket.finish(rate_limited=getattr(e, "code", None) == 429)
+                raise
+            ticket.finish(getattr(response.usage_metadata, "total_token_count", None))
+            return response
+        return call_with_retry(call).text
+
+    def _summarize(self, prompt: str) -> str:
+        # Background work; waits behind interactive requests
+        return self._generate(prompt, BULK)
+
+    def is_bound_to(self, client: genai.Client, history: List) -> bool:
+        """Check whether this session still belongs to the given client and history list"""
+        return self.client is client and self.history is history
+
+    def _stream(self, contents: List[types.Content], on_retry: Optional[Callable[[int, float, BaseException], None]],
+                on_wait: Optional[Callable[[int, float], None]], priority: Optional[int]) -> Iterator[StreamChunk]:
+        scheduler = get_scheduler(self.client)
+        tokens = estimate_contents_tokens(contents)
+
+        def start(partial: str):
+            request = contents
+            if partial:
+                # Resume a broken stream: show the model its partial answer and ask it to go on
+                request = contents + [
+                    types.Content(role="model", parts=[types.Part(text=partial)]),
+                    types.Content(role="user", parts=[types.Part(text=RESUME_PROMPT)]),
+                ]
+            # Every attempt is a new request and waits for its own slot
+            ticket = scheduler.acquire(self.session_id, tokens + estimate_tokens(partial), priority, on_wait)
+            try:
+                stream = self.client.models.generate_content_stream(model=self.model, contents=request)
+            except Exception as e:
+                ticket.finish(rate_limited=getattr(e, "code", None) == 429)
+                raise
+            return metered(ticket, stream)
+        return resilient_stream(start, on_retry=on_retry)
+
+    def send_message_stream(self, message: str, on_retry: Optional[Callable[[int, float, BaseException], None]] = None,
+                            on_wait: Optional[Callable[[int, float], None]] = None,
+                            priority: Optional[int] = None) -> Iterator[StreamChunk]:
+        """
+        Stream a reply to a message, sending the rolling history window as context
+
+        Recent turns are sent verbatim and older ones as a running summary. The
+        message itself is not recorded; call record_turn once the reply is complete.
+        Transient failures are retried and a stream that breaks off is resumed.
+
+        Args:
+            message: Full text of the user turn to send
+            on_retry: Called with (attempt, delay, error) before each retry
+            on_wait: Called with (requests ahead, estimated seconds) while queued
+            priority: request_scheduler.INTERACTIVE or BULK (defaults by prompt size)
+
+        Returns:
+            Iterator of response chunks
+        """
+        user_turn = types.Content(role="user", parts=[types.Part(text=message)])
+        return self._stream(self.history_manager.build_contents() + [user_turn], on_retry, on_wait, priority)
+
+    def generate_content_stream(self, contents: list,
+                                on_retry: Optional[Callable[[int, float, BaseException], None]] = None,
+                                on_wait: Optional[Callable[[int, float], None]] = None,
+                                priority: Optional[int] = None) -> Iterator[StreamChunk]:
+        """Stream a one-off multimodal request (text and parts) that does not use the history"""
+        parts = [types.Part(text=item) if isinstance(item, str) else item for item in contents]
+        return self._stream([types.Content(role="user", parts=parts)], on_retry, on_wait, priority)
+
+    def generate_json(self, prompt: str) -> str:
+        """One-off request, outside the history, whose reply is constrained to JSON"""
+        config = types.GenerateContentConfig(response_mime_type="application/json")
+        return self._generate(prompt, INTERACTIVE, config)
+
+    def record_turn(self, user_turn: types.Content, model_turn: types.Content) -> None:
+        """Append a completed exchange to the history and compact old turns in the background"""
+        self.history.append(user_turn)
+        self.history.append(model_turn)
+        self.history_manager.maybe_compact()
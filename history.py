@@ -0,0 +1,225 @@
+"""
+Chat History Helpers for AI Chatbot Hub
+
+Keeps uploaded-file context out of the stored conversation. Only the latest
+context block is kept, user turns in the history only carry the question and a
+short reference to the files it used, and the full context is injected into the
+one request that needs it (plus, once, a follow-up after the files are removed).
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from google.genai import types
+
+from retrieval import estimate_tokens
+from env_config import get_env_int
+
+
+FILE_REFERENCE_PREFIX = "📎 Files referenced: "
+DEFAULT_WINDOW_TURNS = 6
+# Older turns are compacted in batches so the summarizer doesn't run after every message
+SUMMARY_BATCH_TURNS = 2
+
+# Summaries are produced off the request path, shared by all sessions in the process
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+
+
+def get_message_role(message) -> Optional[str]:
+    """Get the role of a history message (Content object or dict)"""
+    if hasattr(message, "role"):
+        return message.role
+    if isinstance(message, dict):
+        return message.get("role")
+    return None
+
+
+def get_message_text(message) -> str:
+    """Join the text parts of a history message (Content object or dict)"""
+    parts = []
+    if hasattr(message, "parts"):
+        parts = message.parts or []
+    elif isinstance(message, dict):
+        parts = message.get("parts", [])
+
+    texts = []
+    for part in parts:
+        text = part.text if hasattr(part, "text") else part.get("text") if isinstance(part, dict) else None
+        if text:
+            texts.append(text)
+    return "\n".join(texts)
+
+
+class FileContextStore:
+    """The latest file context block, kept only until a follow-up request has used it"""
+
+    def __init__(self):
+        self._block = None
+        self.last_context_id = None
+        self.total_bytes = 0
+
+    def add(self, context_text: str) -> str:
+        """
+        Store a context block, replacing the previous one
+
+        Args:
+            context_text: Formatted file context
+
+        Returns:
+            Context id of the block
+        """
+        self._block = context_text
+        self.last_context_id = hashlib.sha256(context_text.encode("utf-8")).hexdigest()[:12]
+        self.total_bytes = len(context_text)
+        return self.last_context_id
+
+    def get(self, context_id: Optional[str]) -> Optional[str]:
+        """Get the stored block if context_id is its id, otherwise None"""
+        return self._block if context_id and context_id == self.last_context_id else None
+
+    def take_last(self) -> Optional[str]:
+        """Get the last added block for one follow-up request and drop it"""
+        context_text = self._block
+        self.clear()
+        return context_text
+
+    def clear(self) -> None:
+        self._block = None
+        self.last_context_id = None
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return 0 if self._block is None else 1
+
+
+def build_user_turn(prompt: str, file_names: Optional[List[str]] = None) -> types.Content:
+    """
+    Build the user turn stored in history
+
+    Only the question and the names of the files it used are kept; the file
+    context itself lives in the FileContextStore.
+
+    Args:
+        prompt: The user's question
+        file_names: Names of the files whose context accompanied the question
+
+    Returns:
+        Content object for the history
+    """
+    text = prompt
+    if file_names:
+        text += f"\n\n{FILE_REFERENCE_PREFIX}{', '.join(file_names)}"
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def build_model_turn(response_text: str) -> types.Content:
+    """Build the model turn stored in history"""
+    return types.Content(role="model", parts=[types.Part(text=response_text)])
+
+
+def get_history_window_turns() -> int:
+    """
+    Get the number of recent turns sent verbatim
+
+    Returns:
+        Value of HISTORY_WINDOW_TURNS, or DEFAULT_WINDOW_TURNS
+    """
+    return get_env_int("HISTORY_WINDOW_TURNS", DEFAULT_WINDOW_TURNS)
+
+
+def build_summary_prompt(previous_summary: Optional[str], messages: List) -> str:
+    """Prompt asking the model to fold older turns into the running summary"""
+    transcript = "\n\n".join(
+        f"{'Assistant' if get_message_role(message) == 'model' else 'User'}: {get_message_text(message)}"
+        for message in messages
+    )
+    prompt = ("Update the running summary of a conversation between a user and an AI assistant. "
+              "Keep facts, decisions, file names, numbers and open questions; drop pleasantries. "
+              "Reply with the summary only, in at most 200 words.\n\n")
+    if previous_summary:
+        prompt += f"Current summary:\n{previous_summary}\n\n"
+    return prompt + f"New turns to add:\n{transcript}"
+
+
+class HistoryManager:
+    """
+    Rolling history window with a background running summary
+
+    The last window_turns exchanges are sent verbatim; older ones are compacted
+    into a summary computed in a background thread. Until a summary catches up,
+    the not-yet-summarized turns are still sent verbatim, so nothing is lost.
+    """
+
+    def __init__(self, history: List, summarize_fn: Callable[[str], str],
+                 window_turns: Optional[int] = None):
+        self.history = history
+        self.summarize_fn = summarize_fn
+        self.window_turns = window_turns or get_history_window_turns()
+        self.summary = None
+        self.summarized_upto = 0
+        self._token_counts = []
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def message_tokens(self, index: int) -> int:
+        """Estimated tokens of one history message, computed once per message"""
+        while len(self._token_counts) < len(self.history):
+            message = self.history[len(self._token_counts)]
+            self._token_counts.append(estimate_tokens(get_message_text(message)))
+        return self._token_counts[index]
+
+    def request_tokens(self) -> int:
+        """Estimated tokens of the history part of the next request"""
+        with self._lock:
+            summary, start = self.summary, self.summarized_upto
+        tokens = estimate_tokens(summary) if summary else 0
+        return tokens + sum(self.message_tokens(i) for i in range(start, len(self.history)))
+
+    def build_contents(self) -> List[types.Content]:
+        """
+        History to send with the next request
+
+        Returns:
+            Summary exchange (if any) followed by the turns not yet summarized
+        """
+        with self._lock:
+            summary, start = self.summary, self.summarized_upto
+        contents = []
+        if summary:
+            contents.append(types.Content(role="user", parts=[
+                types.Part(text=f"Summary of our earlier conversation:\n{summary}")
+            ]))
+            contents.append(types.Content(role="model", parts=[
+                types.Part(text="Understood, I'll keep that in mind.")
+            ]))
+        return contents + list(self.history[start:])
+
+    def maybe_compact(self) -> None:
+        """Start a background summary if enough turns have left the window"""
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return
+            end = len(self.history) - self.window_turns * 2
+            if end - self.summarized_upto < SUMMARY_BATCH_TURNS * 2:
+                return
+            start = self.summarized_upto
+            prompt = build_summary_prompt(self.summary, self.history[start:end])
+            self._pending = _summary_executor.submit(self._compact, prompt, start, end)
+
+    def _compact(self, prompt: str, start: int, end: int) -> None:
+        try:
+            summary = self.summarize_fn(prompt)
+        except Exception:
+            # Try again after the next turn; the turns are still sent verbatim meanwhile
+            return
+        if not summary:
+            return
+        with self._lock:
+            if self.summarized_upto == start:
+                self.summary = summary.strip()
+                self.summarized_upto = end
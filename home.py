@@ -49,7 +49,7 @@ def render_home_page():
         | 📄 Word Documents | `.docx` | Content review, insights |
         | 📊 Excel Files | `.xlsx, .xls` | Data analysis, statistics |
         | 📊 CSV Files | `.csv` | Pattern recognition, trends |
-        | 🔧 JSON Files | `.json` | Structure analysis, validation |
+        | 🔧 JSON Files | `.json, .ndjson, .jsonl` | Structure analysis, validation |
         | 🖼️ Images | `.jpg, .png, .gif` | Visual understanding, description |
         """)
     
@@ -0,0 +1,231 @@
+"""
+Image Preprocessing for AI Chatbot Hub
+
+Prepares uploaded images before they are sent to Gemini: images are downscaled
+to the resolution the model actually uses, re-encoded to compact JPEG/WebP
+without metadata, animated GIFs are reduced to a few sampled frames, and
+images whose prepared pixels are identical are sent only once.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import io
+import os
+import hashlib
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+from google.genai import types
+
+from utils import ProcessedFileCache, create_image_thumbnail, get_file_bytes
+from env_config import get_env_int
+
+
+DEFAULT_MAX_SIDE = 1536
+DEFAULT_FORMAT = "JPEG"
+DEFAULT_QUALITY = 85
+DEFAULT_GIF_FRAMES = 4
+
+FORMAT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# Prepared images are reused across messages; keyed by content hash and settings
+_prepared_cache = ProcessedFileCache(max_bytes=64 * 1024 * 1024, max_entries=256)
+# Preview thumbnails, keyed by content hash
+_thumbnail_cache = ProcessedFileCache(max_bytes=16 * 1024 * 1024, max_entries=1024)
+
+
+def get_image_pipeline_config() -> dict:
+    """
+    Get image preprocessing settings
+
+    IMAGE_MAX_SIDE, IMAGE_FORMAT (JPEG or WEBP), IMAGE_QUALITY and IMAGE_GIF_FRAMES
+    override the defaults.
+
+    Returns:
+        Dictionary with max_side, format, quality and gif_frames
+    """
+    image_format = os.getenv("IMAGE_FORMAT", DEFAULT_FORMAT).upper()
+    return {
+        "max_side": get_env_int("IMAGE_MAX_SIDE", DEFAULT_MAX_SIDE),
+        "format": image_format if image_format in FORMAT_MIME_TYPES else DEFAULT_FORMAT,
+        "quality": min(get_env_int("IMAGE_QUALITY", DEFAULT_QUALITY), 100),
+        "gif_frames": get_env_int("IMAGE_GIF_FRAMES", DEFAULT_GIF_FRAMES),
+    }
+
+
+def sample_frames(image: Image.Image, max_frames: int) -> List[Image.Image]:
+    """Evenly sample up to max_frames frames from an animated image"""
+    frame_count = getattr(image, "n_frames", 1)
+    if frame_count <= 1:
+        return [image]
+
+    count = min(max_frames, frame_count)
+    indexes = sorted({round(i * (frame_count - 1) / max(count - 1, 1)) for i in range(count)})
+    frames = []
+    try:
+        for index in indexes:
+            image.seek(index)
+            frames.append(image.convert("RGBA").copy())
+    finally:
+        image.seek(0)
+    return frames
+
+
+def encode_image(image: Image.Image, config: dict) -> bytes:
+    """
+    Downscale and re-encode an image without metadata
+
+    Args:
+        image: PIL image (a single frame)
+        config: Settings from get_image_pipeline_config
+
+    Returns:
+        Encoded image bytes
+    """
+    # Apply EXIF orientation before the metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > config["max_side"]:
+        image = image.copy()
+        image.thumbnail((config["max_side"], config["max_side"]), Image.Resampling.LANCZOS)
+
+    if config["format"] == "JPEG":
+        if image.mode in ("RGBA", "LA", "P"):
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    buffer = io.BytesIO()
+    # No exif/icc arguments are passed, so metadata is stripped
+    image.save(buffer, format=config["format"], quality=config["quality"], optimize=True)
+    return buffer.getvalue()
+
+
+def prepare_image(image: Image.Image, file_hash: Optional[str] = None,
+                  config: Optional[dict] = None) -> List[bytes]:
+    """
+    Prepare one uploaded image for the model
+
+    Args:
+        image: Decoded PIL image
+        file_hash: Content hash of the upload, used to cache the result
+        config: Settings from get_image_pipeline_config
+
+    Returns:
+        Encoded frames; animations have several
+    """
+    config = config or get_image_pipeline_config()
+    cache_key = f"{file_hash}:{sorted(config.items())}" if file_hash else None
+    if cache_key:
+        cached = _prepared_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    frames = [encode_image(frame, config) for frame in sample_frames(image, config["gif_frames"])]
+    if cache_key:
+        _prepared_cache.put(cache_key, frames)
+    return frames
+
+
+def prepare_images_for_model(images: List[Tuple[Image.Image, Optional[str], int]],
+                             config: Optional[dict] = None) -> Tuple[List[types.Part], dict]:
+    """
+    Prepare all uploaded images for a request, removing duplicates
+
+    Args:
+        images: List of (image, file_hash, original_size_bytes) tuples
+        config: Settings from get_image_pipeline_config
+
+    Returns:
+        Tuple of (parts to send, stats) where stats has images, frames,
+        duplicates, original_bytes and sent_bytes
+    """
+    config = config or get_image_pipeline_config()
+    mime_type = FORMAT_MIME_TYPES[config["format"]]
+    seen_content = set()
+    parts = []
+    stats = {"images": 0, "frames": 0, "duplicates": 0, "original_bytes": 0, "sent_bytes": 0}
+
+    for image, file_hash, original_size in images:
+        frames = prepare_image(image, file_hash, config)
+        # Encoding is deterministic, so the same pixels (even from another file format) give the same bytes
+        content_hash = hashlib.sha256(b"".join(frames)).hexdigest()
+        if content_hash in seen_content:
+            stats["duplicates"] += 1
+            continue
+        seen_content.add(content_hash)
+
+        stats["images"] += 1
+        stats["original_bytes"] += original_size
+        for frame in frames:
+            parts.append(types.Part.from_bytes(data=frame, mime_type=mime_type))
+            stats["frames"] += 1
+            stats["sent_bytes"] += len(frame)
+
+    return parts, stats
+
+
+def get_image_thumbnail(image: Image.Image, file_hash: str, store=None) -> bytes:
+    """
+    Get a small encoded preview of an uploaded image
+
+    Thumbnails are generated once per image content and looked up in memory, then
+    in the shared ArtifactStore, so reruns only send a few KB to the browser.
+
+    Args:
+        image: Decoded PIL image
+        file_hash: Content hash of the upload
+        store: Optional ArtifactStore shared across server processes
+
+    Returns:
+        JPEG thumbnail bytes
+    """
+    thumbnail = _find_thumbnail(file_hash, store)
+    if thumbnail is not None:
+        return thumbnail
+
+    thumbnail = create_image_thumbnail(image)
+    if store is not None:
+        try:
+            store.put_bytes(file_hash, "thumbnail.jpg", thumbnail)
+        except OSError:
+            pass
+    _thumbnail_cache.put(file_hash, thumbnail)
+    return thumbnail
+
+
+def _find_thumbnail(file_hash: str, store=None) -> Optional[bytes]:
+    """Cached thumbnail from memory, then from the store (kept in memory afterwards), or None"""
+    thumbnail = _thumbnail_cache.get(file_hash)
+    if thumbnail is None and store is not None:
+        thumbnail = store.get_bytes(file_hash, "thumbnail.jpg")
+        if thumbnail is not None:
+            _thumbnail_cache.put(file_hash, thumbnail)
+    return thumbnail
+
+
+def get_upload_thumbnail(uploaded_file, file_hash: str, store=None) -> bytes:
+    """
+    Get the preview thumbnail of an uploaded image before it is processed
+
+    The upload is only read and decoded if no thumbnail is cached for its content.
+
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        file_hash: Content hash of the upload
+        store: Optional ArtifactStore shared across server processes
+
+    Returns:
+        JPEG thumbnail bytes
+    """
+    thumbnail = _find_thumbnail(file_hash, store)
+    if thumbnail is not None:
+        return thumbnail
+    # Image.open only reads the header; pixels are decoded on first use
+    image = Image.open(io.BytesIO(get_file_bytes(uploaded_file)))
+    return get_image_thumbnail(image, file_hash, store)
@@ -0,0 +1,381 @@
+"""
+Streaming JSON Analysis for AI Chatbot Hub
+
+Reads JSON and NDJSON files incrementally without materializing the whole
+document. Top-level arrays and objects are decoded one item at a time, and so
+are arrays and objects nested directly under a top-level object, so wrapped
+documents like {"data": [...]} are streamed too. A schema summary (key
+frequencies, value types, array lengths) is built from a bounded sample, and
+the preview stops serializing once it is full.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import io
+import json
+from collections import Counter
+from itertools import islice
+from typing import Any, Iterator
+
+
+DEFAULT_CHUNK_CHARS = 1024 * 1024
+DEFAULT_SAMPLE_ITEMS = 1000
+DEFAULT_PREVIEW_CHARS = 2000
+MAX_SCHEMA_DEPTH = 6
+MAX_SCHEMA_PATHS = 40
+MAX_LISTED_KEYS = 50
+
+_decoder = json.JSONDecoder()
+_encoder = json.JSONEncoder(ensure_ascii=False)
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+def json_type_name(value: Any) -> str:
+    """JSON type name of a decoded value"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    return "object"
+
+
+class JsonTokenStream:
+    """Incremental reader that decodes one JSON value at a time from a text stream"""
+
+    def __init__(self, stream, chunk_chars: int = DEFAULT_CHUNK_CHARS):
+        self.stream = stream
+        self.chunk_chars = chunk_chars
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        data = self.stream.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at end of input)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof or not self._fill(self.chunk_chars):
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Consume a structural character, failing if something else comes next"""
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        read_size = self.chunk_chars
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number followed by the buffer end or a partial fraction/exponent
+                # ("12." or "1e") may continue in the next chunk
+                is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                cut_off = end == len(self.buffer) or (is_number and self.buffer[end] in _NUMBER_CHARS)
+                if self.eof or not cut_off:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(read_size)
+            read_size *= 2
+
+
+class SchemaSummary:
+    """Key frequencies, value types and array lengths collected from sampled values"""
+
+    def __init__(self, max_depth: int = MAX_SCHEMA_DEPTH, max_children: int = DEFAULT_SAMPLE_ITEMS):
+        self.max_depth = max_depth
+        self.max_children = max_children
+        self.samples = 0
+        self.paths = {}
+
+    def add(self, value: Any, path: str = "$") -> None:
+        """Record one sampled item"""
+        self.samples += 1
+        self._visit(value, path, 0)
+
+    def record(self, path: str, type_name: str) -> None:
+        """Record a value seen at path without walking it (e.g. a streamed container)"""
+        entry = self.paths.get(path)
+        if entry is None:
+            entry = self.paths[path] = {"count": 0, "types": Counter(), "lengths": None}
+        entry["count"] += 1
+        entry["types"][type_name] += 1
+
+    def record_length(self, path: str, length: int) -> None:
+        """Record the length of an array seen at path"""
+        entry = self.paths[path]
+        lengths = entry["lengths"] or [length, length, 0, 0]
+        lengths[0] = min(lengths[0], length)
+        lengths[1] = max(lengths[1], length)
+        lengths[2] += length
+        lengths[3] += 1
+        entry["lengths"] = lengths
+
+    def _visit(self, value: Any, path: str, depth: int) -> None:
+        self.record(path, json_type_name(value))
+        if isinstance(value, list):
+            self.record_length(path, len(value))
+        if depth >= self.max_depth:
+            return
+        # Only the first children of large containers are walked
+        if isinstance(value, dict):
+            for key, child in islice(value.items(), self.max_children):
+                self._visit(child, f"{path}.{key}", depth + 1)
+        elif isinstance(value, list):
+            for child in islice(value, self.max_children):
+                self._visit(child, f"{path}[]", depth + 1)
+
+    def format(self, limit: int = MAX_SCHEMA_PATHS) -> str:
+        """Schema lines in the order paths were first seen"""
+        lines = []
+        ordered = list(self.paths.items())
+        for path, entry in ordered[:limit]:
+            types = "/".join(name for name, _ in entry["types"].most_common())
+            line = f"  - {path}: {types} (seen {entry['count']:,}x)"
+            if entry["lengths"]:
+                shortest, longest, total, arrays = entry["lengths"]
+                line += f", length {shortest}-{longest} (avg {total / arrays:.1f})"
+            lines.append(line)
+        if len(ordered) > limit:
+            lines.append(f"  - ... {len(ordered) - limit} more paths")
+        return "\n".join(lines)
+
+
+def _iter_container(tokens: JsonTokenStream, descend: bool = False) -> Iterator[tuple]:
+    """
+    Yield the entries of the array or object at the current position
+
+    Yields ("item", None, value) for array items and ("key", key, value) for
+    object members. With descend, an array or object member value is not decoded:
+    ("container", key, "[" or "{") is yielded instead, and the caller must
+    consume it with _iter_container before the next entry is read.
+    """
+    opening = tokens.peek()
+    closing = "]" if opening == "[" else "}"
+    tokens.expect(opening)
+    if tokens.peek() == closing:
+        tokens.pos += 1
+        return
+    while True:
+        if opening == "[":
+            yield "item", None, tokens.decode_value()
+        else:
+            key = tokens.decode_value()
+            tokens.expect(":")
+            nested = tokens.peek()
+            if descend and nested in ("[", "{"):
+                yield "container", key, nested
+            else:
+                yield "key", key, tokens.decode_value()
+        if tokens.peek() == ",":
+            tokens.pos += 1
+            continue
+        tokens.expect(closing)
+        return
+
+
+def _iter_root(tokens: JsonTokenStream, descend: bool = False) -> Iterator[tuple]:
+    """Like _iter_container, plus ("value", None, value) for a scalar root"""
+    first = tokens.peek()
+    if not first:
+        raise json.JSONDecodeError("Expecting value", tokens.buffer, tokens.pos)
+    if first in ("[", "{"):
+        yield from _iter_container(tokens, descend)
+    else:
+        yield "value", None, tokens.decode_value()
+
+
+def _iter_document(tokens: JsonTokenStream, descend: bool = False) -> Iterator[tuple]:
+    """Like _iter_root, but fails on trailing data after the root value"""
+    yield from _iter_root(tokens, descend)
+    if tokens.peek():
+        raise json.JSONDecodeError("Extra data", tokens.buffer, tokens.pos)
+
+
+def _render_preview(value: Any, limit: int) -> str:
+    """Serialize a value as one-line JSON, stopping once more than limit characters are produced"""
+    parts = []
+    length = 0
+    for part in _encoder.iterencode(value):
+        parts.append(part)
+        length += len(part)
+        if length > limit:
+            return "".join(parts)[:limit] + "\n..."
+    return "".join(parts)
+
+
+def analyze_json(stream, ndjson: bool = False, sample_items: int = DEFAULT_SAMPLE_ITEMS,
+                 preview_chars: int = DEFAULT_PREVIEW_CHARS) -> dict:
+    """
+    Analyze a JSON or NDJSON document incrementally
+
+    Every top-level item is decoded once (to count it) but only the first
+    sample_items feed the schema and preview, so memory stays bounded. Arrays
+    and objects directly under a top-level object are streamed item by item.
+
+    Args:
+        stream: Binary or text file-like object
+        ndjson: Treat the input as newline-delimited JSON
+        sample_items: Number of items used for the schema
+        preview_chars: Maximum length of the preview
+
+    Returns:
+        Dictionary with root_type, item_count, keys (object roots, first keys only),
+        nested (streamed member of an object root -> (type, item count)),
+        invalid_lines (NDJSON), schema (SchemaSummary), sampled_all, preview
+        and preview_items
+    """
+    wrapper = None
+    if not isinstance(stream, io.TextIOBase):
+        stream = wrapper = io.TextIOWrapper(stream, encoding="utf-8-sig")
+
+    schema = SchemaSummary()
+    preview_parts = []
+    preview_length = 0
+    preview_items = 0
+    item_count = 0
+    seen_values = 0
+    invalid_lines = 0
+    keys = []
+    nested = {}
+
+    def add_preview(text):
+        nonlocal preview_length
+        preview_parts.append(text)
+        preview_length += len(text) + 1
+
+    def sample(value, path="$", label=None, prefix=""):
+        nonlocal seen_values
+        seen_values += 1
+        if schema.samples < sample_items:
+            schema.add(value, path)
+        if preview_length < preview_chars:
+            # One compact line per item fits many more items into the preview than indented JSON
+            rendered = _render_preview(value if label is None else {label: value},
+                                       preview_chars - preview_length - len(prefix))
+            add_preview(prefix + rendered)
+            return True
+        return False
+
+    try:
+        if ndjson:
+            root_type = "ndjson"
+            for line in stream:
+                if not line.strip():
+                    continue
+                try:
+                    value = json.loads(line)
+                except json.JSONDecodeError:
+                    invalid_lines += 1
+                    continue
+                item_count += 1
+                preview_items += sample(value)
+        else:
+            tokens = JsonTokenStream(stream)
+            root_type = {"[": "array", "{": "object"}.get(tokens.peek())
+            for kind, key, value in _iter_document(tokens, descend=True):
+                item_count += 1
+                if kind in ("key", "container") and len(keys) < MAX_LISTED_KEYS:
+                    keys.append(key)
+                if kind == "container":
+                    # A wrapped array/object: stream its entries instead of decoding it whole
+                    path = f"$.{key}"
+                    container_type = "array" if value == "[" else "object"
+                    schema.record(path, container_type)
+                    if preview_length < preview_chars:
+                        add_preview(json.dumps(key, ensure_ascii=False) + ": " + value)
+                        preview_items += 1
+                    count = 0
+                    for _, child_key, child in _iter_container(tokens):
+                        count += 1
+                        if child_key is None:
+                            sample(child, f"{path}[]", prefix="  ")
+                        else:
+                            sample(child, f"{path}.{child_key}",
+                                   prefix=f"  {json.dumps(child_key, ensure_ascii=False)}: ")
+                    if container_type == "array":
+                        schema.record_length(path, count)
+                    nested[key] = (container_type, count)
+                elif kind == "key":
+                    preview_items += sample(value, f"$.{key}", key)
+                else:
+                    if kind == "value":
+                        root_type = json_type_name(value)
+                    preview_items += sample(value)
+    finally:
+        # Don't let the wrapper close the caller's file when it is collected
+        if wrapper is not None:
+            wrapper.detach()
+
+    return {
+        "root_type": root_type,
+        "item_count": item_count,
+        "keys": keys,
+        "nested": nested,
+        "invalid_lines": invalid_lines,
+        "schema": schema,
+        "sampled_all": schema.samples >= seen_values,
+        "preview": "\n".join(preview_parts),
+        "preview_items": preview_items,
+    }
+
+
+def format_json_analysis(analysis: dict, sample_items: int = DEFAULT_SAMPLE_ITEMS) -> str:
+    """
+    Format the structure analysis section of a JSON summary
+
+    Args:
+        analysis: Result of analyze_json
+        sample_items: Sample size used for the schema
+
+    Returns:
+        Structure analysis text
+    """
+    root_type, count = analysis["root_type"], analysis["item_count"]
+    content = "Structure Analysis:\n"
+    if root_type == "ndjson":
+        content += f"- Root type: NDJSON with {count:,} records\n"
+        if analysis["invalid_lines"]:
+            content += f"- Invalid lines skipped: {analysis['invalid_lines']:,}\n"
+    elif root_type == "array":
+        content += f"- Root type: Array with {count:,} items\n"
+    elif root_type == "object":
+        content += f"- Root type: Dictionary with {count:,} keys\n"
+        more = f" (first {MAX_LISTED_KEYS})" if count > MAX_LISTED_KEYS else ""
+        content += f"- Keys{more}: {analysis['keys']}\n"
+        for key, (container_type, items) in analysis.get("nested", {}).items():
+            unit = "items" if container_type == "array" else "keys"
+            content += f"- $.{key}: {container_type} with {items:,} {unit}\n"
+    else:
+        content += f"- Root type: {root_type}\n"
+
+    if analysis["schema"].paths:
+        sampled = "all items" if analysis["sampled_all"] else f"first {sample_items:,} items"
+        content += f"- Schema (from {sampled}):\n{analysis['schema'].format()}\n"
+    return content
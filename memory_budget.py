@@ -0,0 +1,177 @@
+"""
+Session Memory Accounting for AI Chatbot Hub
+
+Tracks the approximate memory each browser session holds in st.session_state
+(chat history, processed files, file context blocks, retrieval index) and keeps
+sessions under a per-session and a process-wide cap. When a cap is exceeded,
+the least recently used processed files of uploads no longer in the session are
+evicted - text results are still in the ArtifactStore and images are re-decoded
+from the upload, so they are reloaded on demand. History, the current uploads,
+the latest file context block and the retrieval index are counted but never
+evicted.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import time
+import threading
+import weakref
+from typing import Optional
+
+from history import get_message_text
+from env_config import get_env_int
+
+
+DEFAULT_SESSION_MEMORY_MB = 256
+DEFAULT_PROCESS_MEMORY_MB = 1024
+# Sessions that haven't reported for this long are assumed gone
+SESSION_RECORD_TTL_SECONDS = 3600
+
+
+def _get_limit_mb(name: str, default: int) -> int:
+    return get_env_int(name, default) * 1024 * 1024
+
+
+def get_session_memory_limit() -> int:
+    """
+    Get the memory cap per session
+
+    Returns:
+        Value of SESSION_MEMORY_MAX_MB in bytes, or DEFAULT_SESSION_MEMORY_MB
+    """
+    return _get_limit_mb("SESSION_MEMORY_MAX_MB", DEFAULT_SESSION_MEMORY_MB)
+
+
+def get_process_memory_limit() -> int:
+    """
+    Get the memory cap for all sessions of the server process
+
+    Returns:
+        Value of PROCESS_MEMORY_MAX_MB in bytes, or DEFAULT_PROCESS_MEMORY_MB
+    """
+    return _get_limit_mb("PROCESS_MEMORY_MAX_MB", DEFAULT_PROCESS_MEMORY_MB)
+
+
+def measure_session(state) -> dict:
+    """
+    Estimate the memory held by one session's state
+
+    Args:
+        state: st.session_state (or any mapping with the same keys)
+
+    Returns:
+        Dictionary of approximate bytes for history, files, file_context and retrieval_index
+    """
+    file_cache = state.get("file_cache")
+    context_store = state.get("file_context_store")
+    retrieval_index = state.get("retrieval_index")
+    return {
+        "history": sum(len(get_message_text(message)) for message in state.get("history") or []),
+        "files": file_cache.current_bytes if file_cache is not None else 0,
+        "file_context": context_store.total_bytes if context_store is not None else 0,
+        "retrieval_index": retrieval_index.estimated_bytes() if retrieval_index is not None else 0,
+    }
+
+
+class _SessionRecord:
+    """Last measured usage of a session plus weak references to its stores"""
+
+    def __init__(self):
+        self.usage = {}
+        self.last_active = 0.0
+        self.file_cache = None
+        self.context_store = None
+        self.active_hashes = frozenset()
+
+    @property
+    def total(self) -> int:
+        return sum(self.usage.values())
+
+    def trim(self, excess: int) -> int:
+        """Free up to excess bytes of processed files other than the current uploads; returns bytes freed"""
+        freed = 0
+        file_cache = self.file_cache() if self.file_cache else None
+        if file_cache is not None and excess > 0:
+            freed += file_cache.shrink(max(0, file_cache.current_bytes - excess), self.active_hashes)
+            self.usage["files"] = file_cache.current_bytes
+        return freed
+
+
+class MemoryAccountant:
+    """Approximate session memory across the server process, with per-session and global caps"""
+
+    def __init__(self, session_limit: Optional[int] = None, process_limit: Optional[int] = None):
+        self.session_limit = session_limit
+        self.process_limit = process_limit
+        self.evicted_bytes = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def update(self, session_id: str, state) -> dict:
+        """
+        Measure a session, then enforce the session and process caps
+
+        Call from the session's own script run; other sessions are only trimmed
+        through their thread-safe file caches. Processed files of the uploads
+        listed in state["active_file_hashes"] are never evicted, since every
+        rerun uses them.
+
+        Args:
+            session_id: Stable id of the browser session
+            state: The session's st.session_state
+
+        Returns:
+            The session's usage dictionary after eviction
+        """
+        session_limit = self.session_limit or get_session_memory_limit()
+        process_limit = self.process_limit or get_process_memory_limit()
+
+        record = _SessionRecord()
+        file_cache = state.get("file_cache")
+        context_store = state.get("file_context_store")
+        record.file_cache = weakref.ref(file_cache) if file_cache is not None else None
+        record.context_store = weakref.ref(context_store) if context_store is not None else None
+        record.active_hashes = frozenset(state.get("active_file_hashes") or ())
+        record.usage = measure_session(state)
+        record.last_active = time.monotonic()
+
+        # Per-session cap
+        excess = record.total - session_limit
+        if excess > 0:
+            self.evicted_bytes += record.trim(excess)
+
+        with self._lock:
+            self._sessions[session_id] = record
+            self._drop_stale()
+            # Process cap: trim the least recently active sessions first (this one last)
+            excess = sum(other.total for other in self._sessions.values()) - process_limit
+            if excess > 0:
+                for other in sorted(self._sessions.values(), key=lambda item: item.last_active):
+                    freed = other.trim(excess)
+                    self.evicted_bytes += freed
+                    excess -= freed
+                    if excess <= 0:
+                        break
+        return dict(record.usage)
+
+    def _drop_stale(self) -> None:
+        now = time.monotonic()
+        for session_id, record in list(self._sessions.items()):
+            refs = [ref for ref in (record.file_cache, record.context_store) if ref is not None]
+            gone = refs and all(ref() is None for ref in refs)
+            if gone or now - record.last_active > SESSION_RECORD_TTL_SECONDS:
+                del self._sessions[session_id]
+
+    def total_bytes(self) -> int:
+        """Approximate memory held by all known sessions"""
+        with self._lock:
+            return sum(record.total for record in self._sessions.values())
+
+    def session_count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+# One accountant per server process, shared by all sessions
+memory_accountant = MemoryAccountant()
@@ -0,0 +1,225 @@
+"""
+PDF Extraction Engine for AI Chatbot Hub
+
+Page-level PDF text extraction with a per-page cache, page-range parallelism
+across the shared process pool for large documents, and a lazy document wrapper
+that only extracts the pages that are actually requested.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple, Union
+
+import PyPDF2
+
+from worker_pools import get_executor, discard_executor, get_max_workers, in_worker_process
+from upload_spool import MappedFile, as_binary_stream, as_buffer, spool_bytes
+
+
+# Documents with fewer uncached pages than this are extracted serially
+PARALLEL_PAGE_THRESHOLD = 32
+
+
+class PdfPageCache:
+    """Size-bounded LRU cache of extracted page text keyed by (file hash, page number)"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_hash: str, page_number: int) -> Optional[str]:
+        """Return cached text for a page, or None on a miss"""
+        with self._lock:
+            key = (file_hash, page_number)
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, file_hash: str, page_number: int, text: str) -> None:
+        """Cache text for a page, evicting least recently used pages as needed"""
+        key = (file_hash, page_number)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= len(self._entries.pop(key))
+            self._entries[key] = text
+            self.current_bytes += len(text)
+            while self._entries and self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+page_cache = PdfPageCache()
+
+
+def _extract_page_range(data: Union[bytes, MappedFile], start: int, stop: int) -> List[str]:
+    """Extract text for pages [start, stop) (0-based); module-level so it can run in a worker"""
+    reader = PyPDF2.PdfReader(as_binary_stream(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _split_ranges(indexes: List[int], chunk_count: int) -> List[Tuple[int, int]]:
+    """Group sorted page indexes into at most chunk_count contiguous [start, stop) ranges"""
+    runs = []
+    for index in indexes:
+        if runs and runs[-1][1] == index:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+
+    chunk_size = max(1, -(-len(indexes) // chunk_count))
+    ranges = []
+    for start, stop in runs:
+        for chunk_start in range(start, stop, chunk_size):
+            ranges.append((chunk_start, min(chunk_start + chunk_size, stop)))
+    return ranges
+
+
+class PdfDocument:
+    """Lazily extracted PDF document; pages are only parsed when requested"""
+
+    def __init__(self, data: Union[bytes, MappedFile], file_hash: Optional[str] = None,
+                 cache: Optional[PdfPageCache] = page_cache):
+        # A MappedFile is read in place and reaches worker processes as a path
+        self.data = data
+        self.file_hash = file_hash or hashlib.sha256(as_buffer(data)).hexdigest()
+        self.cache = cache
+        self._reader = None
+
+    @property
+    def reader(self) -> PyPDF2.PdfReader:
+        if self._reader is None:
+            self._reader = PyPDF2.PdfReader(as_binary_stream(self.data))
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        return len(self.reader.pages)
+
+    def get_page(self, page_number: int) -> str:
+        """
+        Get the text of a single page
+
+        Args:
+            page_number: 1-based page number
+
+        Returns:
+            Extracted page text
+        """
+        if self.cache is not None:
+            text = self.cache.get(self.file_hash, page_number)
+            if text is not None:
+                return text
+
+        text = self.reader.pages[page_number - 1].extract_text() or ""
+        if self.cache is not None:
+            self.cache.put(self.file_hash, page_number, text)
+        return text
+
+    def iter_pages(self, page_numbers: Optional[List[int]] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) pairs, extracting each page on demand"""
+        if page_numbers is None:
+            page_numbers = range(1, self.page_count + 1)
+        for page_number in page_numbers:
+            yield page_number, self.get_page(page_number)
+
+    def stream_pages(self, page_numbers: Optional[List[int]] = None,
+                     max_workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) pairs in page order as soon as they are extracted
+
+        Pages are extracted one at a time when only one worker is available, and
+        otherwise in batches large enough to be split across the process pool.
+
+        Args:
+            page_numbers: 1-based page numbers to extract (defaults to all pages)
+            max_workers: Concurrency cap (defaults to get_max_workers())
+        """
+        if page_numbers is None:
+            page_numbers = list(range(1, self.page_count + 1))
+        page_numbers = sorted(set(page_numbers))
+
+        max_workers = max_workers or get_max_workers()
+        if max_workers <= 1 or in_worker_process():
+            yield from self.iter_pages(page_numbers)
+            return
+
+        batch_size = PARALLEL_PAGE_THRESHOLD * max_workers
+        for start in range(0, len(page_numbers), batch_size):
+            yield from self.extract_pages(page_numbers[start:start + batch_size], max_workers)
+
+    def extract_pages(self, page_numbers: Optional[List[int]] = None,
+                      max_workers: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Extract several pages, splitting uncached pages across the process pool
+
+        Args:
+            page_numbers: 1-based page numbers to extract (defaults to all pages)
+            max_workers: Concurrency cap (defaults to get_max_workers())
+
+        Returns:
+            List of (page_number, text) tuples in page order
+        """
+        if page_numbers is None:
+            page_numbers = list(range(1, self.page_count + 1))
+        page_numbers = sorted(set(page_numbers))
+
+        texts = {}
+        missing = []
+        for page_number in page_numbers:
+            text = self.cache.get(self.file_hash, page_number) if self.cache is not None else None
+            if text is None:
+                missing.append(page_number - 1)
+            else:
+                texts[page_number] = text
+
+        max_workers = max_workers or get_max_workers()
+        # Worker processes already run one file each - don't nest pools inside them
+        if len(missing) >= PARALLEL_PAGE_THRESHOLD and max_workers > 1 and not in_worker_process():
+            extracted = self._extract_parallel(missing, max_workers)
+        else:
+            extracted = [(index, self.reader.pages[index].extract_text() or "") for index in missing]
+
+        for index, text in extracted:
+            texts[index + 1] = text
+            if self.cache is not None:
+                self.cache.put(self.file_hash, index + 1, text)
+
+        return [(page_number, texts[page_number]) for page_number in page_numbers]
+
+    def _extract_parallel(self, indexes: List[int], max_workers: int) -> List[Tuple[int, str]]:
+        ranges = _split_ranges(indexes, max_workers * 2)
+        try:
+            # Spooled once per document, so each range is sent to its worker as a path, not a copy
+            if not isinstance(self.data, MappedFile):
+                self.data = spool_bytes(self.data, self.file_hash)
+            executor = get_executor("process", max_workers)
+            futures = [executor.submit(_extract_page_range, self.data, start, stop) for start, stop in ranges]
+            extracted = []
+            for (start, _), future in zip(ranges, futures):
+                extracted.extend(enumerate(future.result(), start))
+            return extracted
+        except (BrokenProcessPool, OSError, RuntimeError):
+            discard_executor("process", max_workers)
+            return [(index, self.reader.pages[index].extract_text() or "") for index in indexes]
+
+
+def format_pdf_pages(pages: List[Tuple[int, str]]) -> str:
+    """
+    Build the processed PDF text from extracted pages
+
+    Args:
+        pages: List of (page_number, text) tuples
+
+    Returns:
+        Page-delimited text; empty pages are skipped
+    """
+    return "".join(f"--- Page {page_number} ---\n{text}\n\n"
+                   for page_number, text in pages if text.strip())
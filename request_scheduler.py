@@ -0,0 +1,263 @@
+"""
+Rate-Aware Request Scheduling for AI Chatbot Hub
+
+All sessions of a server process share one Gemini API key, so requests are
+admitted through one scheduler per client instead of hitting the API
+independently. Token buckets keep requests/min and tokens/min under the quota;
+waiting requests are ordered so short interactive prompts go before bulk
+multi-file analysis, and sessions take turns so one heavy user can't starve
+the others. Token estimates are reconciled with the usage reported by the API,
+and a 429 drains the buckets so every session backs off together.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import time
+import itertools
+import threading
+import weakref
+from typing import Callable, Iterator, Optional
+
+from env_config import get_env_int
+
+
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = 250_000
+# Output tokens reserved per request until the API reports actual usage
+EXPECTED_OUTPUT_TOKENS = 1000
+# Prompts up to this many tokens count as interactive
+SHORT_PROMPT_TOKENS = 2000
+# Bulk requests waiting longer than this are served like interactive ones
+BULK_PROMOTION_SECONDS = 30.0
+DEFAULT_QUEUE_TIMEOUT = 120.0
+POLL_INTERVAL = 0.5
+MAX_TRACKED_SESSIONS = 1000
+
+INTERACTIVE = 0
+BULK = 1
+
+
+def get_requests_per_minute() -> int:
+    """
+    Get the request quota per minute for one API key
+
+    Returns:
+        Value of GEMINI_REQUESTS_PER_MINUTE, or DEFAULT_REQUESTS_PER_MINUTE
+    """
+    return get_env_int("GEMINI_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)
+
+
+def get_tokens_per_minute() -> int:
+    """
+    Get the token quota per minute for one API key
+
+    Returns:
+        Value of GEMINI_TOKENS_PER_MINUTE, or DEFAULT_TOKENS_PER_MINUTE
+    """
+    return get_env_int("GEMINI_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE)
+
+
+class QueueTimeoutError(RuntimeError):
+    """Raised when a request waited too long for a slot"""
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to one minute's worth; not thread-safe on its own"""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (amounts above capacity wait for a full bucket)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Remove amount; the level may go negative when actual usage exceeds the estimate"""
+        self._refill()
+        self.level -= amount
+
+    def drain(self) -> None:
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class Ticket:
+    """One request waiting for, or holding, a slot"""
+
+    def __init__(self, scheduler: "RequestScheduler", session_id: str, tokens: int,
+                 priority: int, sequence: int):
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.tokens = tokens
+        self.priority = priority
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.admitted_at = None
+
+    def finish(self, actual_tokens: Optional[int] = None, rate_limited: bool = False) -> None:
+        """
+        Report the outcome of the request
+
+        Args:
+            actual_tokens: Total tokens reported by the API (corrects the estimate)
+            rate_limited: The API answered 429 despite scheduling
+        """
+        self.scheduler._settle(self, actual_tokens, rate_limited)
+
+
+class RequestScheduler:
+    """Admits API requests within requests/min and tokens/min limits, fairly across sessions"""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests = TokenBucket(requests_per_minute or get_requests_per_minute())
+        self.tokens = TokenBucket(tokens_per_minute or get_tokens_per_minute())
+        self.admitted = 0
+        self.rate_limited = 0
+        self._waiting = []
+        self._last_served = {}
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _order(self, ticket: Ticket, now: float) -> tuple:
+        priority = ticket.priority
+        if priority == BULK and now - ticket.enqueued_at > BULK_PROMOTION_SECONDS:
+            priority = INTERACTIVE
+        # Within a priority, the session served longest ago goes first
+        return priority, self._last_served.get(ticket.session_id, 0.0), ticket.sequence
+
+    def _position(self, ticket: Ticket, now: float) -> int:
+        own = self._order(ticket, now)
+        return sum(1 for other in self._waiting if self._order(other, now) < own)
+
+    def acquire(self, session_id: str, tokens: int, priority: Optional[int] = None,
+                on_wait: Optional[Callable[[int, float], None]] = None,
+                timeout: float = DEFAULT_QUEUE_TIMEOUT) -> Ticket:
+        """
+        Wait for a slot to send a request
+
+        Args:
+            session_id: Session making the request (for fair queuing)
+            tokens: Estimated prompt tokens
+            priority: INTERACTIVE or BULK (defaults by prompt size)
+            on_wait: Called from the waiting thread with (requests ahead, estimated
+                seconds) whenever the position or estimate changes
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            Ticket to finish() once the response is complete
+
+        Raises:
+            QueueTimeoutError: If no slot became free in time
+        """
+        if priority is None:
+            priority = INTERACTIVE if tokens <= SHORT_PROMPT_TOKENS else BULK
+        cost = tokens + EXPECTED_OUTPUT_TOKENS
+
+        with self._cond:
+            ticket = Ticket(self, session_id, cost, priority, next(self._sequence))
+            self._waiting.append(ticket)
+        deadline = ticket.enqueued_at + timeout
+        reported = None
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    ahead = self._position(ticket, now)
+                    if ahead == 0:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(cost)
+                            self._waiting.remove(ticket)
+                            self._last_served[session_id] = now
+                            if len(self._last_served) > MAX_TRACKED_SESSIONS:
+                                self._forget_idle_sessions(now)
+                            self.admitted += 1
+                            ticket.admitted_at = now
+                            self._cond.notify_all()
+                            return ticket
+                    else:
+                        wait = None
+                    if now >= deadline:
+                        raise QueueTimeoutError(f"No request slot within {timeout:.0f}s "
+                                                f"({ahead} request(s) ahead)")
+                if on_wait is not None and (ahead, wait and round(wait)) != reported:
+                    # Outside the lock: the callback may redraw UI
+                    reported = (ahead, wait and round(wait))
+                    on_wait(ahead, wait or 0.0)
+                with self._cond:
+                    self._cond.wait(min(wait or POLL_INTERVAL, POLL_INTERVAL, max(0.0, deadline - now)))
+        except BaseException:
+            with self._cond:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+            raise
+
+    def _forget_idle_sessions(self, now: float) -> None:
+        # A session idle this long would be served first anyway
+        waiting = {ticket.session_id for ticket in self._waiting}
+        for session_id, served_at in list(self._last_served.items()):
+            if session_id not in waiting and now - served_at > DEFAULT_QUEUE_TIMEOUT:
+                del self._last_served[session_id]
+
+    def _settle(self, ticket: Ticket, actual_tokens: Optional[int], rate_limited: bool) -> None:
+        with self._cond:
+            if actual_tokens is not None:
+                self.tokens.take(actual_tokens - ticket.tokens)
+            if rate_limited:
+                # The quota is tighter than configured (or shared); everyone backs off
+                self.rate_limited += 1
+                self.requests.drain()
+                self.tokens.drain()
+            self._cond.notify_all()
+
+
+def metered(ticket: Ticket, stream: Iterator) -> Iterator:
+    """
+    Pass a response stream through, then report its token usage to the scheduler
+
+    Args:
+        ticket: Ticket the request was admitted with
+        stream: Response chunks from the API
+
+    Yields:
+        The chunks unchanged
+    """
+    usage = None
+    rate_limited = False
+    try:
+        for chunk in stream:
+            total = getattr(getattr(chunk, "usage_metadata", None), "total_token_count", None)
+            if total:
+                usage = total
+            yield chunk
+    except Exception as e:
+        rate_limited = getattr(e, "code", None) == 429
+        raise
+    finally:
+        ticket.finish(usage, rate_limited)
+
+
+_schedulers = weakref.WeakKeyDictionary()
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(client) -> RequestScheduler:
+    """Scheduler shared by every session using the same client (i.e. the same API key)"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(client)
+        if scheduler is None:
+            scheduler = _schedulers[client] = RequestScheduler()
+        return scheduler
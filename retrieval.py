@@ -0,0 +1,225 @@
+"""
+Document Retrieval for AI Chatbot Hub
+
+Splits processed file content into chunks that follow the document's own
+structure (PDF pages, Word paragraphs, spreadsheet rows) and ranks them against
+the user's question with a local BM25 index, so each prompt only carries the
+parts of the uploaded files that are relevant to it.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import re
+import math
+from collections import Counter, defaultdict
+from typing import List, Optional, Tuple
+
+from utils import split_pdf_pages, TABLE_FILE_TYPES
+
+
+DEFAULT_CHUNK_CHARS = 1500
+DEFAULT_TOP_K = 8
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+SHEET_PATTERN = re.compile(r"^--- Sheet: (.+) ---$", re.MULTILINE)
+WORD_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for indexing and querying"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough model token count (about 4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def chunk_tokens(chunk: dict) -> int:
+    """Estimated token count of a chunk, computed once and cached on the chunk"""
+    tokens = chunk.get("tokens")
+    if tokens is None:
+        tokens = chunk["tokens"] = estimate_tokens(chunk["text"])
+    return tokens
+
+
+def _group_units(units: List[str], max_chars: int, separator: str = "\n") -> List[str]:
+    """Pack consecutive units (paragraphs, rows) into chunks of at most max_chars"""
+    chunks = []
+    current = []
+    current_length = 0
+    for unit in units:
+        if not unit.strip():
+            continue
+        # Hard-split units that are larger than a whole chunk
+        while len(unit) > max_chars:
+            if current:
+                chunks.append(separator.join(current))
+                current, current_length = [], 0
+            chunks.append(unit[:max_chars])
+            unit = unit[max_chars:]
+        if current and current_length + len(unit) + len(separator) > max_chars:
+            chunks.append(separator.join(current))
+            current, current_length = [], 0
+        current.append(unit)
+        current_length += len(unit) + len(separator)
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_file_content(name: str, file_type: str, content: str,
+                       max_chars: int = DEFAULT_CHUNK_CHARS) -> List[dict]:
+    """
+    Split processed file content into retrieval chunks
+
+    PDF chunks never cross page boundaries, Word chunks are built from whole
+    paragraphs and table rows, and spreadsheet chunks from whole rows of a sheet.
+
+    Args:
+        name: File name
+        file_type: MIME type of the file
+        content: Processed text content
+        max_chars: Maximum characters per chunk
+
+    Returns:
+        List of {"file", "label", "text"} dictionaries in document order
+    """
+    chunks = []
+
+    if file_type == "application/pdf":
+        for page in split_pdf_pages(content):
+            for text in _group_units(page["text"].split("\n"), max_chars):
+                chunks.append({"file": name, "label": f"Page {page['page']}", "text": text})
+
+    elif file_type in TABLE_FILE_TYPES:
+        sections = [(match.group(1), match.start(), match.end()) for match in SHEET_PATTERN.finditer(content)]
+        if not sections or sections[0][1] > 0:
+            # Text before the first sheet (or a CSV summary without sheets)
+            sections.insert(0, (None, 0, 0))
+        for i, (sheet, _, start) in enumerate(sections):
+            end = sections[i + 1][1] if i + 1 < len(sections) else len(content)
+            label = f"Sheet {sheet}" if sheet else "Table"
+            for text in _group_units(content[start:end].split("\n"), max_chars):
+                chunks.append({"file": name, "label": label, "text": text})
+
+    elif file_type == WORD_TYPE:
+        for text in _group_units(content.split("\n"), max_chars):
+            chunks.append({"file": name, "label": "Paragraphs", "text": text})
+
+    else:
+        paragraphs = re.split(r"\n\s*\n", content)
+        for text in _group_units(paragraphs, max_chars, separator="\n\n"):
+            chunks.append({"file": name, "label": "Section", "text": text})
+
+    for position, chunk in enumerate(chunks):
+        chunk["position"] = position
+    return chunks
+
+
+class BM25Index:
+    """Incremental BM25 index over file chunks"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._chunks = []
+        self._lengths = []
+        self._postings = defaultdict(list)
+        self._file_chunks = {}
+        self._live_count = 0
+        self._total_length = 0
+        self._posting_count = 0
+
+    def has_file(self, file_key: str) -> bool:
+        return file_key in self._file_chunks
+
+    def file_keys(self) -> List[str]:
+        return list(self._file_chunks)
+
+    def add_file(self, file_key: str, chunks: List[dict]) -> None:
+        """Index the chunks of a file (replaces any previous version of the file)"""
+        if file_key in self._file_chunks:
+            self.remove_file(file_key)
+
+        chunk_ids = []
+        for chunk in chunks:
+            chunk_id = len(self._chunks)
+            chunk["file_key"] = file_key
+            term_freqs = Counter(tokenize(chunk["text"]))
+            length = sum(term_freqs.values())
+            self._chunks.append(chunk)
+            self._lengths.append(length)
+            for term, freq in term_freqs.items():
+                self._postings[term].append((chunk_id, freq))
+            self._posting_count += len(term_freqs)
+            self._total_length += length
+            self._live_count += 1
+            chunk_ids.append(chunk_id)
+        self._file_chunks[file_key] = chunk_ids
+
+    def remove_file(self, file_key: str) -> None:
+        """Remove a file's chunks from search results"""
+        for chunk_id in self._file_chunks.pop(file_key, []):
+            self._chunks[chunk_id] = None
+            self._total_length -= self._lengths[chunk_id]
+            self._live_count -= 1
+        # Postings of removed chunks are only skipped at search time; drop them once they dominate
+        if len(self._chunks) > 2 * self._live_count + 64:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rebuild the index without the chunks of removed files"""
+        files = [(file_key, self.file_chunks(file_key)) for file_key in self._file_chunks]
+        self.__init__(self.k1, self.b)
+        for file_key, chunks in files:
+            self.add_file(file_key, chunks)
+
+    def estimated_bytes(self) -> int:
+        """Approximate memory held by chunk text and postings"""
+        text_bytes = sum(len(chunk["text"]) for chunk in self._chunks if chunk is not None)
+        return text_bytes + 16 * self._posting_count
+
+    def file_chunks(self, file_key: str) -> List[dict]:
+        """All chunks of a file in document order"""
+        return [self._chunks[chunk_id] for chunk_id in self._file_chunks.get(file_key, [])]
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K,
+               file_keys: Optional[List[str]] = None) -> List[Tuple[float, dict]]:
+        """
+        Rank chunks against a query
+
+        Args:
+            query: User question
+            top_k: Maximum number of chunks to return
+            file_keys: Restrict results to these files
+
+        Returns:
+            List of (score, chunk) tuples, best first
+        """
+        if not self._live_count:
+            return []
+
+        allowed = None
+        if file_keys is not None:
+            allowed = {chunk_id for key in file_keys for chunk_id in self._file_chunks.get(key, [])}
+
+        average_length = self._total_length / self._live_count or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = [(chunk_id, freq) for chunk_id, freq in self._postings.get(term, ())
+                        if self._chunks[chunk_id] is not None]
+            if not postings:
+                continue
+            doc_freq = len(postings)
+            idf = math.log(1 + (self._live_count - doc_freq + 0.5) / (doc_freq + 0.5))
+            for chunk_id, freq in postings:
+                if allowed is not None and chunk_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self._chunks[chunk_id]) for chunk_id, score in ranked]
+
@@ -0,0 +1,115 @@
+"""
+Import Timing for AI Chatbot Hub
+
+Heavy modules (the Gemini SDK, pandas, PyPDF2, python-docx, Pillow and the
+processing modules built on them) are imported on first use through
+timed_import, which records how long each first import took in this process.
+The timings can be appended to a JSON-lines log (STARTUP_TIMING_LOG) to track
+import cost over time, and `python startup_timing.py` measures the cold import
+time of each module in a fresh interpreter.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import os
+import sys
+import json
+import time
+import importlib
+import threading
+import subprocess
+from typing import Dict, Optional
+
+
+# Modules measured by the command-line report, cheapest pages first
+REPORT_MODULES = (
+    "streamlit", "home", "about", "contact",
+    "utils", "google.genai", "pandas", "PyPDF2", "docx", "PIL.Image",
+    "pdf_engine", "tabular", "table_query", "image_pipeline", "chatbot",
+)
+
+_timings = {}
+_reported = set()
+_lock = threading.Lock()
+
+
+def timed_import(name: str):
+    """
+    Import a module on first use, recording how long the first import took
+
+    Args:
+        name: Dotted module name
+
+    Returns:
+        The imported module
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    with _lock:
+        # Includes any dependencies that were not loaded yet
+        _timings.setdefault(name, elapsed)
+    return module
+
+
+def format_timing_report(timings: Dict[str, float]) -> str:
+    """
+    Format import timings as a table, slowest first
+
+    Args:
+        timings: Dictionary of module name to seconds
+
+    Returns:
+        One line per module with its import time in milliseconds
+    """
+    width = max((len(name) for name in timings), default=0)
+    return "\n".join(f"{name:<{width}}  {seconds * 1000:8.1f} ms"
+                     for name, seconds in sorted(timings.items(), key=lambda item: -item[1]))
+
+
+def write_timing_log(path: Optional[str] = None) -> None:
+    """
+    Append imports not yet logged by this process to the timing log
+
+    Args:
+        path: JSON-lines file (defaults to STARTUP_TIMING_LOG; nothing is written if unset)
+    """
+    path = path or os.getenv("STARTUP_TIMING_LOG")
+    if not path:
+        return
+    with _lock:
+        new = {name: seconds for name, seconds in _timings.items() if name not in _reported}
+        _reported.update(new)
+    if not new:
+        return
+    record = {"time": time.time(), "pid": os.getpid(),
+              "imports_ms": {name: round(seconds * 1000, 1) for name, seconds in new.items()}}
+    try:
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+def measure_cold_import(name: str) -> float:
+    """Seconds to import a module in a fresh interpreter (excluding interpreter startup)"""
+    code = ("import time, importlib; started = time.perf_counter(); "
+            f"importlib.import_module({name!r}); print(time.perf_counter() - started)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or REPORT_MODULES
+    timings = {}
+    for name in modules:
+        try:
+            timings[name] = measure_cold_import(name)
+        except (subprocess.CalledProcessError, ValueError, IndexError):
+            print(f"{name}: import failed", file=sys.stderr)
+    print(format_timing_report(timings))
@@ -0,0 +1,106 @@
+"""
+Streaming Response Rendering for AI Chatbot Hub
+
+Shows model output as soon as it arrives while limiting how often the chat
+placeholder is redrawn, and measures time-to-first-token and throughput.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import time
+from typing import Optional
+
+from retrieval import estimate_tokens
+
+
+DEFAULT_FRAME_INTERVAL = 0.05
+CURSOR = "▋"
+
+
+class StreamRenderer:
+    """Accumulates streamed text and redraws a placeholder at most once per frame"""
+
+    def __init__(self, placeholder, frame_interval: float = DEFAULT_FRAME_INTERVAL,
+                 started_at: Optional[float] = None):
+        self.placeholder = placeholder
+        self.frame_interval = frame_interval
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+        self.redraws = 0
+        self.output_tokens = None
+        self._parts = []
+        self._last_draw = 0.0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, text: Optional[str], usage_metadata=None) -> None:
+        """
+        Add a streamed chunk, redrawing only if the frame budget has elapsed
+
+        Args:
+            text: Text of the chunk (may be empty)
+            usage_metadata: Optional usage metadata reported with the chunk
+        """
+        if usage_metadata is not None and getattr(usage_metadata, "candidates_token_count", None):
+            self.output_tokens = usage_metadata.candidates_token_count
+        if not text:
+            return
+
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self._parts.append(text)
+
+        if now - self._last_draw >= self.frame_interval:
+            self._draw(self.text + CURSOR)
+            self._last_draw = now
+
+    def finish(self) -> str:
+        """Render the final text without the cursor and return it"""
+        self.finished_at = time.monotonic()
+        full_text = self.text
+        self._draw(full_text)
+        return full_text
+
+    def show_status(self, status: str) -> None:
+        """Show a status line (e.g. a retry notice) below the text received so far"""
+        self._draw(f"{self.text}\n\n_{status}_" if self._parts else status)
+        self._last_draw = time.monotonic()
+
+    def _draw(self, text: str) -> None:
+        self.placeholder.markdown(text)
+        self.redraws += 1
+
+    def stats(self) -> dict:
+        """
+        Timing statistics for the stream
+
+        Returns:
+            Dictionary with time_to_first_token and total_time (seconds),
+            output_tokens (reported by the API, or estimated) and tokens_per_second
+        """
+        finished_at = self.finished_at or time.monotonic()
+        tokens = self.output_tokens or (estimate_tokens(self.text) if self._parts else 0)
+        time_to_first_token = (self.first_token_at - self.started_at) if self.first_token_at else None
+        generation_time = (finished_at - self.first_token_at) if self.first_token_at else 0.0
+        return {
+            "time_to_first_token": time_to_first_token,
+            "total_time": finished_at - self.started_at,
+            "output_tokens": tokens,
+            "tokens_per_second": tokens / generation_time if generation_time > 0 else None,
+        }
+
+
+def format_stream_stats(stats: dict) -> str:
+    """Format StreamRenderer.stats() for a caption"""
+    parts = []
+    if stats["time_to_first_token"] is not None:
+        parts.append(f"first token in {stats['time_to_first_token']:.2f}s")
+    if stats["tokens_per_second"]:
+        parts.append(f"{stats['tokens_per_second']:.0f} tokens/s")
+    parts.append(f"{stats['output_tokens']:,} tokens in {stats['total_time']:.1f}s")
+    return " · ".join(parts)
@@ -1,8 +1,9 @@
+import uuid
 import streamlit as st
 from home import render_home_page
-from chatbot import render_chatbot_page
 from about import render_about_page
 from contact import render_contact_page
+from startup_timing import timed_import, write_timing_log
 
 
 # Page configuration
@@ -20,6 +21,10 @@ if "current_page" not in st.session_state:
 if "history" not in st.session_state:
     st.session_state.history = []
 
+# Identifies this browser session for memory accounting
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 # Sidebar Navigation
 with st.sidebar:
     st.title("🤖 AI Chatbot Hub")
@@ -43,39 +48,23 @@ with st.sidebar:
     
     # Additional sidebar content based on current page
     if st.session_state.current_page == "Chatbot":
-        st.markdown("### 🔧 Chat Controls")
-        if st.button("🗑️ Clear Chat History", use_container_width=True):
-            st.session_state.history = []
-            st.rerun()
-        
-        st.markdown("### 📁 File Support")
-        st.markdown("""
-        **Supported formats:**
-        - 📄 Text (.txt)
-        - 📄 PDF (.pdf)
-        - 📄 Word (.docx)
-        - 📊 Excel (.xlsx, .xls)
-        - 📊 CSV (.csv)
-        - 🔧 JSON (.json)
-        - 🖼️ Images (.jpg, .png, .gif)
-        """)
-        
-        # Chat statistics
-        if st.session_state.history:
-            st.markdown("### 📊 Chat Stats")
-            st.info(f"Messages: {len(st.session_state.history)}")
-
+        # Chatbot modules (and the Gemini SDK) are only imported once this page is opened
+        timed_import("chatbot").render_chatbot_sidebar()
 
 
 # Main app logic - render the appropriate page
-if st.session_state.current_page == "Home":
-    render_home_page()
-elif st.session_state.current_page == "Chatbot":
-    render_chatbot_page()
-elif st.session_state.current_page == "About":
-    render_about_page()
-elif st.session_state.current_page == "Contact":
-    render_contact_page()
+try:
+    if st.session_state.current_page == "Home":
+        render_home_page()
+    elif st.session_state.current_page == "Chatbot":
+        timed_import("chatbot").render_chatbot_page()
+    elif st.session_state.current_page == "About":
+        render_about_page()
+    elif st.session_state.current_page == "Contact":
+        render_contact_page()
+finally:
+    # Record first-import times of lazily loaded modules (STARTUP_TIMING_LOG), also when the page stops early
+    write_timing_log()
 
 # Footer with license information (exclude from chatbot page)
 if st.session_state.current_page != "Chatbot":
@@ -0,0 +1,140 @@
+"""
+Compact Table Serialization for AI Chatbot Hub
+
+Renders DataFrames for the model as pipe-separated rows instead of the
+whitespace-aligned DataFrame.to_string() layout: numbers are trimmed to a few
+significant digits, long cells are shortened, and a value repeated from the row
+above is written as a ditto mark. A local token estimate is used to cap tables
+to a token budget.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import math
+import re
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_PRECISION = 4
+MAX_CELL_CHARS = 40
+DITTO = '"'
+# Repeats shorter than this are cheaper to write out than to explain
+MIN_DITTO_CHARS = 3
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]|\n|[ \t]{2,}")
+
+
+def estimate_table_tokens(text: str) -> int:
+    """
+    Estimate the prompt tokens of serialized table text
+
+    Counts words, groups of up to three digits, punctuation marks, line breaks
+    and runs of padding, which tracks tokenizers far better than a
+    characters/4 rule on numeric data.
+
+    Args:
+        text: Serialized table
+
+    Returns:
+        Estimated token count
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def format_number(value: float, precision: int = DEFAULT_PRECISION) -> str:
+    """Format a number with at most precision significant digits (integers are kept whole)"""
+    if math.isnan(value):
+        return ""
+    if math.isinf(value):
+        return "inf" if value > 0 else "-inf"
+    if value == 0:
+        return "0"
+    magnitude = math.floor(math.log10(abs(value)))
+    if magnitude < -4:
+        # Tiny values: mantissa and exponent are shorter than the leading zeros
+        mantissa, exponent = f"{value:.{precision - 1}e}".split("e")
+        if "." in mantissa:
+            mantissa = mantissa.rstrip("0").rstrip(".")
+        return f"{mantissa}e{int(exponent)}"
+    decimals = max(0, min(precision - 1 - magnitude, precision + 6))
+    text = f"{value:.{decimals}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def format_cell(value, precision: int = DEFAULT_PRECISION, max_chars: int = MAX_CELL_CHARS) -> str:
+    """Compact text for one table cell; missing values become empty"""
+    if value is None or value is pd.NaT:
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value))
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return format_number(float(value), precision)
+    if isinstance(value, pd.Timestamp):
+        text = value.isoformat(sep=" ")
+        return text[:-9] if text.endswith(" 00:00:00") else text
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    text = " ".join(str(value).split()).replace("|", "/")
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+def format_compact_table(df: pd.DataFrame, index: Optional[bool] = None,
+                         precision: int = DEFAULT_PRECISION, max_tokens: Optional[int] = None) -> str:
+    """
+    Serialize a DataFrame as compact pipe-separated rows
+
+    Args:
+        df: Table to render
+        index: Include the index as the first column (default: only if it isn't 0..n-1)
+        precision: Significant digits for numbers
+        max_tokens: Stop adding rows once the estimated size exceeds this many tokens
+
+    Returns:
+        Header line followed by one line per row
+    """
+    if index is None:
+        index = not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1
+
+    columns = [format_cell(name, precision) for name in df.columns]
+    if index:
+        columns.insert(0, format_cell(df.index.name, precision) if df.index.name is not None else "")
+    if not columns:
+        return "(no columns)"
+
+    lines = [" | ".join(columns)]
+    tokens = estimate_table_tokens(lines[0])
+    previous = None
+    used_ditto = False
+    rows = df.itertuples(index=index, name=None)
+    for row_number, row in enumerate(rows):
+        cells = [format_cell(value, precision) for value in row]
+        shown = list(cells)
+        if previous is not None:
+            for i, cell in enumerate(cells):
+                if len(cell) >= MIN_DITTO_CHARS and cell == previous[i]:
+                    shown[i] = DITTO
+                    used_ditto = True
+        line = " | ".join(shown)
+        # Plus the line break joining it to the previous line
+        line_tokens = estimate_table_tokens(line) + 1
+        if max_tokens is not None and row_number > 0 and tokens + line_tokens > max_tokens:
+            lines.append(f"… {len(df) - row_number} more rows")
+            break
+        lines.append(line)
+        tokens += line_tokens
+        previous = cells
+
+    if used_ditto:
+        lines.append(f'({DITTO} = same as the row above)')
+    return "\n".join(lines)
@@ -0,0 +1,468 @@
+"""
+Local Table Queries for AI Chatbot Hub
+
+Lets the model answer aggregate questions about CSV and Excel uploads without
+seeing their rows. The model is shown only the table schemas and returns a
+restricted JSON query plan (filters, group-by, aggregations, sort, limit); the
+plan is validated against a whitelist and run with vectorized pandas operations
+on the loaded DataFrame - nothing from the plan is ever evaluated as code - and
+only the small result table is added to the conversation.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import re
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from upload_spool import as_binary_stream
+from table_format import format_cell, format_compact_table
+from env_config import get_env_int
+
+
+MAX_RESULT_ROWS = 50
+MAX_PLAN_ITEMS = 10
+SCHEMA_SAMPLE_VALUES = 3
+DEFAULT_TABLE_CACHE_MB = 256
+# Larger uploads are not loaded whole; questions about them use the chunked profile
+DEFAULT_MAX_QUERY_FILE_MB = 32
+
+FILTER_OPS = ("==", "!=", ">", ">=", "<", "<=", "in", "not_in",
+              "contains", "startswith", "is_null", "not_null")
+AGGREGATE_FUNCS = ("count", "sum", "mean", "median", "min", "max", "nunique", "std")
+NUMERIC_FUNCS = ("sum", "mean", "median", "std")
+# Sample values for the schema come from the first rows only
+SCHEMA_SAMPLE_ROWS = 1000
+
+# Questions that need computation over rows rather than reading the preview
+ANALYTIC_PATTERN = re.compile(
+    r"\b(total|sum|average|avg|mean|median|count|how many|number of|maximum|minimum|"
+    r"highest|lowest|distinct|group by|top \d+|bottom \d+)\b",
+    re.IGNORECASE)
+
+
+class QueryPlanError(ValueError):
+    """A query plan that is malformed or refers to unknown tables or columns"""
+
+
+class TableTooLargeError(ValueError):
+    """An upload too large to load whole for a local query"""
+
+
+def get_table_cache_limit() -> int:
+    """
+    Get the memory cap for loaded query tables
+
+    Returns:
+        Value of TABLE_QUERY_CACHE_MB in bytes, or DEFAULT_TABLE_CACHE_MB
+    """
+    return get_env_int("TABLE_QUERY_CACHE_MB", DEFAULT_TABLE_CACHE_MB) * 1024 * 1024
+
+
+def get_max_query_file_size() -> int:
+    """
+    Get the largest upload loaded whole for local queries
+
+    Returns:
+        Value of TABLE_QUERY_MAX_FILE_MB in bytes, or DEFAULT_MAX_QUERY_FILE_MB
+    """
+    return get_env_int("TABLE_QUERY_MAX_FILE_MB", DEFAULT_MAX_QUERY_FILE_MB) * 1024 * 1024
+
+
+def needs_table_query(question: str) -> bool:
+    """Check whether a question likely needs aggregation over table rows"""
+    return bool(ANALYTIC_PATTERN.search(question))
+
+
+def load_tables(source, name: str, file_type: str) -> Dict[str, pd.DataFrame]:
+    """
+    Load every table of a CSV or Excel upload
+
+    Args:
+        source: File bytes or MappedFile
+        name: File name, used as the table name (Excel sheets become "name / sheet")
+        file_type: MIME type of the upload
+
+    Returns:
+        Dictionary of table name to DataFrame
+    """
+    if file_type == "text/csv":
+        return {name: pd.read_csv(as_binary_stream(source))}
+    sheets = pd.read_excel(as_binary_stream(source), sheet_name=None)
+    return {f"{name} / {sheet_name}": df for sheet_name, df in sheets.items()}
+
+
+class TableCache:
+    """
+    Size-bounded LRU cache of loaded tables keyed by file hash and name
+
+    Uploads above the file size cap, and tables that turn out larger than the
+    whole cache, raise TableTooLargeError instead of being loaded on every question.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_file_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._oversized = set()
+        self._lock = threading.Lock()
+
+    def can_load(self, file_hash: str, name: str, file_size: int) -> bool:
+        """
+        Check whether a file may be queried locally, before any of it is read
+
+        Args:
+            file_hash: SHA-256 of the file contents
+            name: File name
+            file_size: Upload size in bytes
+
+        Returns:
+            False if the file is above the size cap or already found too large to cache
+        """
+        with self._lock:
+            if (file_hash, name) in self._entries:
+                return True
+            if (file_hash, name) in self._oversized:
+                return False
+        return file_size <= (self.max_file_bytes or get_max_query_file_size())
+
+    def get_tables(self, file_hash: str, source, name: str, file_type: str) -> Dict[str, pd.DataFrame]:
+        """
+        Return the tables of a file, loading them on a miss
+
+        Raises:
+            TableTooLargeError: If the file is too large to query locally
+        """
+        key = (file_hash, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        file_size = source.size if hasattr(source, "size") else len(source)
+        if not self.can_load(file_hash, name, file_size):
+            raise TableTooLargeError(f"{name} is too large to query locally")
+
+        tables = load_tables(source, name, file_type)
+        size = sum(int(df.memory_usage(index=True, deep=True).sum()) for df in tables.values())
+        max_bytes = self.max_bytes or get_table_cache_limit()
+        with self._lock:
+            if size > max_bytes:
+                self._oversized.add(key)
+            elif key not in self._entries:
+                self._entries[key] = (tables, size)
+                self.current_bytes += size
+                while self.current_bytes > max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted
+        if size > max_bytes:
+            raise TableTooLargeError(f"{name} is too large to query locally")
+        return tables
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._oversized.clear()
+            self.current_bytes = 0
+
+
+table_cache = TableCache()
+
+
+def describe_tables(tables: Dict[str, pd.DataFrame]) -> str:
+    """
+    Describe table schemas for the planning prompt
+
+    Args:
+        tables: Dictionary of table name to DataFrame
+
+    Returns:
+        One block per table listing row count, columns, dtypes and a few sample values
+    """
+    blocks = []
+    for table_name, df in tables.items():
+        lines = [f'Table "{table_name}" ({len(df)} rows):']
+        for column in df.columns:
+            samples = df[column].head(SCHEMA_SAMPLE_ROWS).dropna().drop_duplicates().head(SCHEMA_SAMPLE_VALUES)
+            sample_text = ", ".join(format_cell(value) for value in samples)
+            lines.append(f"- {column} ({df[column].dtype}): e.g. {sample_text}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def build_plan_prompt(question: str, tables: Dict[str, pd.DataFrame]) -> str:
+    """
+    Build the prompt asking the model for a query plan
+
+    Args:
+        question: The user's question
+        tables: Dictionary of table name to DataFrame
+
+    Returns:
+        Prompt text requesting a JSON plan
+    """
+    return (
+        "You translate questions about tables into a JSON query plan. You cannot see the rows.\n\n"
+        f"{describe_tables(tables)}\n\n"
+        "Reply with JSON only, in this form (omit keys you don't need):\n"
+        '{"table": "<table name>",\n'
+        ' "filters": [{"column": "<column>", "op": "<op>", "value": <value>}],\n'
+        ' "group_by": ["<column>"],\n'
+        ' "aggregations": [{"column": "<column>", "func": "<func>"}],\n'
+        ' "columns": ["<column>"],\n'
+        ' "sort": {"by": "<column or func_column>", "descending": true},\n'
+        f' "limit": <at most {MAX_RESULT_ROWS}>}}\n\n'
+        f"op is one of: {', '.join(FILTER_OPS)} (\"in\"/\"not_in\" take a list).\n"
+        f"func is one of: {', '.join(AGGREGATE_FUNCS)}; aggregated columns are named func_column.\n"
+        "\"columns\" selects rows to list when there are no aggregations.\n"
+        'If the question cannot be answered by one such query, reply {"table": null}.\n\n'
+        f"Question: {question}"
+    )
+
+
+def parse_query_plan(text: str) -> Optional[dict]:
+    """
+    Parse the model's plan reply
+
+    Args:
+        text: Model reply, optionally wrapped in a ```json fence
+
+    Returns:
+        The plan dictionary, or None if the model declined to query
+
+    Raises:
+        QueryPlanError: If the reply is not a JSON object
+    """
+    text = (text or "").strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        plan = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise QueryPlanError(f"Query plan is not valid JSON: {e}")
+    if not isinstance(plan, dict):
+        raise QueryPlanError("Query plan must be a JSON object")
+    return plan if plan.get("table") else None
+
+
+def _as_list(plan: dict, key: str) -> list:
+    value = plan.get(key) or []
+    if not isinstance(value, list):
+        value = [value]
+    if len(value) > MAX_PLAN_ITEMS:
+        raise QueryPlanError(f"Too many {key} (at most {MAX_PLAN_ITEMS})")
+    return value
+
+
+def _check_column(df: pd.DataFrame, column) -> str:
+    if column not in df.columns:
+        raise QueryPlanError(f"Unknown column: {column}")
+    return column
+
+
+def _coerce_value(series: pd.Series, value):
+    """Convert a JSON literal to the column's type so comparisons are vectorized"""
+    if isinstance(value, list):
+        return [_coerce_value(series, item) for item in value]
+    if value is None:
+        return value
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(value)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                raise QueryPlanError(f"Expected a number for {series.name}, got {value!r}")
+    return value
+
+
+def _filter_mask(df: pd.DataFrame, condition) -> pd.Series:
+    if not isinstance(condition, dict):
+        raise QueryPlanError("Each filter must be an object")
+    series = df[_check_column(df, condition.get("column"))]
+    op = condition.get("op")
+    if op not in FILTER_OPS:
+        raise QueryPlanError(f"Unsupported filter op: {op}")
+    if op == "is_null":
+        return series.isna()
+    if op == "not_null":
+        return series.notna()
+
+    value = _coerce_value(series, condition.get("value"))
+    if op in ("in", "not_in"):
+        mask = series.isin(value if isinstance(value, list) else [value])
+        return ~mask if op == "not_in" else mask
+    if op in ("contains", "startswith"):
+        text = series.astype("string").str.lower()
+        needle = str(value).lower()
+        mask = text.str.contains(needle, regex=False) if op == "contains" else text.str.startswith(needle)
+        return mask.fillna(False).astype(bool)
+    if isinstance(value, list):
+        raise QueryPlanError(f"Op {op} takes a single value")
+    try:
+        if op == "==":
+            return series == value
+        if op == "!=":
+            return series != value
+        if op == ">":
+            return series > value
+        if op == ">=":
+            return series >= value
+        if op == "<":
+            return series < value
+        return series <= value
+    except TypeError as e:
+        raise QueryPlanError(f"Cannot compare {series.name} with {value!r}: {e}")
+
+
+def execute_query_plan(tables: Dict[str, pd.DataFrame], plan: dict) -> dict:
+    """
+    Run a validated query plan against the loaded tables
+
+    Args:
+        tables: Dictionary of table name to DataFrame
+        plan: Parsed query plan
+
+    Returns:
+        Dictionary with table, matched_rows, result (DataFrame of at most
+        MAX_RESULT_ROWS rows) and total_rows (rows before the limit)
+
+    Raises:
+        QueryPlanError: If the plan is invalid for these tables
+    """
+    table_name = plan.get("table")
+    if table_name not in tables:
+        raise QueryPlanError(f"Unknown table: {table_name}")
+    df = tables[table_name]
+
+    mask = pd.Series(True, index=df.index)
+    for condition in _as_list(plan, "filters"):
+        mask &= _filter_mask(df, condition)
+    filtered = df[mask]
+
+    group_by = [_check_column(df, column) for column in _as_list(plan, "group_by")]
+    aggregations = _as_list(plan, "aggregations")
+    if aggregations or group_by:
+        named = {}
+        for aggregation in aggregations or [{"column": None, "func": "count"}]:
+            if not isinstance(aggregation, dict):
+                raise QueryPlanError("Each aggregation must be an object")
+            func = aggregation.get("func")
+            if func not in AGGREGATE_FUNCS:
+                raise QueryPlanError(f"Unsupported aggregation: {func}")
+            column = aggregation.get("column")
+            if column in (None, "*"):
+                if func != "count":
+                    raise QueryPlanError(f"{func} needs a column")
+                # Row count, including rows with nulls
+                named["count"] = (None, "size")
+                continue
+            _check_column(df, column)
+            if func in NUMERIC_FUNCS and not pd.api.types.is_numeric_dtype(df[column]):
+                raise QueryPlanError(f"{func} needs a numeric column, {column} is {df[column].dtype}")
+            named[f"{func}_{column}"] = (column, func)
+
+        if group_by:
+            grouped = filtered.groupby(group_by, dropna=False, sort=False)
+            result = pd.DataFrame({
+                alias: grouped.size() if func == "size" else grouped[column].agg(func)
+                for alias, (column, func) in named.items()
+            }).reset_index()
+        else:
+            result = pd.DataFrame([{
+                alias: len(filtered) if func == "size" else filtered[column].agg(func)
+                for alias, (column, func) in named.items()
+            }])
+    else:
+        columns = [_check_column(df, column) for column in _as_list(plan, "columns")]
+        result = filtered[columns] if columns else filtered
+
+    sort = plan.get("sort")
+    if sort:
+        if not isinstance(sort, dict):
+            raise QueryPlanError("sort must be an object")
+        _check_column(result, sort.get("by"))
+        result = result.sort_values(sort["by"], ascending=not sort.get("descending", False),
+                                    na_position="last")
+
+    limit = plan.get("limit") or MAX_RESULT_ROWS
+    if not isinstance(limit, int) or limit <= 0:
+        raise QueryPlanError(f"Invalid limit: {limit!r}")
+    return {
+        "table": table_name,
+        "matched_rows": int(mask.sum()),
+        "total_rows": len(result),
+        "result": result.head(min(limit, MAX_RESULT_ROWS)),
+    }
+
+
+def format_query_result(plan: dict, outcome: dict) -> str:
+    """
+    Format a query result for the prompt
+
+    Args:
+        plan: The executed plan
+        outcome: Result of execute_query_plan
+
+    Returns:
+        The plan (as compact JSON) and the result table
+    """
+    result = outcome["result"]
+    header = (f"Query on {outcome['table']} ({outcome['matched_rows']:,} rows matched the filters), "
+              f"computed locally over all rows:\n"
+              f"{json.dumps(plan, separators=(',', ':'), default=str)}\n")
+    if result.empty:
+        return header + "(no rows)\n"
+    text = header + format_compact_table(result.reset_index(drop=True)) + "\n"
+    if outcome["total_rows"] > len(result):
+        text += f"(showing {len(result)} of {outcome['total_rows']:,} result rows)\n"
+    return text
+
+
+def run_table_query(plan_text: str, tables: Dict[str, pd.DataFrame]) -> Optional[str]:
+    """
+    Parse, validate and execute a plan reply
+
+    Args:
+        plan_text: The model's plan reply
+        tables: Dictionary of table name to DataFrame
+
+    Returns:
+        Formatted result, an error note if the plan was invalid, or None if the
+        model declined to query
+    """
+    try:
+        plan = parse_query_plan(plan_text)
+        if plan is None:
+            return None
+        return format_query_result(plan, execute_query_plan(tables, plan))
+    except (TypeError, ValueError) as e:
+        # QueryPlanError, or pandas rejecting an operation for the column's type
+        return f"(Local table query failed: {e})\n"
+
+
+def query_tables(question: str, tables: Dict[str, pd.DataFrame],
+                 generate_json: Callable[[str], str]) -> Optional[str]:
+    """
+    Ask the model for a query plan and run it locally
+
+    Args:
+        question: The user's question
+        tables: Dictionary of table name to DataFrame
+        generate_json: Sends a prompt to the model and returns its JSON reply
+
+    Returns:
+        Formatted result or error note, or None if no query applies
+    """
+    if not tables:
+        return None
+    return run_table_query(generate_json(build_plan_prompt(question, tables)), tables)
@@ -0,0 +1,405 @@
+"""
+Tabular Data Profiling for AI Chatbot Hub
+
+Streaming profilers for large spreadsheets. CSV files are read in chunks and
+summarized with mergeable statistics (row count, null counts, mean/std/min/max)
+plus a reservoir sample for percentiles and previews, so memory stays bounded
+no matter how large the file is. Excel workbooks are streamed with openpyxl's
+read-only mode, one sheet per worker process.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+from itertools import chain, repeat
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import openpyxl
+
+from worker_pools import get_executor, discard_executor, get_max_workers, in_worker_process
+from upload_spool import MappedFile, as_binary_stream, spool_bytes
+from env_config import get_env_int
+
+
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_SAMPLE_ROWS = 10_000
+PREVIEW_ROWS = 10
+DEFAULT_EXCEL_MAX_ROWS = 100_000
+EXCEL_CHUNK_ROWS = 10_000
+
+
+def get_csv_chunk_rows() -> int:
+    """
+    Get the number of CSV rows read per chunk
+
+    Returns:
+        Value of CSV_CHUNK_ROWS, or DEFAULT_CHUNK_ROWS
+    """
+    return get_env_int("CSV_CHUNK_ROWS", DEFAULT_CHUNK_ROWS)
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+class NumericSummary:
+    """Mergeable count/mean/variance/min/max for one numeric column (Chan et al.)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, series: pd.Series) -> None:
+        """Fold a chunk of values into the summary"""
+        values = series.dropna().to_numpy(dtype="float64")
+        if not len(values):
+            return
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+        chunk_min, chunk_max = float(values.min()), float(values.max())
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+    @property
+    def std(self) -> float:
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else float("nan")
+
+
+class ReservoirSample:
+    """Uniform fixed-size sample of rows from a stream of DataFrame chunks"""
+
+    def __init__(self, size: int = DEFAULT_SAMPLE_ROWS, seed: Optional[int] = 0):
+        self.size = size
+        self.seen = 0
+        self._rows = []
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Offer every row of a chunk to the reservoir (Algorithm R, vectorized per chunk)"""
+        start = 0
+        if self.seen < self.size:
+            start = min(self.size - self.seen, len(chunk))
+            self._rows.extend(chunk.iloc[:start].to_dict("records"))
+            self.seen += start
+
+        remaining = len(chunk) - start
+        if remaining <= 0:
+            return
+        positions = np.arange(self.seen, self.seen + remaining)
+        slots = self._rng.integers(0, positions + 1)
+        accepted = np.nonzero(slots < self.size)[0]
+        if len(accepted):
+            records = chunk.iloc[start + accepted].to_dict("records")
+            for slot, record in zip(slots[accepted], records):
+                self._rows[slot] = record
+        self.seen += remaining
+
+    def to_frame(self, columns) -> pd.DataFrame:
+        return pd.DataFrame(self._rows, columns=columns)
+
+    @property
+    def is_complete(self) -> bool:
+        """True when every row seen is in the sample (results are exact)"""
+        return self.seen <= self.size
+
+
+def profile_chunks(chunks, sample_rows: int = DEFAULT_SAMPLE_ROWS) -> dict:
+    """
+    Profile a table delivered as a stream of DataFrame chunks
+
+    Args:
+        chunks: Iterable of DataFrames sharing the same columns
+        sample_rows: Size of the reservoir sample
+
+    Returns:
+        Dictionary with rows, columns, dtypes, non_null, numeric (NumericSummary per
+        numeric column), preview (first rows) and sample (ReservoirSample)
+    """
+    rows = 0
+    columns = None
+    dtypes = {}
+    non_null = {}
+    numeric = {}
+    preview = None
+    sample = ReservoirSample(sample_rows)
+
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+            preview = chunk.head(PREVIEW_ROWS)
+            dtypes = {col: chunk[col].dtype for col in columns}
+            non_null = {col: 0 for col in columns}
+            numeric = {col: NumericSummary() for col in columns if _is_numeric(chunk[col])}
+
+        rows += len(chunk)
+        for col in columns:
+            series = chunk[col]
+            non_null[col] += int(series.notna().sum())
+            # A column is numeric only if every chunk parsed it as numeric
+            if series.dtype != dtypes[col]:
+                if _is_numeric(series) and col in numeric:
+                    dtypes[col] = np.result_type(dtypes[col], series.dtype)
+                elif not series.isna().all():
+                    dtypes[col] = np.dtype("object")
+                    numeric.pop(col, None)
+            if col in numeric:
+                numeric[col].update(series)
+        sample.update(chunk)
+
+    return {
+        "rows": rows,
+        "columns": columns or [],
+        "dtypes": dtypes,
+        "non_null": non_null,
+        "numeric": numeric,
+        "preview": preview if preview is not None else pd.DataFrame(),
+        "sample": sample,
+    }
+
+
+def profile_csv(source, chunk_rows: Optional[int] = None,
+                sample_rows: int = DEFAULT_SAMPLE_ROWS) -> dict:
+    """
+    Profile a CSV file in a single streaming pass
+
+    Args:
+        source: Path or binary file-like object
+        chunk_rows: Rows per chunk (defaults to get_csv_chunk_rows())
+        sample_rows: Size of the reservoir sample
+
+    Returns:
+        Profile dictionary (see profile_chunks)
+    """
+    chunk_rows = chunk_rows or get_csv_chunk_rows()
+    profile = profile_chunks(pd.read_csv(source, chunksize=chunk_rows), sample_rows)
+    if not profile["columns"]:
+        raise ValueError("No columns to parse from file")
+    return profile
+
+
+def numeric_summary_frame(profile: dict) -> pd.DataFrame:
+    """
+    Build a describe()-style table from a CSV profile
+
+    count, mean, std, min and max are exact; quartiles come from the reservoir
+    sample and are exact only when the whole file fit in the sample.
+
+    Args:
+        profile: Result of profile_csv
+
+    Returns:
+        DataFrame indexed like DataFrame.describe()
+    """
+    sample = profile["sample"].to_frame(profile["columns"])
+    summary = {}
+    for col, stats in profile["numeric"].items():
+        values = pd.to_numeric(sample[col], errors="coerce").dropna()
+        quartiles = values.quantile([0.25, 0.5, 0.75]) if len(values) else pd.Series([np.nan] * 3)
+        summary[col] = [
+            float(stats.count), stats.mean if stats.count else np.nan, stats.std,
+            stats.min if stats.min is not None else np.nan,
+            *[float(q) for q in quartiles],
+            stats.max if stats.max is not None else np.nan,
+        ]
+    return pd.DataFrame(summary, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"])
+
+
+def get_excel_max_rows() -> int:
+    """
+    Get the maximum number of rows read per Excel sheet
+
+    Returns:
+        Value of EXCEL_MAX_ROWS, or DEFAULT_EXCEL_MAX_ROWS
+    """
+    return get_env_int("EXCEL_MAX_ROWS", DEFAULT_EXCEL_MAX_ROWS)
+
+
+def _unique_headers(values) -> List[str]:
+    """Column names the way pandas.read_excel builds them (Unnamed: i, name.1, ...)"""
+    headers = []
+    seen = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        headers.append(name)
+    return headers
+
+
+def iter_sheet_chunks(worksheet, max_rows: Optional[int], state: dict,
+                      chunk_rows: int = EXCEL_CHUNK_ROWS):
+    """
+    Stream a read-only worksheet as DataFrame chunks
+
+    Blank rows between data rows are kept (as all-missing rows, like pandas.read_excel);
+    trailing blank rows are dropped. Reading stops after max_rows data rows;
+    state["truncated"] is set if rows were left.
+
+    Args:
+        worksheet: openpyxl read-only worksheet
+        max_rows: Maximum data rows to read, or None for all
+        state: Dictionary updated with "truncated"
+        chunk_rows: Rows per DataFrame chunk
+    """
+    state["truncated"] = False
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _unique_headers(header)
+    width = len(columns)
+
+    batch = []
+    read = 0
+    blank = 0
+    empty_row = (None,) * width
+    for row in rows:
+        if all(value is None for value in row):
+            # Only kept once a data row follows
+            blank += 1
+            continue
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        for values in chain(repeat(empty_row, blank), (row,)):
+            if max_rows is not None and read >= max_rows:
+                state["truncated"] = True
+                break
+            batch.append(values)
+            read += 1
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if state["truncated"]:
+            break
+        blank = 0
+    if batch:
+        yield pd.DataFrame(batch, columns=columns)
+
+
+def profile_excel_sheet(data: bytes, sheet_name: str, max_rows: Optional[int] = None) -> dict:
+    """
+    Profile one sheet of an .xlsx workbook using openpyxl's streaming reader
+
+    Module-level so it can run in a worker process.
+
+    Args:
+        data: Workbook bytes or MappedFile
+        sheet_name: Sheet to profile
+        max_rows: Maximum data rows to read (defaults to get_excel_max_rows())
+
+    Returns:
+        Profile dictionary (see profile_chunks) plus truncated and declared_rows
+    """
+    max_rows = max_rows or get_excel_max_rows()
+    workbook = openpyxl.load_workbook(as_binary_stream(data), read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name]
+        state = {}
+        profile = profile_chunks(iter_sheet_chunks(worksheet, max_rows, state))
+        profile["truncated"] = state.get("truncated", False)
+        # Row count from the sheet's dimension record; an estimate when reading stopped early
+        profile["declared_rows"] = max(worksheet.max_row - 1, 0) if worksheet.max_row else None
+    finally:
+        workbook.close()
+    return profile
+
+
+def list_excel_sheets(data: bytes, sheet_names: Optional[List[str]] = None) -> List[str]:
+    """
+    Names of the sheets of an .xlsx workbook, in workbook order
+
+    Args:
+        data: Workbook bytes or MappedFile
+        sheet_names: Only keep these sheets (defaults to all)
+
+    Returns:
+        List of sheet names
+    """
+    workbook = openpyxl.load_workbook(as_binary_stream(data), read_only=True)
+    names = workbook.sheetnames
+    workbook.close()
+    if sheet_names is not None:
+        names = [name for name in names if name in sheet_names]
+    return names
+
+
+def iter_excel_workbook_profiles(data: bytes, names: List[str], max_rows: Optional[int] = None,
+                                 max_workers: Optional[int] = None,
+                                 file_hash: Optional[str] = None) -> Iterator[tuple]:
+    """
+    Profile sheets of an .xlsx workbook one per worker process, yielding each in order as it is ready
+
+    In-memory workbooks are spooled once before fanning out, so each worker maps
+    the same file instead of receiving its own pickled copy.
+
+    Args:
+        data: Workbook bytes or MappedFile
+        names: Sheets to profile (see list_excel_sheets)
+        max_rows: Maximum data rows read per sheet
+        max_workers: Concurrency cap (defaults to get_max_workers())
+        file_hash: SHA-256 of the workbook, if already known
+
+    Yields:
+        (sheet_name, profile) tuples in the order of names
+    """
+    done = 0
+    max_workers = max_workers or get_max_workers()
+    # Worker processes already run one file each - don't nest pools inside them
+    futures = None
+    if len(names) > 1 and max_workers > 1 and not in_worker_process():
+        try:
+            if not isinstance(data, MappedFile):
+                data = spool_bytes(data, file_hash)
+            executor = get_executor("process", max_workers)
+            futures = [executor.submit(profile_excel_sheet, data, name, max_rows) for name in names]
+        except (BrokenProcessPool, OSError, RuntimeError):
+            # No temp space or no process pool here; profile the sheets in this process
+            discard_executor("process", max_workers)
+    if futures is not None:
+        try:
+            for name, future in zip(names, futures):
+                profile = future.result()
+                done += 1
+                yield name, profile
+        except BrokenProcessPool:
+            # Only a dead pool falls back; errors from a sheet itself propagate
+            discard_executor("process", max_workers)
+
+    for name in names[done:]:
+        yield name, profile_excel_sheet(data, name, max_rows)
+
+
+def iter_excel_previews(source, max_rows: int = PREVIEW_ROWS) -> Iterator[tuple]:
+    """
+    Yield the first rows of each sheet of an .xlsx workbook without reading the rest
+
+    Args:
+        source: Binary file-like object of the workbook
+        max_rows: Data rows per sheet
+
+    Yields:
+        (sheet_name, DataFrame) tuples in workbook order
+    """
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            head = next(iter_sheet_chunks(worksheet, max_rows, {}, chunk_rows=max_rows), None)
+            yield worksheet.title, head if head is not None else pd.DataFrame()
+    finally:
+        workbook.close()
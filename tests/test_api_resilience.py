@@ -0,0 +1,117 @@
+import httpx
+import pytest
+from google.genai import errors
+
+from api_resilience import (CircuitBreaker, CircuitOpenError, RetryPolicy, StreamChunk,
+                            call_with_retry, resilient_stream, trim_overlap)
+
+
+NO_WAIT = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+
+def api_error(code):
+    body = {"error": {"code": code, "message": "error", "status": "ERROR"}}
+    return errors.ClientError(code, body) if code < 500 else errors.ServerError(code, body)
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    return breaker
+
+
+def test_trim_overlap_removes_repeated_tail():
+    assert trim_overlap("The quick brown fox jumps", "brown fox jumps over") == " over"
+
+
+@pytest.mark.parametrize("previous, continuation", [
+    ("Step 1.\n", "\nStep 2"),
+    ("The total is 4", "4 items"),
+])
+def test_trim_overlap_keeps_short_coincidental_matches(previous, continuation):
+    assert trim_overlap(previous, continuation) == continuation
+
+
+def test_breaker_opens_and_recovers_after_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker = open_breaker()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_call_with_retry_retries_transient_errors_only():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("connection reset")
+        return "ok"
+
+    assert call_with_retry(flaky, NO_WAIT, breaker=None, sleep=lambda delay: None) == "ok"
+    assert len(attempts) == 3
+
+    def bad_request():
+        attempts.append(1)
+        raise api_error(400)
+
+    attempts.clear()
+    with pytest.raises(errors.ClientError):
+        call_with_retry(bad_request, NO_WAIT, breaker=None, sleep=lambda delay: None)
+    assert len(attempts) == 1
+
+
+def test_interrupted_trial_call_releases_breaker():
+    breaker = open_breaker()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        call_with_retry(interrupted, NO_WAIT, breaker=breaker)
+    # A new trial is allowed instead of CircuitOpenError forever
+    assert breaker.before_call() is True
+
+
+def test_abandoned_trial_stream_releases_breaker():
+    breaker = open_breaker()
+
+    def start(partial):
+        yield StreamChunk("first")
+        yield StreamChunk("second")
+
+    stream = resilient_stream(start, NO_WAIT, breaker=breaker)
+    next(stream)
+    stream.close()
+    assert breaker.before_call() is True
+
+
+def test_resumed_stream_is_not_duplicated():
+    answer = "The quick brown fox jumps over the lazy dog."
+    calls = []
+
+    def start(partial):
+        calls.append(partial)
+        if not partial:
+            yield StreamChunk(answer[:25])
+            raise httpx.RemoteProtocolError("peer closed connection")
+        # The model repeats part of what was shown, across empty and usage-only chunks
+        yield StreamChunk("")
+        yield StreamChunk(answer[10:20])
+        yield StreamChunk("", usage_metadata="usage")
+        yield StreamChunk(answer[20:])
+
+    chunks = list(resilient_stream(start, NO_WAIT, breaker=None, sleep=lambda delay: None))
+    assert "".join(chunk.text for chunk in chunks) == answer
+    assert calls == ["", answer[:25]]
+    assert any(chunk.usage_metadata == "usage" for chunk in chunks)
@@ -0,0 +1,49 @@
+import os
+
+from artifact_store import ArtifactStore
+
+
+def make_store(tmp_path, max_bytes=10 * 1024 * 1024):
+    return ArtifactStore(root=str(tmp_path), max_bytes=max_bytes, eviction_interval=3600)
+
+
+def test_artifacts_are_reloaded_by_another_store(tmp_path):
+    make_store(tmp_path).put_text("ab" * 32, "text.txt", "héllo")
+    make_store(tmp_path).put_meta("ab" * 32, {"filename": "a.txt"})
+
+    reloaded = make_store(tmp_path)
+    assert reloaded.get_text("ab" * 32, "text.txt") == "héllo"
+    assert reloaded.get_meta("ab" * 32) == {"filename": "a.txt"}
+    assert reloaded.get_text("cd" * 32, "text.txt") is None
+
+
+def test_writes_leave_no_temp_files(tmp_path):
+    store = make_store(tmp_path)
+    store.put_bytes("ab" * 32, "data.bin", b"first")
+    store.put_bytes("ab" * 32, "data.bin", b"second")
+
+    entry = os.path.dirname(store._artifact_path("ab" * 32, "data.bin"))
+    assert os.listdir(entry) == ["data.bin"]
+    assert store.get_bytes("ab" * 32, "data.bin") == b"second"
+
+
+def test_unreadable_meta_counts_as_missing(tmp_path):
+    store = make_store(tmp_path)
+    store.put_bytes("ab" * 32, "meta.json", b"{not json")
+    assert store.get_meta("ab" * 32) is None
+
+
+def test_eviction_drops_least_recently_used_entries(tmp_path):
+    store = make_store(tmp_path, max_bytes=2500)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for age, key in enumerate(keys):
+        store.put_bytes(key, "text.txt", b"x" * 1000)
+        store.put_meta(key, {})
+        meta_path = store._artifact_path(key, "meta.json")
+        os.utime(meta_path, (1000 + age, 1000 + age))
+    # Reading the oldest entry makes it the most recently used
+    store.get_bytes(keys[0], "text.txt")
+
+    assert store.evict() > 0
+    assert store.get_meta(keys[1]) is None
+    assert store.get_meta(keys[0]) == {} and store.get_meta(keys[2]) == {}
@@ -0,0 +1,43 @@
+from context_packer import pack_context
+from retrieval import BM25Index, chunk_file_content
+
+
+def build_index(files):
+    index = BM25Index()
+    for name, text in files.items():
+        index.add_file(name, chunk_file_content(name, "text/plain", text, max_chars=200))
+    return index
+
+
+FILES = {
+    "rockets.txt": "\n\n".join(f"Rocket engines burn propellant, section {i}. " * 4 for i in range(20)),
+    "gardens.txt": "\n\n".join(f"Tomatoes need sunlight and water, bed {i}. " * 4 for i in range(20)),
+}
+
+
+def test_stays_within_budget():
+    index = build_index(FILES)
+    packed = pack_context(index, "how do rocket engines work", list(FILES), token_budget=600)
+    assert packed["tokens_used"] <= packed["file_budget"] <= 600
+    assert sum(len(chunk["text"]) // 4 for chunk in packed["chunks"]) <= packed["file_budget"]
+
+
+def test_relevant_file_gets_most_room_but_others_are_kept():
+    index = build_index(FILES)
+    packed = pack_context(index, "rocket engines propellant", list(FILES), token_budget=1000)
+    tokens = {report["file_key"]: report["tokens"] for report in packed["files"]}
+    assert tokens["rockets.txt"] > tokens["gardens.txt"] > 0
+
+
+def test_history_reserves_part_of_budget():
+    index = build_index(FILES)
+    without = pack_context(index, "rocket", list(FILES), token_budget=1000)
+    with_history = pack_context(index, "rocket", list(FILES), token_budget=1000, history_tokens=300)
+    assert with_history["file_budget"] == without["file_budget"] - 300
+
+
+def test_small_files_are_included_whole_in_document_order():
+    files = {"note.txt": "alpha\n\nbeta\n\ngamma"}
+    packed = pack_context(build_index(files), "unrelated question", list(files), token_budget=1000)
+    assert [chunk["position"] for chunk in packed["chunks"]] == sorted(chunk["position"] for chunk in packed["chunks"])
+    assert packed["files"][0]["dropped_chunks"] == 0
@@ -0,0 +1,58 @@
+import io
+
+import docx
+
+from docx_stream import iter_docx_blocks
+
+
+def python_docx_blocks(data):
+    """Paragraphs and table rows in body order, read through python-docx"""
+    document = docx.Document(io.BytesIO(data))
+    blocks = []
+    table_number = 0
+    for item in document.iter_inner_content():
+        if isinstance(item, docx.table.Table):
+            table_number += 1
+            for row in item.rows:
+                blocks.append(("table_row", table_number, [cell.text for cell in row.cells]))
+        else:
+            blocks.append(("paragraph", item.text))
+    return blocks
+
+
+def save(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_blocks_match_python_docx():
+    document = docx.Document()
+    document.add_heading("Report", level=1)
+    paragraph = document.add_paragraph("Tab\there, ")
+    paragraph.add_run("bold").bold = True
+    paragraph.add_run().add_break()
+    paragraph.add_run("next line")
+    document.add_paragraph("")
+
+    table = document.add_table(rows=3, cols=3)
+    for row_index, row in enumerate(table.rows):
+        for column_index, cell in enumerate(row.cells):
+            cell.text = f"r{row_index}c{column_index}"
+    table.cell(0, 0).merge(table.cell(0, 1))
+    table.cell(1, 2).merge(table.cell(2, 2))
+    table.cell(2, 0).add_table(rows=1, cols=1).cell(0, 0).text = "nested"
+
+    document.add_paragraph("After the table")
+    document.add_table(rows=1, cols=2).cell(0, 1).text = "second"
+    data = save(document)
+
+    streamed = list(iter_docx_blocks(io.BytesIO(data)))
+    assert streamed == python_docx_blocks(data)
+    assert ("table_row", 2, ["", "second"]) in streamed
+
+
+def test_empty_document_has_no_blocks():
+    document = docx.Document()
+    # The default template has no body content besides section properties
+    assert list(iter_docx_blocks(io.BytesIO(save(document)))) == []
@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+
+from json_analyzer import JsonTokenStream, _iter_document, analyze_json
+
+
+DOCUMENT = '[12.5, -3e-2, 1E+10, 0.125, "a-1.5e+2, b", {"x": -0.25, "y": [100, 2.0e5]}, 7]'
+
+
+def decode_in_chunks(text, chunk_chars):
+    tokens = JsonTokenStream(io.StringIO(text), chunk_chars=chunk_chars)
+    return [value for _, _, value in _iter_document(tokens)]
+
+
+@pytest.mark.parametrize("chunk_chars", range(1, 9))
+def test_numbers_split_across_chunks_decode_whole(chunk_chars):
+    assert decode_in_chunks(DOCUMENT, chunk_chars) == json.loads(DOCUMENT)
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3])
+def test_scalar_root_number_split_across_chunks(chunk_chars):
+    tokens = JsonTokenStream(io.StringIO("-12.5e-3"), chunk_chars=chunk_chars)
+    assert tokens.decode_value() == -12.5e-3
+
+
+def test_truncated_document_fails():
+    with pytest.raises(json.JSONDecodeError):
+        decode_in_chunks('[1, 2, {"a": ', 4)
+
+
+def test_trailing_data_fails():
+    with pytest.raises(json.JSONDecodeError):
+        decode_in_chunks("[1] [2]", 4)
+
+
+def test_array_root_counts_every_item_and_samples_the_first():
+    data = json.dumps([{"id": i, "tags": ["a"] * (i % 3)} for i in range(50)]).encode()
+    analysis = analyze_json(io.BytesIO(data), sample_items=10)
+
+    assert analysis["root_type"] == "array"
+    assert analysis["item_count"] == 50
+    assert analysis["schema"].samples == 10
+    assert not analysis["sampled_all"]
+    assert "$.id" in analysis["schema"].paths
+
+
+def test_wrapped_array_is_streamed_under_its_key():
+    data = json.dumps({"meta": {"page": 1}, "rows": [{"v": i} for i in range(20)]}).encode()
+    analysis = analyze_json(io.BytesIO(data))
+
+    assert analysis["root_type"] == "object"
+    assert analysis["keys"] == ["meta", "rows"]
+    assert analysis["nested"] == {"meta": ("object", 1), "rows": ("array", 20)}
+    assert analysis["schema"].paths["$.rows"]["lengths"] == [20, 20, 20, 1]
+    assert analysis["sampled_all"]
+
+
+def test_ndjson_skips_invalid_lines():
+    data = b'{"a": 1}\nnot json\n\n{"a": 2}\n'
+    analysis = analyze_json(io.BytesIO(data), ndjson=True)
+
+    assert analysis["item_count"] == 2
+    assert analysis["invalid_lines"] == 1
+
+
+def test_preview_is_bounded():
+    data = json.dumps(["x" * 100] * 100).encode()
+    analysis = analyze_json(io.BytesIO(data), preview_chars=500)
+
+    assert len(analysis["preview"]) < 600
+    assert analysis["preview_items"] < 100
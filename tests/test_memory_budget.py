@@ -0,0 +1,44 @@
+import io
+
+from PIL import Image
+
+from memory_budget import MemoryAccountant
+from utils import ProcessedFileCache, estimate_content_size
+
+
+def make_cache(*hashes):
+    cache = ProcessedFileCache()
+    for file_hash in hashes:
+        cache.put(ProcessedFileCache.make_key(file_hash, "text/plain"), "x" * 1000)
+    return cache
+
+
+def test_session_cap_keeps_the_current_uploads():
+    cache = make_cache("old", "current", "newer")
+    state = {"file_cache": cache, "active_file_hashes": ["current"]}
+    usage = MemoryAccountant(session_limit=1500, process_limit=10**9).update("s", state)
+
+    assert ProcessedFileCache.make_key("current", "text/plain") in cache
+    assert len(cache) == 1
+    assert usage["files"] == 1000
+
+
+def test_process_cap_keeps_other_sessions_current_uploads():
+    accountant = MemoryAccountant(session_limit=10**9, process_limit=2500)
+    first = make_cache("a", "b")
+    accountant.update("first", {"file_cache": first, "active_file_hashes": ["a", "b"]})
+    second = make_cache("c", "d")
+    accountant.update("second", {"file_cache": second, "active_file_hashes": ["d"]})
+
+    assert len(first) == 2
+    assert list(second._entries) == [ProcessedFileCache.make_key("d", "text/plain")]
+
+
+def test_undecoded_images_count_their_encoded_size():
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300)).save(buffer, format="PNG")
+    image = Image.open(io.BytesIO(buffer.getvalue()))
+
+    assert estimate_content_size(image) == len(buffer.getvalue())
+    image.load()
+    assert estimate_content_size(image) == 400 * 300 * 3
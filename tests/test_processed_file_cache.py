@@ -0,0 +1,44 @@
+from utils import PROCESSOR_VERSION, ProcessedFileCache
+
+
+def test_keys_separate_types_and_processor_versions():
+    key = ProcessedFileCache.make_key("abc", "text/csv")
+    assert key == f"{PROCESSOR_VERSION}:text/csv:abc"
+    assert key != ProcessedFileCache.make_key("abc", "application/json")
+
+
+def test_hits_and_misses_are_counted():
+    cache = ProcessedFileCache()
+    cache.put("k", "content")
+    assert cache.get("k") == "content"
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = ProcessedFileCache(max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.put(key, "x" * 100)
+    assert "a" not in cache and len(cache) == 2
+
+    cache.get("b")
+    cache.put("d", "x" * 100)
+    assert "b" in cache and "c" not in cache
+    assert cache.current_bytes == 200
+
+
+def test_entry_limit_and_oversized_content():
+    cache = ProcessedFileCache(max_bytes=1000, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, "x")
+    assert list(cache._entries) == ["b", "c"]
+
+    cache.put("huge", "x" * 1001)
+    assert "huge" not in cache
+
+
+def test_replacing_an_entry_updates_its_size():
+    cache = ProcessedFileCache()
+    cache.put("a", "x" * 100)
+    cache.put("a", "x" * 10)
+    assert cache.current_bytes == 10 and len(cache) == 1
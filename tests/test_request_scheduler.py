@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from request_scheduler import (BULK, EXPECTED_OUTPUT_TOKENS, INTERACTIVE, QueueTimeoutError,
+                               RequestScheduler, TokenBucket)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    # Amounts above capacity wait for a full bucket rather than forever
+    assert bucket.wait_time(1000) == pytest.approx(60.0, abs=0.5)
+
+
+def test_token_bucket_drain_and_overdraft():
+    bucket = TokenBucket(60)
+    bucket.take(100)
+    assert bucket.level < 0
+    bucket = TokenBucket(60)
+    bucket.drain()
+    assert bucket.level <= 0
+
+
+def test_actual_usage_corrects_estimate():
+    scheduler = RequestScheduler(requests_per_minute=60, tokens_per_minute=100_000)
+    ticket = scheduler.acquire("session", 1000)
+    before = scheduler.tokens.level
+    ticket.finish(actual_tokens=5000)
+    assert scheduler.tokens.level == pytest.approx(before - (5000 - 1000 - EXPECTED_OUTPUT_TOKENS), abs=50)
+
+
+def test_rate_limit_drains_buckets():
+    scheduler = RequestScheduler(requests_per_minute=60, tokens_per_minute=100_000)
+    scheduler.acquire("session", 10).finish(rate_limited=True)
+    assert scheduler.requests.level <= 0.1
+    assert scheduler.rate_limited == 1
+
+
+def test_queue_timeout():
+    scheduler = RequestScheduler(requests_per_minute=60)
+    scheduler.requests.level = -100
+    with pytest.raises(QueueTimeoutError):
+        scheduler.acquire("session", 10, timeout=0.2)
+    assert not scheduler._waiting
+
+
+def run_queued(requests):
+    """Start (session_id, priority, tag, delay) requests against an empty bucket; return admission order"""
+    # Two requests per second, starting empty, so every request queues
+    scheduler = RequestScheduler(requests_per_minute=120, tokens_per_minute=10 ** 9)
+    scheduler.requests.level = 0
+    order = []
+    lock = threading.Lock()
+
+    def request(session_id, priority, tag, delay):
+        time.sleep(delay)
+        ticket = scheduler.acquire(session_id, 100, priority, timeout=10)
+        with lock:
+            order.append(tag)
+        ticket.finish()
+
+    threads = [threading.Thread(target=request, args=args) for args in requests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_interactive_requests_go_before_bulk():
+    order = run_queued([("a", BULK, "bulk", 0), ("b", INTERACTIVE, "short", 0.1)])
+    assert order == ["short", "bulk"]
+
+
+def test_sessions_take_turns():
+    order = run_queued([("heavy", INTERACTIVE, "heavy0", 0), ("heavy", INTERACTIVE, "heavy1", 0.05),
+                        ("light", INTERACTIVE, "light", 0.1)])
+    assert order == ["heavy0", "light", "heavy1"]
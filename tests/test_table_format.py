@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from table_format import DITTO, estimate_table_tokens, format_cell, format_compact_table, format_number
+
+
+@pytest.mark.parametrize("value, expected", [
+    (3.14159265, "3.142"),
+    (1234567.891, "1234568"),
+    (0.000028321, "2.832e-5"),
+    (0.5, "0.5"),
+    (-0.0, "0"),
+    (float("nan"), ""),
+    (float("inf"), "inf"),
+])
+def test_format_number(value, expected):
+    assert format_number(value) == expected
+
+
+def test_format_cell():
+    assert format_cell(None) == ""
+    assert format_cell(np.int64(42)) == "42"
+    assert format_cell(pd.Timestamp("2024-05-01")) == "2024-05-01"
+    assert format_cell("a | b\n c") == "a / b c"
+    assert format_cell("x" * 100, max_chars=10) == "x" * 9 + "…"
+
+
+def test_compact_table_uses_ditto_marks_and_hides_range_index():
+    frame = pd.DataFrame({"region": ["North", "North", "South"], "sales": [1.0, 2.5, 2.5]})
+    text = format_compact_table(frame)
+    assert text.splitlines()[:4] == ["region | sales", "North | 1", f"{DITTO} | 2.5", f"South | {DITTO}"]
+    assert text.endswith(f"({DITTO} = same as the row above)")
+
+    indexed = format_compact_table(frame.set_index("region"))
+    assert indexed.splitlines()[0] == "region | sales"
+
+
+def test_compact_table_respects_token_budget():
+    frame = pd.DataFrame({"value": np.arange(1000) * 1.25, "label": [f"row {i}" for i in range(1000)]})
+    text = format_compact_table(frame, max_tokens=200)
+    lines = text.splitlines()
+    assert lines[-1].startswith("…") and lines[-1].endswith("more rows")
+    assert estimate_table_tokens("\n".join(lines[:-1])) <= 200
+
+
+def test_compact_table_is_cheaper_than_to_string():
+    frame = pd.DataFrame({"value": np.random.default_rng(0).random(200), "group": ["alpha"] * 200})
+    assert estimate_table_tokens(format_compact_table(frame)) < estimate_table_tokens(frame.to_string())
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from table_query import (QueryPlanError, TableCache, TableTooLargeError, execute_query_plan,
+                         parse_query_plan, run_table_query)
+
+
+TABLES = {"sales.csv": pd.DataFrame({
+    "region": ["north", "south", "north", "east", None],
+    "amount": [10.0, 20.0, 30.0, 40.0, 50.0],
+    "product": ["Apple", "banana", "apricot", "Cherry", "apple pie"],
+})}
+
+
+def test_fenced_plan_is_parsed_and_empty_table_declines():
+    assert parse_query_plan('```json\n{"table": "sales.csv"}\n```') == {"table": "sales.csv"}
+    assert parse_query_plan('{"table": ""}') is None
+    with pytest.raises(QueryPlanError):
+        parse_query_plan("[1, 2]")
+    with pytest.raises(QueryPlanError):
+        parse_query_plan("not json")
+
+
+def test_grouped_aggregation_over_filtered_rows():
+    outcome = execute_query_plan(TABLES, {
+        "table": "sales.csv",
+        "filters": [{"column": "amount", "op": ">", "value": "15"}],
+        "group_by": ["region"],
+        "aggregations": [{"func": "sum", "column": "amount"}, {"func": "count"}],
+        "sort": {"by": "sum_amount", "descending": True},
+    })
+
+    assert outcome["matched_rows"] == 4
+    result = outcome["result"]
+    assert list(result.columns) == ["region", "sum_amount", "count"]
+    assert result["sum_amount"].tolist() == [50.0, 40.0, 30.0, 20.0]
+
+
+def test_text_filters_ignore_case_and_nulls():
+    outcome = execute_query_plan(TABLES, {
+        "table": "sales.csv",
+        "filters": [{"column": "product", "op": "startswith", "value": "ap"},
+                    {"column": "region", "op": "not_null"}],
+        "columns": ["product"],
+    })
+    assert outcome["result"]["product"].tolist() == ["Apple", "apricot"]
+
+
+@pytest.mark.parametrize("plan", [
+    {"table": "missing.csv"},
+    {"table": "sales.csv", "filters": [{"column": "nope", "op": "==", "value": 1}]},
+    {"table": "sales.csv", "filters": [{"column": "amount", "op": "eval", "value": "1"}]},
+    {"table": "sales.csv", "filters": [{"column": "amount", "op": ">", "value": "lots"}]},
+    {"table": "sales.csv", "filters": [{"column": "amount", "op": ">", "value": [1, 2]}]},
+    {"table": "sales.csv", "aggregations": [{"func": "__import__", "column": "amount"}]},
+    {"table": "sales.csv", "aggregations": [{"func": "mean", "column": "product"}]},
+    {"table": "sales.csv", "aggregations": [{"func": "sum"}]},
+    {"table": "sales.csv", "group_by": ["region"] * 11},
+    {"table": "sales.csv", "sort": {"by": "nope"}},
+    {"table": "sales.csv", "limit": -1},
+])
+def test_invalid_plans_are_rejected(plan):
+    with pytest.raises(QueryPlanError):
+        execute_query_plan(TABLES, plan)
+
+
+def test_invalid_plan_becomes_an_error_note():
+    result = run_table_query('{"table": "sales.csv", "columns": ["nope"]}', TABLES)
+    assert result.startswith("(Local table query failed: Unknown column: nope")
+
+
+def test_result_rows_are_capped():
+    tables = {"t": pd.DataFrame({"x": range(200)})}
+    outcome = execute_query_plan(tables, {"table": "t", "limit": 500})
+    assert outcome["total_rows"] == 200
+    assert len(outcome["result"]) == 50
+
+
+def test_oversized_files_are_refused_before_loading():
+    cache = TableCache(max_bytes=1024 * 1024, max_file_bytes=100)
+    data = b"x\n" + b"1\n" * 100
+    assert not cache.can_load("hash", "big.csv", len(data))
+    with pytest.raises(TableTooLargeError):
+        cache.get_tables("hash", data, "big.csv", "text/csv")
+
+
+def test_tables_larger_than_the_cache_are_remembered():
+    cache = TableCache(max_bytes=100, max_file_bytes=1024 * 1024)
+    data = b"x\n" + b"1\n" * 100
+    assert cache.can_load("hash", "wide.csv", len(data))
+    with pytest.raises(TableTooLargeError):
+        cache.get_tables("hash", data, "wide.csv", "text/csv")
+    assert not cache.can_load("hash", "wide.csv", len(data))
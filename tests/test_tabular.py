@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from tabular import NumericSummary, iter_sheet_chunks, numeric_summary_frame, profile_csv
+
+
+def test_numeric_summary_merges_chunks_exactly():
+    values = pd.Series(np.random.default_rng(1).normal(50, 10, 10_000))
+    values[::7] = np.nan
+    summary = NumericSummary()
+    for start in range(0, len(values), 1234):
+        summary.update(values[start:start + 1234])
+
+    assert summary.count == values.count()
+    assert summary.mean == pytest.approx(values.mean())
+    assert summary.std == pytest.approx(values.std())
+    assert summary.min == values.min() and summary.max == values.max()
+
+
+def test_csv_profile_matches_pandas_across_chunks():
+    frame = pd.DataFrame({
+        "amount": np.arange(1000) * 1.5,
+        "name": [f"item {i}" for i in range(1000)],
+        # Numeric in the first chunks, text later: must not be summarized as numeric
+        "code": [str(i) for i in range(999)] + ["unknown"],
+    })
+    data = frame.to_csv(index=False).encode()
+    profile = profile_csv(io.BytesIO(data), chunk_rows=100, sample_rows=50)
+
+    assert profile["rows"] == 1000
+    assert list(profile["numeric"]) == ["amount"]
+    described = numeric_summary_frame(profile)["amount"]
+    expected = frame["amount"].describe()
+    for stat in ("count", "mean", "std", "min", "max"):
+        assert described[stat] == pytest.approx(expected[stat])
+
+
+def test_sheet_chunks_keep_blank_rows_like_pandas():
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in (["x", "y"], [1, 2], [None, None], [3, 4], [None, None]):
+        sheet.append(row)
+    data = io.BytesIO()
+    workbook.save(data)
+
+    worksheet = openpyxl.load_workbook(io.BytesIO(data.getvalue()), read_only=True).active
+    streamed = pd.concat(list(iter_sheet_chunks(worksheet, None, {})), ignore_index=True)
+    expected = pd.read_excel(io.BytesIO(data.getvalue()))
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
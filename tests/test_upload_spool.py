@@ -0,0 +1,58 @@
+import hashlib
+import io
+import os
+import pickle
+
+import pytest
+
+from upload_spool import MappedFile, as_binary_stream, spool_bytes, spool_upload
+
+
+DATA = bytes(range(256)) * 4096
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_SPOOL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_pickling_sends_the_path_not_the_contents():
+    mapped = spool_bytes(DATA)
+    payload = pickle.dumps(mapped)
+    assert len(payload) < 1024
+
+    restored = pickle.loads(payload)
+    assert restored.path == mapped.path
+    assert restored.file_hash == hashlib.sha256(DATA).hexdigest()
+    assert restored.getvalue() == DATA
+
+
+def test_spool_file_is_content_addressed_and_reused(spool_dir):
+    upload = io.BytesIO(DATA)
+    upload.name, upload.type = "data.bin", "application/octet-stream"
+    file_hash = hashlib.sha256(DATA).hexdigest()
+
+    first = spool_upload(upload, file_hash)
+    second = spool_upload(upload, file_hash)
+    assert first.path == second.path == os.path.join(str(spool_dir), file_hash)
+    assert (second.name, second.type, second.size) == ("data.bin", "application/octet-stream", len(DATA))
+    assert [name for name in os.listdir(spool_dir) if name.startswith(".tmp-")] == []
+
+
+def test_reads_and_clones_keep_their_own_position():
+    mapped = spool_bytes(DATA)
+    clone = mapped.clone()
+    assert mapped.read(10) == DATA[:10]
+    assert clone.read(5) == DATA[:5]
+    mapped.seek(-3, io.SEEK_END)
+    assert mapped.read() == DATA[-3:]
+    assert clone.tell() == 5
+
+
+def test_binary_stream_reads_in_place():
+    mapped = spool_bytes(DATA)
+    stream = as_binary_stream(mapped)
+    assert isinstance(stream, MappedFile) and stream is not mapped
+    assert stream.read(4) == DATA[:4]
+    assert mapped.tell() == 0
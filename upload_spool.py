@@ -0,0 +1,214 @@
+"""
+Upload Spooling for AI Chatbot Hub
+
+Large uploads are written once to a content-addressed temp file and memory
+mapped. Processors read from the mapping instead of making private byte copies,
+worker processes re-map the same file instead of receiving a pickled copy, and
+sessions uploading the same file share one spool file and its page cache.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import io
+import os
+import mmap
+import hashlib
+import time
+import tempfile
+import threading
+from typing import Optional, Union
+
+from env_config import get_env_int
+
+
+DEFAULT_SPOOL_THRESHOLD_MB = 8
+# Spool files not used for this long are deleted
+SPOOL_MAX_AGE_SECONDS = 3600
+CLEANUP_INTERVAL_SECONDS = 300
+
+_cleanup_lock = threading.Lock()
+_last_cleanup = 0.0
+
+
+def get_spool_threshold() -> int:
+    """
+    Get the upload size (in bytes) from which uploads are spooled to disk
+
+    Returns:
+        Value of UPLOAD_SPOOL_THRESHOLD_MB in bytes, or DEFAULT_SPOOL_THRESHOLD_MB
+    """
+    return get_env_int("UPLOAD_SPOOL_THRESHOLD_MB", DEFAULT_SPOOL_THRESHOLD_MB) * 1024 * 1024
+
+
+def get_spool_dir() -> str:
+    """Directory holding spool files (UPLOAD_SPOOL_DIR, or a folder in the system temp dir)"""
+    return os.getenv("UPLOAD_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "ai-chatbot-spool")
+
+
+class MappedFile(io.RawIOBase):
+    """
+    Read-only file object over a memory-mapped spool file
+
+    Behaves like an uploaded file (name, type, size, read/seek, getvalue). Pickling
+    only sends the path, so worker processes map the same file instead of copying it.
+    file_hash carries the known content hash so processors don't hash it again.
+    """
+
+    def __init__(self, path: str, name: str, file_type: str, file_hash: Optional[str] = None,
+                 _mapping: Optional[mmap.mmap] = None):
+        super().__init__()
+        self.path = path
+        self.name = name
+        self.type = file_type
+        self.file_hash = file_hash
+        if _mapping is None:
+            with open(path, "rb") as handle:
+                # mmap keeps its own handle, so the file can be closed right away
+                _mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._map = _mapping
+        self.size = len(_mapping)
+        self._position = 0
+
+    def __reduce__(self):
+        return MappedFile, (self.path, self.name, self.type, self.file_hash)
+
+    def clone(self) -> "MappedFile":
+        """Independent reader over the same mapping (own position, no copy)"""
+        return MappedFile(self.path, self.name, self.type, self.file_hash, self._map)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), self.size - self._position))
+        with memoryview(self._map) as view:
+            buffer[:count] = view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def readall(self) -> bytes:
+        data = self._map[self._position:]
+        self._position = self.size
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._position = max(0, self._position)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def getbuffer(self) -> memoryview:
+        """Zero-copy view of the whole file; release it when done"""
+        return memoryview(self._map)
+
+    def getvalue(self) -> bytes:
+        return self._map[:]
+
+    def __getitem__(self, index):
+        return self._map[index]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def as_binary_stream(data: Union[bytes, MappedFile]):
+    """Readable binary stream over file bytes or a MappedFile, without copying mapped data"""
+    if isinstance(data, MappedFile):
+        return data.clone()
+    return io.BytesIO(data)
+
+
+def as_buffer(data: Union[bytes, MappedFile]):
+    """Bytes-like view of file bytes or a MappedFile, e.g. for hashing"""
+    if isinstance(data, MappedFile):
+        return data.getbuffer()
+    return data
+
+
+def _cleanup_spool(spool_dir: str) -> None:
+    """Delete spool files that haven't been used recently, at most every few minutes"""
+    global _last_cleanup
+    now = time.time()
+    with _cleanup_lock:
+        if now - _last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+        _last_cleanup = now
+    try:
+        entries = list(os.scandir(spool_dir))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > SPOOL_MAX_AGE_SECONDS:
+                # Existing mappings stay valid after the file is unlinked
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def spool_upload(uploaded_file, file_hash: str) -> MappedFile:
+    """
+    Write an upload to its content-addressed spool file (once) and map it
+
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        file_hash: SHA-256 of the file contents, used as the spool file name
+
+    Returns:
+        MappedFile over the spooled contents
+    """
+    spool_dir = get_spool_dir()
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, file_hash)
+
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        fd, temp_path = tempfile.mkstemp(dir=spool_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                if hasattr(uploaded_file, "getbuffer"):
+                    with uploaded_file.getbuffer() as view:
+                        handle.write(view)
+                else:
+                    uploaded_file.seek(0)
+                    handle.write(uploaded_file.read())
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    _cleanup_spool(spool_dir)
+    return MappedFile(path, uploaded_file.name, uploaded_file.type, file_hash)
+
+
+def spool_bytes(data: bytes, file_hash: Optional[str] = None) -> MappedFile:
+    """
+    Spool in-memory bytes so several worker processes can map them instead of each receiving a copy
+
+    Args:
+        data: File contents
+        file_hash: SHA-256 of data, if already known
+
+    Returns:
+        MappedFile over the spooled contents
+    """
+    upload = io.BytesIO(data)
+    upload.name = upload.type = ""
+    return spool_upload(upload, file_hash or hashlib.sha256(data).hexdigest())
@@ -9,12 +9,70 @@ Version: 3.0
 """
 
 import io
+import re
+import sys
 import json
-import pandas as pd
-from PIL import Image
-import PyPDF2
-import docx
-from typing import Tuple, Union, Any
+import codecs
+import functools
+import hashlib
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Tuple, Union, Any, Optional, Callable, Iterator, NamedTuple, Collection, TYPE_CHECKING
+from worker_pools import get_executor, discard_executor, get_max_workers
+from json_analyzer import analyze_json, format_json_analysis
+from docx_stream import iter_docx_blocks
+from upload_spool import MappedFile, as_binary_stream, get_spool_threshold, spool_upload
+from startup_timing import timed_import
+
+# pandas, PyPDF2, python-docx and Pillow (and the modules built on them) are
+# imported the first time a file of their type is processed
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# Bump whenever processing output changes so cached results are invalidated
+PROCESSOR_VERSION = "3.4"
+
+# JSON documents up to this size are included in full; larger ones get a bounded preview
+JSON_FULL_CONTENT_BYTES = 64 * 1024
+
+# Token budget for each table preview; wide tables show fewer rows
+TABLE_PREVIEW_MAX_TOKENS = 800
+
+NDJSON_FILE_TYPES = ("application/x-ndjson", "application/jsonl")
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+
+
+def is_ndjson_file(uploaded_file) -> bool:
+    """Check whether an upload is newline-delimited JSON (browsers rarely report a MIME type for it)"""
+    return (uploaded_file.type in NDJSON_FILE_TYPES or
+            uploaded_file.name.lower().endswith(NDJSON_EXTENSIONS))
+
+
+class Segment(NamedTuple):
+    """
+    One piece of processed file output
+    
+    kind is "header", "text", "page", "paragraph", "table_row", "sheet_summary" or
+    "section"; text is exactly what the segment contributes to the processed
+    content; label names its location (e.g. "Page 3", "Sheet Sales", "Table 2").
+    """
+    kind: str
+    text: str
+    label: Optional[str] = None
+
+
+class SegmentProcessor(NamedTuple):
+    """Segment generator for a file type plus how its output is reported"""
+    stream: Callable[..., Iterator[Segment]]
+    error_label: str
+    empty_message: Optional[str] = None
+    # Cheaper generator for previews; stream is used when None
+    preview: Optional[Callable[..., Iterator[Segment]]] = None
 
 
 class FileProcessor:
@@ -29,163 +87,270 @@ class FileProcessor:
             "filesize": uploaded_file.size
         }
     
+    @staticmethod
+    def iter_text_segments(uploaded_file, chunk_size: int = 1024 * 1024) -> Iterator[Segment]:
+        """Yield a plain text file in decoded chunks"""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        while True:
+            data = uploaded_file.read(chunk_size)
+            text = decoder.decode(data, final=not data)
+            if text:
+                yield Segment("text", text)
+            if not data:
+                return
+    
     @staticmethod
     def process_text_file(uploaded_file) -> Tuple[str, dict]:
         """Process plain text files (.txt)"""
-        try:
-            content = str(uploaded_file.read(), "utf-8")
-            return content, FileProcessor.get_file_details(uploaded_file)
-        except Exception as e:
-            return f"Error processing text file: {str(e)}", FileProcessor.get_file_details(uploaded_file)
+        return collect_segments(uploaded_file, SEGMENT_PROCESSORS["text/plain"])
     
     @staticmethod
-    def process_pdf_file(uploaded_file) -> Tuple[str, dict]:
-        """Process PDF files (.pdf)"""
+    def iter_pdf_segments(uploaded_file, page_numbers: Optional[list] = None,
+                          max_workers: Optional[int] = None) -> Iterator[Segment]:
+        """Yield one segment per non-empty PDF page, in page order (max_workers=1 extracts lazily page by page)"""
+        pdf_engine = timed_import("pdf_engine")
+        # Uploads carry the hash computed on upload (compute_file_hash); others are hashed here
+        pdf_document = pdf_engine.PdfDocument(get_upload_source(uploaded_file),
+                                              getattr(uploaded_file, "file_hash", None))
+        for page_number, text in pdf_document.stream_pages(page_numbers, max_workers):
+            page_text = pdf_engine.format_pdf_pages([(page_number, text)])
+            if page_text:
+                yield Segment("page", page_text, f"Page {page_number}")
+    
+    @staticmethod
+    def process_pdf_file(uploaded_file, page_numbers: Optional[list] = None) -> Tuple[str, dict]:
+        """Process PDF files (.pdf), optionally only the given 1-based page numbers"""
+        return collect_segments(uploaded_file, SEGMENT_PROCESSORS["application/pdf"],
+                                page_numbers=page_numbers)
+    
+    @staticmethod
+    def iter_word_blocks(uploaded_file):
+        """Yield ("paragraph", text) and ("table_row", table_number, cells) blocks of a .docx file"""
+        streamed = False
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-            content = ""
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                page_text = page.extract_text()
-                if page_text.strip():  # Only add non-empty pages
-                    content += f"--- Page {page_num} ---\n{page_text}\n\n"
-            
-            if not content.strip():
-                content = "No readable text found in the PDF file."
-            
-            return content, FileProcessor.get_file_details(uploaded_file)
-        except Exception as e:
-            return f"Error processing PDF file: {str(e)}", FileProcessor.get_file_details(uploaded_file)
+            uploaded_file.seek(0)
+            for block in iter_docx_blocks(uploaded_file):
+                streamed = True
+                yield block
+            return
+        except (KeyError, zipfile.BadZipFile, ET.ParseError):
+            # Unusual package layout or markup; fall back to python-docx unless blocks were already emitted
+            if streamed:
+                raise
+        
+        uploaded_file.seek(0)
+        doc = timed_import("docx").Document(uploaded_file)
+        for paragraph in doc.paragraphs:
+            yield "paragraph", paragraph.text
+        for table_num, table in enumerate(doc.tables, 1):
+            for row in table.rows:
+                yield "table_row", table_num, [cell.text for cell in row.cells]
+    
+    @staticmethod
+    def iter_word_segments(uploaded_file) -> Iterator[Segment]:
+        """Yield non-empty paragraphs as they are read, then the document's tables row by row"""
+        table_segments = []
+        current_table = 0
+        
+        for block in FileProcessor.iter_word_blocks(uploaded_file):
+            if block[0] == "paragraph":
+                if block[1].strip():  # Only add non-empty paragraphs
+                    yield Segment("paragraph", block[1] + "\n")
+            else:
+                _, table_num, cells = block
+                label = f"Table {table_num}"
+                if not table_segments:
+                    table_segments.append(Segment("header", "\n--- Tables in Document ---\n"))
+                if table_num != current_table:
+                    current_table = table_num
+                    table_segments.append(Segment("header", f"\n{label}:\n", label))
+                table_segments.append(Segment("table_row", " | ".join(cell.strip() for cell in cells) + "\n", label))
+        
+        # Tables are listed after the text, as in earlier versions
+        yield from table_segments
     
     @staticmethod
     def process_word_file(uploaded_file) -> Tuple[str, dict]:
         """Process Word documents (.docx)"""
-        try:
-            doc = docx.Document(io.BytesIO(uploaded_file.read()))
-            content = ""
-            
-            # Process paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():  # Only add non-empty paragraphs
-                    content += paragraph.text + "\n"
-            
-            # Process tables if any
-            if doc.tables:
-                content += "\n--- Tables in Document ---\n"
-                for table_num, table in enumerate(doc.tables, 1):
-                    content += f"\nTable {table_num}:\n"
-                    for row in table.rows:
-                        row_text = " | ".join([cell.text.strip() for cell in row.cells])
-                        content += row_text + "\n"
-            
-            if not content.strip():
-                content = "No readable content found in the Word document."
-            
-            return content, FileProcessor.get_file_details(uploaded_file)
-        except Exception as e:
-            return f"Error processing Word file: {str(e)}", FileProcessor.get_file_details(uploaded_file)
+        return collect_segments(
+            uploaded_file,
+            SEGMENT_PROCESSORS["application/vnd.openxmlformats-officedocument.wordprocessingml.document"])
     
     @staticmethod
-    def process_excel_file(uploaded_file) -> Tuple[str, dict]:
-        """Process Excel files (.xlsx, .xls)"""
-        try:
-            # Read all sheets
-            excel_data = pd.read_excel(io.BytesIO(uploaded_file.read()), sheet_name=None)
-            content = f"Excel file: {uploaded_file.name}\n"
-            content += f"Number of sheets: {len(excel_data)}\n\n"
-            
-            for sheet_name, df in excel_data.items():
-                content += f"--- Sheet: {sheet_name} ---\n"
-                content += f"Shape: {df.shape[0]} rows, {df.shape[1]} columns\n\n"
-                
-                # Show first few rows
-                content += "Data Preview:\n"
-                content += df.head(10).to_string(index=True) + "\n\n"
-                
-                # Basic statistics for numeric columns
-                numeric_cols = df.select_dtypes(include=['number']).columns
-                if len(numeric_cols) > 0:
-                    content += "Numeric Columns Summary:\n"
-                    content += df[numeric_cols].describe().to_string() + "\n\n"
-                
-                # Column information
-                content += "Column Information:\n"
-                for col in df.columns:
-                    content += f"- {col}: {df[col].dtype} (Non-null: {df[col].notna().sum()}/{len(df)})\n"
-                content += "\n" + "="*50 + "\n\n"
-            
-            return content, FileProcessor.get_file_details(uploaded_file)
-        except Exception as e:
-            return f"Error processing Excel file: {str(e)}", FileProcessor.get_file_details(uploaded_file)
+    def format_sheet_summary(sheet_name: str, profile: dict) -> str:
+        """Format the summary of one profiled Excel sheet"""
+        tabular = timed_import("tabular")
+        format_compact_table = timed_import("table_format").format_compact_table
+        rows, columns = profile["rows"], profile["columns"]
+        parts = [f"--- Sheet: {sheet_name} ---\n"]
+        if profile["truncated"]:
+            parts.append(f"Shape: ~{profile['declared_rows'] or rows} rows, {len(columns)} columns "
+                         f"(statistics from the first {rows} rows)\n\n")
+        else:
+            parts.append(f"Shape: {rows} rows, {len(columns)} columns\n\n")
+        
+        # Show first few rows
+        parts.append("Data Preview:\n")
+        parts.append(format_compact_table(profile["preview"], max_tokens=TABLE_PREVIEW_MAX_TOKENS) + "\n\n")
+        
+        # Basic statistics for numeric columns
+        if profile["numeric"]:
+            if profile["sample"].is_complete:
+                parts.append("Numeric Columns Summary:\n")
+            else:
+                parts.append(f"Numeric Columns Summary (quartiles estimated from a {profile['sample'].size:,}-row sample):\n")
+            parts.append(format_compact_table(tabular.numeric_summary_frame(profile).T, index=True) + "\n\n")
+        
+        # Column information
+        parts.append("Column Information:\n")
+        for col in columns:
+            parts.append(f"- {col}: {profile['dtypes'][col]} (Non-null: {profile['non_null'][col]}/{rows})\n")
+        parts.append("\n" + "="*50 + "\n\n")
+        return "".join(parts)
     
     @staticmethod
-    def process_csv_file(uploaded_file) -> Tuple[str, dict]:
-        """Process CSV files (.csv)"""
-        try:
-            df = pd.read_csv(io.BytesIO(uploaded_file.read()))
-            content = f"CSV file: {uploaded_file.name}\n"
-            content += f"Shape: {df.shape[0]} rows, {df.shape[1]} columns\n\n"
-            
-            # Data preview
-            content += "Data Preview (first 10 rows):\n"
-            content += df.head(10).to_string(index=True) + "\n\n"
-            
-            # Basic statistics for numeric columns
-            numeric_cols = df.select_dtypes(include=['number']).columns
-            if len(numeric_cols) > 0:
-                content += "Numeric Columns Summary:\n"
-                content += df[numeric_cols].describe().to_string() + "\n\n"
-            
-            # Column information
-            content += "Column Information:\n"
-            for col in df.columns:
-                content += f"- {col}: {df[col].dtype} (Non-null: {df[col].notna().sum()}/{len(df)})\n"
-            
-            # Missing values summary
-            missing_values = df.isnull().sum()
-            if missing_values.sum() > 0:
-                content += f"\nMissing Values:\n"
-                for col, missing_count in missing_values[missing_values > 0].items():
-                    content += f"- {col}: {missing_count} missing values\n"
-            
-            return content, FileProcessor.get_file_details(uploaded_file)
-        except Exception as e:
-            return f"Error processing CSV file: {str(e)}", FileProcessor.get_file_details(uploaded_file)
+    def iter_excel_segments(uploaded_file, sheet_names: Optional[list] = None) -> Iterator[Segment]:
+        """Yield the workbook header, then one summary per sheet as soon as it is profiled"""
+        tabular = timed_import("tabular")
+        pd = timed_import("pandas")
+        data = get_upload_source(uploaded_file)
+        if data[:2] == b"PK":
+            # .xlsx: stream each sheet with openpyxl, sheets profiled concurrently
+            names = tabular.list_excel_sheets(data, sheet_names)
+            sheets = tabular.iter_excel_workbook_profiles(
+                data, names, file_hash=getattr(uploaded_file, "file_hash", None))
+        else:
+            # Legacy .xls isn't readable by openpyxl; load it with pandas
+            excel_data = pd.read_excel(as_binary_stream(data), sheet_name=sheet_names)
+            names = list(excel_data)
+            sheets = ((sheet_name, dict(tabular.profile_chunks([df]), truncated=False, declared_rows=None))
+                      for sheet_name, df in excel_data.items())
+        
+        yield Segment("header", f"Excel file: {uploaded_file.name}\nNumber of sheets: {len(names)}\n\n")
+        for sheet_name, profile in sheets:
+            yield Segment("sheet_summary", FileProcessor.format_sheet_summary(sheet_name, profile),
+                          f"Sheet {sheet_name}")
     
     @staticmethod
-    def process_json_file(uploaded_file) -> Tuple[str, dict]:
-        """Process JSON files (.json)"""
-        try:
-            json_data = json.loads(uploaded_file.read())
-            content = f"JSON file: {uploaded_file.name}\n\n"
-            
-            # Pretty print JSON with proper formatting
-            formatted_json = json.dumps(json_data, indent=2, ensure_ascii=False)
-            content += "JSON Content:\n"
-            content += formatted_json + "\n\n"
-            
-            # Basic structure analysis
-            content += "Structure Analysis:\n"
-            if isinstance(json_data, dict):
-                content += f"- Root type: Dictionary with {len(json_data)} keys\n"
-                content += f"- Keys: {list(json_data.keys())}\n"
-            elif isinstance(json_data, list):
-                content += f"- Root type: Array with {len(json_data)} items\n"
-                if json_data and isinstance(json_data[0], dict):
-                    content += f"- Sample keys in first item: {list(json_data[0].keys())}\n"
+    def iter_excel_preview_segments(uploaded_file, max_rows: Optional[int] = None) -> Iterator[Segment]:
+        """Yield the first rows of each sheet without profiling the workbook"""
+        tabular = timed_import("tabular")
+        format_compact_table = timed_import("table_format").format_compact_table
+        pd = timed_import("pandas")
+        max_rows = max_rows or tabular.PREVIEW_ROWS
+        if uploaded_file.read(2) == b"PK":
+            uploaded_file.seek(0)
+            sheets = tabular.iter_excel_previews(uploaded_file, max_rows)
+        else:
+            uploaded_file.seek(0)
+            sheets = pd.read_excel(uploaded_file, sheet_name=None, nrows=max_rows).items()
+        
+        yield Segment("header", f"Excel file: {uploaded_file.name}\n\n")
+        for sheet_name, head in sheets:
+            yield Segment("sheet_summary", f"--- Sheet: {sheet_name} ---\n"
+                          f"{format_compact_table(head, max_tokens=TABLE_PREVIEW_MAX_TOKENS)}\n\n",
+                          f"Sheet {sheet_name}")
+    
+    @staticmethod
+    def process_excel_file(uploaded_file, sheet_names: Optional[list] = None) -> Tuple[str, dict]:
+        """Process Excel files (.xlsx, .xls), optionally only the named sheets"""
+        return collect_segments(uploaded_file, SEGMENT_PROCESSORS["application/vnd.ms-excel"],
+                                sheet_names=sheet_names)
+    
+    @staticmethod
+    def iter_csv_segments(uploaded_file) -> Iterator[Segment]:
+        """Profile a CSV file in a single chunked pass with bounded memory and yield its summary"""
+        tabular = timed_import("tabular")
+        format_compact_table = timed_import("table_format").format_compact_table
+        profile = tabular.profile_csv(uploaded_file)
+        rows, columns = profile["rows"], profile["columns"]
+        yield Segment("header", f"CSV file: {uploaded_file.name}\n")
+        
+        parts = [f"Shape: {rows} rows, {len(columns)} columns\n\n"]
+        
+        # Data preview
+        parts.append("Data Preview (first 10 rows):\n")
+        parts.append(format_compact_table(profile["preview"], max_tokens=TABLE_PREVIEW_MAX_TOKENS) + "\n\n")
+        
+        # Basic statistics for numeric columns
+        if profile["numeric"]:
+            if profile["sample"].is_complete:
+                parts.append("Numeric Columns Summary:\n")
             else:
-                content += f"- Root type: {type(json_data).__name__}\n"
-            
-            return content, FileProcessor.get_file_details(uploaded_file)
-        except json.JSONDecodeError as e:
-            return f"Invalid JSON format: {str(e)}", FileProcessor.get_file_details(uploaded_file)
-        except Exception as e:
-            return f"Error processing JSON file: {str(e)}", FileProcessor.get_file_details(uploaded_file)
+                parts.append(f"Numeric Columns Summary (quartiles estimated from a {profile['sample'].size:,}-row sample):\n")
+            parts.append(format_compact_table(tabular.numeric_summary_frame(profile).T, index=True) + "\n\n")
+        
+        # Column information
+        parts.append("Column Information:\n")
+        for col in columns:
+            parts.append(f"- {col}: {profile['dtypes'][col]} (Non-null: {profile['non_null'][col]}/{rows})\n")
+        
+        # Missing values summary
+        missing_values = {col: rows - profile["non_null"][col] for col in columns}
+        if sum(missing_values.values()) > 0:
+            parts.append(f"\nMissing Values:\n")
+            for col, missing_count in missing_values.items():
+                if missing_count > 0:
+                    parts.append(f"- {col}: {missing_count} missing values\n")
+        
+        yield Segment("sheet_summary", "".join(parts), "Table")
+    
+    @staticmethod
+    def iter_csv_preview_segments(uploaded_file, max_rows: Optional[int] = None) -> Iterator[Segment]:
+        """Yield the head of a CSV file, reading only the first rows"""
+        tabular = timed_import("tabular")
+        format_compact_table = timed_import("table_format").format_compact_table
+        pd = timed_import("pandas")
+        head = pd.read_csv(uploaded_file, nrows=max_rows or tabular.PREVIEW_ROWS)
+        yield Segment("header", f"CSV file: {uploaded_file.name}\n")
+        yield Segment("sheet_summary", f"Data Preview (first {len(head)} rows):\n"
+                      f"{format_compact_table(head, max_tokens=TABLE_PREVIEW_MAX_TOKENS)}\n",
+                      "Table")
+    
+    @staticmethod
+    def process_csv_file(uploaded_file) -> Tuple[str, dict]:
+        """Process CSV files (.csv) in a single chunked pass with bounded memory"""
+        return collect_segments(uploaded_file, SEGMENT_PROCESSORS["text/csv"])
+    
+    @staticmethod
+    def iter_json_segments(uploaded_file, ndjson: bool = False) -> Iterator[Segment]:
+        """Yield the content (or a bounded preview) of a JSON/NDJSON file, then its structure analysis"""
+        uploaded_file.seek(0)
+        analysis = analyze_json(uploaded_file, ndjson=ndjson)
+        yield Segment("header", f"JSON file: {uploaded_file.name}\n\n")
+        
+        size = getattr(uploaded_file, "size", None)
+        if not ndjson and size is not None and size <= JSON_FULL_CONTENT_BYTES:
+            # Small documents are still shown in full
+            uploaded_file.seek(0)
+            formatted_json = json.dumps(json.loads(uploaded_file.read()), indent=2, ensure_ascii=False)
+            yield Segment("section", "JSON Content:\n" + formatted_json + "\n\n", "Content")
+        else:
+            shown, total = analysis["preview_items"], analysis["item_count"]
+            unit = "records" if ndjson else "keys" if analysis["root_type"] == "object" else "items"
+            yield Segment("section",
+                          f"JSON Content (preview of first {shown:,} of {total:,} {unit}):\n"
+                          + analysis["preview"] + "\n\n", "Content")
+        
+        yield Segment("section", format_json_analysis(analysis), "Structure")
+    
+    @staticmethod
+    def iter_json_preview_segments(uploaded_file) -> Iterator[Segment]:
+        """Yield the top of a JSON/NDJSON file as raw text, decoding only what is consumed"""
+        yield Segment("header", f"JSON file: {uploaded_file.name}\n\n")
+        for segment in FileProcessor.iter_text_segments(uploaded_file, chunk_size=64 * 1024):
+            yield Segment("section", segment.text, "Content")
+    
+    @staticmethod
+    def process_json_file(uploaded_file, ndjson: bool = False) -> Tuple[str, dict]:
+        """Process JSON (.json) and newline-delimited JSON (.ndjson, .jsonl) files"""
+        return collect_segments(uploaded_file, SEGMENT_PROCESSORS["application/json"], ndjson=ndjson)
     
     @staticmethod
-    def process_image_file(uploaded_file) -> Tuple[Union[Image.Image, str], dict]:
+    def process_image_file(uploaded_file) -> Tuple[Union["Image.Image", str], dict]:
         """Process image files (.jpg, .png, .gif, etc.)"""
         try:
-            image = Image.open(io.BytesIO(uploaded_file.read()))
+            image = timed_import("PIL.Image").open(io.BytesIO(uploaded_file.read()))
             
             # Create descriptive content about the image
             content = f"Image file: {uploaded_file.name}\n"
@@ -203,6 +368,128 @@ class FileProcessor:
             return f"Error processing image file: {str(e)}", FileProcessor.get_file_details(uploaded_file)
 
 
+# Segment generators by MIME type; see register_segment_processor
+SEGMENT_PROCESSORS = {}
+
+
+def register_segment_processor(file_types: list, stream: Callable[..., Iterator[Segment]],
+                               error_label: str, empty_message: Optional[str] = None,
+                               preview: Optional[Callable[..., Iterator[Segment]]] = None) -> None:
+    """
+    Register the segment generator used for one or more file types
+    
+    Args:
+        file_types: MIME types handled by the generator
+        stream: Generator function taking the uploaded file (and keyword options) and yielding Segments
+        error_label: Name used in error messages, e.g. "PDF file"
+        empty_message: Content used when the file yields no text
+        preview: Generator that reads only the start of the file, if stream can't stop early
+    """
+    for file_type in file_types:
+        SEGMENT_PROCESSORS[file_type] = SegmentProcessor(stream, error_label, empty_message, preview)
+
+
+register_segment_processor(["text/plain"], FileProcessor.iter_text_segments, "text file")
+register_segment_processor(["application/pdf"], FileProcessor.iter_pdf_segments, "PDF file",
+                           "No readable text found in the PDF file.",
+                           preview=functools.partial(FileProcessor.iter_pdf_segments, max_workers=1))
+register_segment_processor(["application/vnd.openxmlformats-officedocument.wordprocessingml.document"],
+                           FileProcessor.iter_word_segments, "Word file",
+                           "No readable content found in the Word document.")
+register_segment_processor(["application/vnd.ms-excel",
+                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"],
+                           FileProcessor.iter_excel_segments, "Excel file",
+                           preview=FileProcessor.iter_excel_preview_segments)
+register_segment_processor(["text/csv"], FileProcessor.iter_csv_segments, "CSV file",
+                           preview=FileProcessor.iter_csv_preview_segments)
+register_segment_processor(["application/json"], FileProcessor.iter_json_segments, "JSON file",
+                           preview=FileProcessor.iter_json_preview_segments)
+register_segment_processor(list(NDJSON_FILE_TYPES),
+                           functools.partial(FileProcessor.iter_json_segments, ndjson=True), "JSON file",
+                           preview=FileProcessor.iter_json_preview_segments)
+
+
+def get_segment_processor(uploaded_file) -> Optional[SegmentProcessor]:
+    """
+    Find the segment generator for an uploaded file
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+    
+    Returns:
+        SegmentProcessor, or None for images and unsupported types
+    """
+    if is_ndjson_file(uploaded_file):
+        return SEGMENT_PROCESSORS[NDJSON_FILE_TYPES[0]]
+    return SEGMENT_PROCESSORS.get(uploaded_file.type)
+
+
+def collect_segments(uploaded_file, processor: SegmentProcessor, **options) -> Tuple[str, dict]:
+    """
+    Run a segment generator to completion and join its output
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        processor: SegmentProcessor for the file's type
+        **options: Processor options passed to the generator
+    
+    Returns:
+        Tuple of (processed_content, file_details); errors are returned as content
+    """
+    try:
+        content = "".join(segment.text for segment in processor.stream(uploaded_file, **options))
+        if processor.empty_message and not content.strip():
+            content = processor.empty_message
+    except json.JSONDecodeError as e:
+        content = f"Invalid JSON format: {str(e)}"
+    except Exception as e:
+        content = f"Error processing {processor.error_label}: {str(e)}"
+    return content, FileProcessor.get_file_details(uploaded_file)
+
+
+def preview_uploaded_file(uploaded_file, max_chars: int = 500) -> Tuple[str, bool]:
+    """
+    Build a short text preview of an uploaded file, parsing only as much as needed
+    
+    PDFs stop after the first pages with text, Word documents after the first
+    paragraphs, CSV and Excel files read only their first rows and JSON files
+    only their first bytes. The file position is reset afterwards.
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        max_chars: Maximum preview length
+    
+    Returns:
+        Tuple of (preview_text, truncated)
+    """
+    processor = get_segment_processor(uploaded_file)
+    if processor is None:
+        return f"Unsupported file type: {uploaded_file.type}", False
+    
+    parts = []
+    length = 0
+    uploaded_file.seek(0)
+    segments = (processor.preview or processor.stream)(uploaded_file)
+    try:
+        for segment in segments:
+            parts.append(segment.text)
+            length += len(segment.text)
+            if length > max_chars:
+                break
+    except Exception as e:
+        return f"Error previewing {processor.error_label}: {str(e)}", False
+    finally:
+        segments.close()
+        uploaded_file.seek(0)
+    
+    text = "".join(parts)
+    if processor.empty_message and not text.strip():
+        return processor.empty_message, False
+    if len(text) > max_chars:
+        return text[:max_chars], True
+    return text, False
+
+
 def process_uploaded_file(uploaded_file) -> Tuple[Any, dict]:
     """
     Main function to process different types of uploaded files
@@ -216,24 +503,9 @@ def process_uploaded_file(uploaded_file) -> Tuple[Any, dict]:
     file_type = uploaded_file.type
     
     try:
-        if file_type == "text/plain":
-            return FileProcessor.process_text_file(uploaded_file)
-        
-        elif file_type == "application/pdf":
-            return FileProcessor.process_pdf_file(uploaded_file)
-        
-        elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            return FileProcessor.process_word_file(uploaded_file)
-        
-        elif file_type in ["application/vnd.ms-excel", 
-                          "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"]:
-            return FileProcessor.process_excel_file(uploaded_file)
-        
-        elif file_type == "text/csv":
-            return FileProcessor.process_csv_file(uploaded_file)
-        
-        elif file_type == "application/json":
-            return FileProcessor.process_json_file(uploaded_file)
+        processor = get_segment_processor(uploaded_file)
+        if processor is not None:
+            return collect_segments(uploaded_file, processor)
         
         elif file_type.startswith('image/'):
             return FileProcessor.process_image_file(uploaded_file)
@@ -247,6 +519,447 @@ def process_uploaded_file(uploaded_file) -> Tuple[Any, dict]:
                FileProcessor.get_file_details(uploaded_file))
 
 
+def get_file_bytes(uploaded_file) -> bytes:
+    """
+    Get the raw bytes of an uploaded file without consuming it
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+    
+    Returns:
+        File contents as bytes
+    """
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    
+    position = uploaded_file.tell()
+    uploaded_file.seek(0)
+    data = uploaded_file.read()
+    uploaded_file.seek(position)
+    return data
+
+
+def compute_file_hash(uploaded_file) -> str:
+    """
+    Compute the SHA-256 content hash of an uploaded file
+    
+    The hash is kept on the upload as file_hash, so the preview and the
+    processors (e.g. the PDF page cache) reuse it instead of hashing again.
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+    
+    Returns:
+        Hex digest of the file contents
+    """
+    file_hash = getattr(uploaded_file, "file_hash", None)
+    if file_hash:
+        return file_hash
+    if hasattr(uploaded_file, "getbuffer"):
+        with uploaded_file.getbuffer() as view:
+            file_hash = hashlib.sha256(view).hexdigest()
+    else:
+        file_hash = hashlib.sha256(get_file_bytes(uploaded_file)).hexdigest()
+    try:
+        uploaded_file.file_hash = file_hash
+    except AttributeError:
+        pass
+    return file_hash
+
+
+def get_upload_source(uploaded_file) -> Union[bytes, MappedFile]:
+    """
+    Get the contents of an upload for processing without consuming it
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object or MappedFile
+    
+    Returns:
+        The MappedFile itself (read in place), otherwise the file bytes
+    """
+    if isinstance(uploaded_file, MappedFile):
+        return uploaded_file
+    return get_file_bytes(uploaded_file)
+
+
+def open_upload(uploaded_file, file_hash: str):
+    """
+    Spool a large upload to disk and memory-map it
+    
+    Uploads of at least UPLOAD_SPOOL_THRESHOLD_MB are written once to a
+    content-addressed temp file; processors then read the mapping instead of
+    copying the bytes, and worker processes receive only its path.
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        file_hash: SHA-256 of the file contents
+    
+    Returns:
+        MappedFile for large uploads, otherwise the uploaded file unchanged
+    """
+    if isinstance(uploaded_file, MappedFile) or uploaded_file.size < get_spool_threshold():
+        return uploaded_file
+    try:
+        return spool_upload(uploaded_file, file_hash)
+    except (OSError, ValueError):
+        # No usable temp space; process from memory as before
+        return uploaded_file
+
+
+def is_pil_image(content: Any) -> bool:
+    """Check for a PIL image without importing Pillow (nothing is an image before it is loaded)"""
+    image_module = sys.modules.get("PIL.Image")
+    return image_module is not None and isinstance(content, image_module.Image)
+
+
+def estimate_content_size(content: Any) -> int:
+    """
+    Estimate the in-memory size of processed file content
+    
+    Args:
+        content: Processed content (string, bytes, PIL image or a list/tuple of those)
+    
+    Returns:
+        Approximate size in bytes
+    """
+    if is_pil_image(content):
+        # Image.open only reads the header; until the pixels are decoded the image holds its encoded bytes
+        fp = getattr(content, "fp", None)
+        if fp is not None and hasattr(fp, "getbuffer"):
+            return fp.getbuffer().nbytes
+        return content.size[0] * content.size[1] * max(len(content.getbands()), 1)
+    if isinstance(content, (bytes, bytearray)):
+        return len(content)
+    if isinstance(content, (list, tuple)):
+        return sum(estimate_content_size(item) for item in content)
+    if isinstance(content, (int, float)):
+        return 8
+    return len(str(content).encode("utf-8", errors="ignore"))
+
+
+def is_error_content(content: Any) -> bool:
+    """Check whether processed content is one of the processors' error messages"""
+    return isinstance(content, str) and content.startswith(
+        ("Error processing", "Invalid JSON format", "Unsupported file type")
+    )
+
+
+class ProcessedFileCache:
+    """Size-bounded LRU cache of processed file content keyed by content hash"""
+    
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 128):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(file_hash: str, file_type: str) -> str:
+        """Build a cache key from the content hash, MIME type and processor version"""
+        return f"{PROCESSOR_VERSION}:{file_type}:{file_hash}"
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return cached content for a key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: str, content: Any) -> None:
+        """Store content for a key, evicting least recently used entries as needed"""
+        size = estimate_content_size(content)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (content, size)
+            self.current_bytes += size
+            
+            while self._entries and (self.current_bytes > self.max_bytes or
+                                     len(self._entries) > self.max_entries):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+    
+    def shrink(self, target_bytes: int, keep_hashes: Collection[str] = ()) -> int:
+        """
+        Evict least recently used entries until at most target_bytes remain
+        
+        Args:
+            target_bytes: Size to shrink to
+            keep_hashes: Content hashes whose entries are never evicted (e.g. current uploads)
+        
+        Returns:
+            Bytes freed
+        """
+        freed = 0
+        with self._lock:
+            for key in list(self._entries):
+                if self.current_bytes <= target_bytes:
+                    break
+                if key.rsplit(":", 1)[-1] in keep_hashes:
+                    continue
+                _, evicted_size = self._entries.pop(key)
+                self.current_bytes -= evicted_size
+                freed += evicted_size
+        return freed
+    
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+
+PDF_PAGE_PATTERN = re.compile(r"^--- Page (\d+) ---\n", re.MULTILINE)
+TABLE_FILE_TYPES = ("text/csv", "application/vnd.ms-excel",
+                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+def split_pdf_pages(content: str) -> list:
+    """
+    Split processed PDF text back into per-page chunks
+    
+    Args:
+        content: Output of FileProcessor.process_pdf_file
+    
+    Returns:
+        List of {"page": page_number, "text": page_text} dictionaries
+    """
+    matches = list(PDF_PAGE_PATTERN.finditer(content))
+    pages = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+        pages.append({"page": int(match.group(1)), "text": content[match.end():end].strip()})
+    return pages
+
+
+def create_image_thumbnail(image: "Image.Image", max_size: Tuple[int, int] = (256, 256)) -> bytes:
+    """
+    Create a small JPEG thumbnail of an image
+    
+    Args:
+        image: PIL image to shrink
+        max_size: Maximum (width, height) of the thumbnail
+    
+    Returns:
+        Encoded JPEG bytes
+    """
+    thumbnail = image.copy()
+    thumbnail.thumbnail(max_size)
+    if thumbnail.mode not in ("RGB", "L"):
+        thumbnail = thumbnail.convert("RGB")
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def save_processed_artifacts(store, file_hash: str, content: Any, file_details: dict) -> None:
+    """
+    Persist the outputs of FileProcessor for a file to an ArtifactStore
+    
+    Args:
+        store: ArtifactStore instance
+        file_hash: SHA-256 of the file contents
+        content: Processed content returned by process_uploaded_file
+        file_details: File metadata dictionary
+    """
+    file_type = file_details["filetype"]
+    try:
+        if is_pil_image(content):
+            store.put_bytes(file_hash, "thumbnail.jpg", create_image_thumbnail(content))
+        else:
+            store.put_text(file_hash, "text.txt", str(content))
+        store.put_meta(file_hash, {
+            "filename": file_details["filename"],
+            "filetype": file_type,
+            "processor_version": PROCESSOR_VERSION,
+            "is_image": is_pil_image(content),
+        })
+    except OSError:
+        # Persistence is best effort - the in-memory result is still valid
+        pass
+
+
+def load_processed_content(store, file_hash: str, file_type: str, filename: str) -> Optional[str]:
+    """
+    Load previously persisted text content for a file from an ArtifactStore
+    
+    Args:
+        store: ArtifactStore instance
+        file_hash: SHA-256 of the file contents
+        file_type: MIME type the file was uploaded as
+        filename: Name the file was uploaded under in this session
+    
+    Returns:
+        Processed text content, or None if not stored (images are always re-decoded)
+    """
+    meta = store.get_meta(file_hash)
+    if (not meta or meta.get("is_image") or meta.get("filetype") != file_type or
+            meta.get("processor_version") != PROCESSOR_VERSION):
+        return None
+    
+    content = store.get_text(file_hash, "text.txt")
+    if content is None:
+        return None
+    
+    # CSV, Excel and JSON summaries start with the file name; don't leak another user's name
+    stored_name = meta.get("filename")
+    first_line, sep, rest = content.partition("\n")
+    if stored_name and stored_name != filename and first_line.endswith(f" file: {stored_name}"):
+        content = first_line[:-len(stored_name)] + filename + sep + rest
+    return content
+
+
+def _lookup_processed(uploaded_file, cache: Optional[ProcessedFileCache], store) -> Tuple[str, Optional[Any]]:
+    """Return (file_hash, cached_content) from the memory cache or artifact store"""
+    file_hash = compute_file_hash(uploaded_file)
+    key = ProcessedFileCache.make_key(file_hash, uploaded_file.type)
+    content = cache.get(key) if cache is not None else None
+    if content is None and store is not None:
+        content = load_processed_content(store, file_hash, uploaded_file.type, uploaded_file.name)
+        if content is not None and cache is not None:
+            cache.put(key, content)
+    return file_hash, content
+
+
+def _remember_processed(file_hash: str, content: Any, file_details: dict,
+                        cache: Optional[ProcessedFileCache], store) -> None:
+    """Store a freshly processed result in the memory cache and artifact store"""
+    if is_error_content(content):
+        return
+    if cache is not None:
+        cache.put(ProcessedFileCache.make_key(file_hash, file_details["filetype"]), content)
+    if store is not None:
+        save_processed_artifacts(store, file_hash, content, file_details)
+
+
+# File types whose parsing is CPU-bound enough to be worth a separate process
+PROCESS_POOL_FILE_TYPES = ("application/pdf",) + TABLE_FILE_TYPES
+
+
+class InMemoryUpload(io.BytesIO):
+    """Picklable stand-in for a Streamlit uploaded file"""
+    
+    def __init__(self, data: bytes, name: str, file_type: str, file_hash: Optional[str] = None):
+        super().__init__(data)
+        self.name = name
+        self.type = file_type
+        self.size = len(data)
+        self.file_hash = file_hash
+
+
+def _process_file_bytes(data: bytes, name: str, file_type: str,
+                        file_hash: Optional[str] = None) -> Tuple[Any, dict]:
+    """Process raw file bytes; module-level so it can run in a worker process"""
+    return process_uploaded_file(InMemoryUpload(data, name, file_type, file_hash))
+
+
+def process_uploaded_files(uploaded_files: list, cache: Optional[ProcessedFileCache] = None,
+                           store=None, max_workers: Optional[int] = None,
+                           progress_callback: Optional[Callable[[int, int, Any], None]] = None) -> list:
+    """
+    Process several uploaded files concurrently
+    
+    PDF, Excel and CSV files are parsed in a process pool, other formats in a thread
+    pool. Cached results are returned without being scheduled at all.
+    
+    Args:
+        uploaded_files: List of Streamlit uploaded file objects
+        cache: Optional ProcessedFileCache of processed results
+        store: Optional ArtifactStore for results persisted across processes
+        max_workers: Concurrency cap per pool (defaults to get_max_workers())
+        progress_callback: Called as callback(completed, total, uploaded_file) on the
+            calling thread each time a file finishes
+    
+    Returns:
+        List of (processed_content, file_details) tuples in upload order; file_details
+        also carries the content hash under "filehash"
+    """
+    total = len(uploaded_files)
+    results = [None] * total
+    completed = 0
+    max_workers = max_workers or get_max_workers()
+    
+    def finish(index, result, file_hash):
+        nonlocal completed
+        result[1]["filehash"] = file_hash
+        results[index] = result
+        completed += 1
+        if progress_callback:
+            progress_callback(completed, total, uploaded_files[index])
+    
+    pending = []
+    for index, uploaded_file in enumerate(uploaded_files):
+        file_hash, content = _lookup_processed(uploaded_file, cache, store)
+        if content is not None:
+            finish(index, (content, FileProcessor.get_file_details(uploaded_file)), file_hash)
+        else:
+            pending.append((index, file_hash))
+    
+    # Large uploads are spooled and mapped once, then read in place by whichever worker runs them
+    sources = {index: open_upload(uploaded_files[index], file_hash) for index, file_hash in pending}
+    
+    # A single file isn't worth the hand-off to a pool
+    if len(pending) == 1 or max_workers == 1:
+        for index, file_hash in pending:
+            content, file_details = process_uploaded_file(sources[index])
+            _remember_processed(file_hash, content, file_details, cache, store)
+            finish(index, (content, file_details), file_hash)
+        return results
+    
+    futures = {}
+    for index, file_hash in pending:
+        uploaded_file = sources[index]
+        future = None
+        if uploaded_file.type in PROCESS_POOL_FILE_TYPES:
+            try:
+                executor = get_executor("process", max_workers)
+                if isinstance(uploaded_file, MappedFile):
+                    # Pickles as its path; the worker maps the same spool file
+                    future = executor.submit(process_uploaded_file, uploaded_file)
+                else:
+                    future = executor.submit(_process_file_bytes, get_file_bytes(uploaded_file),
+                                             uploaded_file.name, uploaded_file.type, file_hash)
+            except (BrokenProcessPool, OSError, RuntimeError):
+                # Process pools can be unavailable (e.g. restricted sandboxes); use threads
+                discard_executor("process", max_workers)
+        if future is None:
+            future = get_executor("thread", max_workers).submit(process_uploaded_file, uploaded_file)
+        futures[future] = (index, file_hash)
+    
+    for future in as_completed(futures):
+        index, file_hash = futures[future]
+        uploaded_file = sources[index]
+        try:
+            content, file_details = future.result()
+            _remember_processed(file_hash, content, file_details, cache, store)
+        except BrokenProcessPool:
+            discard_executor("process", max_workers)
+            content, file_details = process_uploaded_file(uploaded_file)
+            _remember_processed(file_hash, content, file_details, cache, store)
+        except Exception as e:
+            content, file_details = (f"Error processing file: {str(e)}",
+                                     FileProcessor.get_file_details(uploaded_file))
+        finish(index, (content, file_details), file_hash)
+    
+    return results
+
+
 def upload_to_gemini(file_content, file_details) -> Tuple[Any, dict]:
     """
     Upload file content to Gemini for processing
@@ -305,6 +1018,7 @@ def get_supported_file_types() -> dict:
         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "Excel files (.xlsx)",
         "text/csv": "CSV files (.csv)",
         "application/json": "JSON files (.json)",
+        "application/x-ndjson": "NDJSON files (.ndjson, .jsonl)",
         "image/jpeg": "JPEG images (.jpg, .jpeg)",
         "image/png": "PNG images (.png)",
         "image/gif": "GIF images (.gif)",
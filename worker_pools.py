@@ -0,0 +1,68 @@
+"""
+Shared Worker Pools for AI Chatbot Hub
+
+Lazily created thread and process pools used for CPU-heavy file processing.
+Pools are shared by all sessions in a server process so workers are started once.
+
+Author: Pruthvirajsinh Zala
+Version: 3.0
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from env_config import get_env_int
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_max_workers() -> int:
+    """
+    Get the configured file processing concurrency cap
+    
+    Returns:
+        Value of FILE_PROCESSING_MAX_WORKERS, or a default based on the CPU count
+    """
+    return get_env_int("FILE_PROCESSING_MAX_WORKERS", min(4, os.cpu_count() or 1))
+
+
+def in_worker_process() -> bool:
+    """Check whether the caller is running inside a pool worker process"""
+    return multiprocessing.parent_process() is not None
+
+
+def get_executor(kind: str, max_workers: int):
+    """
+    Get a shared thread or process pool, creating it on first use
+    
+    Args:
+        kind: "process" or "thread"
+        max_workers: Size of the pool
+    
+    Returns:
+        Executor instance
+    """
+    with _executors_lock:
+        executor = _executors.get((kind, max_workers))
+        if executor is None:
+            if kind == "process":
+                # Forking a multi-threaded Streamlit server is unsafe; prefer a fork server
+                start_methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver") if "forkserver" in start_methods else None
+                executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+            else:
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-processing")
+            _executors[(kind, max_workers)] = executor
+        return executor
+
+
+def discard_executor(kind: str, max_workers: int) -> None:
+    """Drop a broken pool so the next caller creates a fresh one"""
+    with _executors_lock:
+        executor = _executors.pop((kind, max_workers), None)
+    if executor is not None:
+        executor.shutdown(wait=False)